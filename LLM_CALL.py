@@ -14,7 +14,9 @@
 # limitations under the License.
 
 import openai
-from openai import AzureOpenAI
+from openai import AzureOpenAI, AsyncAzureOpenAI, AsyncOpenAI
+import asyncio
+import httpx
 import requests
 import time
 import os
@@ -23,12 +25,363 @@ import requests
 import subprocess
 from openai import OpenAI
 import random
+import threading
+import weakref
+import contextvars
+from contextlib import contextmanager
 from typing import List, Tuple, Dict, Any, Optional
 
+from loguru import logger
+
 KEYS_DIR = 'keys'
 if not os.path.isdir(KEYS_DIR):
     os.makedirs(KEYS_DIR,exist_ok=True)
 
+# Connection pool of the HTTP clients, one pool per endpoint.
+LLM_HTTP_LIMITS = {
+    'max_connections': int(os.getenv('LLM_HTTP_MAX_CONNECTIONS', 256)),
+    'max_keepalive_connections': int(os.getenv('LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS', 64)),
+    'keepalive_expiry': float(os.getenv('LLM_HTTP_KEEPALIVE_EXPIRY', 60)),
+}
+# endpoint -> pooled httpx.Client, and (client class, endpoint) -> (api_key, kwargs, client).
+_SYNC_CLIENTS = {'http': {}, 'llm': {}}
+# Async clients are bound to the event loop they are used in, so they are kept per loop.
+_ASYNC_CLIENTS = weakref.WeakKeyDictionary()
+_CLIENTS_LOCK = threading.Lock()
+
+def configure_llm_clients(max_connections=None,max_keepalive_connections=None,keepalive_expiry=None):
+    """Set the connection pool limits of the LLM clients. Only applies to the clients created afterwards."""
+    with _CLIENTS_LOCK:
+        if max_connections is not None:
+            LLM_HTTP_LIMITS['max_connections'] = max_connections
+        if max_keepalive_connections is not None:
+            LLM_HTTP_LIMITS['max_keepalive_connections'] = max_keepalive_connections
+        if keepalive_expiry is not None:
+            LLM_HTTP_LIMITS['keepalive_expiry'] = keepalive_expiry
+
+def _get_clients(is_async):
+    if not is_async:
+        return _SYNC_CLIENTS
+    loop = asyncio.get_running_loop()
+    with _CLIENTS_LOCK:
+        return _ASYNC_CLIENTS.setdefault(loop,{'http': {}, 'llm': {}})
+
+def _get_http_client(endpoint,is_async):
+    clients = _get_clients(is_async)['http']
+    with _CLIENTS_LOCK:
+        http_client = clients.get(endpoint)
+        if http_client is None:
+            client_class = httpx.AsyncClient if is_async else httpx.Client
+            http_client = client_class(limits=httpx.Limits(**LLM_HTTP_LIMITS),timeout=None)
+            clients[endpoint] = http_client
+    return http_client
+
+def get_http_client(endpoint):
+    """Get the pooled httpx.Client of an endpoint. Safe to share between threads."""
+    return _get_http_client(endpoint,is_async=False)
+
+def get_async_http_client(endpoint):
+    """Get the pooled httpx.AsyncClient of an endpoint for the running event loop."""
+    return _get_http_client(endpoint,is_async=True)
+
+def get_llm_client(client_class,endpoint,api_key,**kwargs):
+    """
+    Get a reusable client of client_class (OpenAI, AzureOpenAI, AsyncOpenAI or AsyncAzureOpenAI)
+    for (endpoint, api_key). The client is rebuilt when the credential changes, on top of the
+    same connection pool, so rotating tokens does not open new connections.
+    """
+    is_async = client_class in (AsyncOpenAI,AsyncAzureOpenAI)
+    clients = _get_clients(is_async)['llm']
+    with _CLIENTS_LOCK:
+        entry = clients.get((client_class,endpoint))
+    if entry is not None and entry[0]==api_key and entry[1]==kwargs:
+        return entry[2]
+    http_client = _get_http_client(endpoint,is_async)
+    if client_class in (AzureOpenAI,AsyncAzureOpenAI):
+        client = client_class(api_key=api_key,azure_endpoint=endpoint,http_client=http_client,**kwargs)
+    else:
+        client = client_class(api_key=api_key,base_url=endpoint,http_client=http_client,**kwargs)
+    with _CLIENTS_LOCK:
+        clients[(client_class,endpoint)] = (api_key,kwargs,client)
+    return client
+
+# Retries.
+LLM_CALL_TIMEOUT = float(os.getenv('LLM_CALL_TIMEOUT', 1800))  # Seconds one call may spend, retries included.
+RETRY_BASE_DELAY = 2.0
+RETRY_MAX_DELAY = 60.0
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429}  # And every 5xx.
+_SIMULATION_DEADLINE = contextvars.ContextVar('llm_simulation_deadline',default=None)
+
+class LLMCallError(Exception):
+    """An LLM call gave up: the error is fatal, or the attempts or the deadline are exhausted."""
+
+    def __init__(self,model,reason,attempts,elapsed,error=None):
+        self.model = model
+        self.reason = reason
+        self.attempts = attempts
+        self.elapsed = elapsed
+        self.error = error
+        super().__init__(f"{model}: gave up after {attempts} attempt(s) in {elapsed:.1f}s ({reason}): {error!r}")
+
+# Transient errors of the transport, and answers cut before the end of their JSON.
+TRANSIENT_ERRORS = (openai.APIConnectionError,httpx.TransportError,requests.ConnectionError,requests.Timeout,json.JSONDecodeError)
+
+def is_retryable_error(error):
+    """
+    Connection errors, timeouts, truncated JSON answers, 429 and 5xx are retried (and empty answers, see RetryPolicy.get_delay).
+    Other HTTP errors (400, 401, 404...) and every other error, e.g. an unexpected answer format, are fatal.
+    """
+    if isinstance(error,TRANSIENT_ERRORS):
+        return True
+    status_code = None
+    if isinstance(error,openai.APIStatusError):
+        status_code = error.status_code
+    elif isinstance(error,(httpx.HTTPStatusError,requests.HTTPError)) and error.response is not None:
+        status_code = error.response.status_code
+    if status_code is not None:
+        return status_code in RETRYABLE_STATUS_CODES or status_code>=500
+    return False
+
+def _get_retry_after(error):
+    response = getattr(error,'response',None)
+    try:
+        return float(response.headers.get('retry-after'))
+    except (AttributeError,TypeError,ValueError):
+        return None
+
+@contextmanager
+def simulation_deadline(timeout):
+    """Bound the time all the LLM calls of the current thread or asyncio task may take, retries included."""
+    if timeout is None:
+        yield
+        return
+    token = _SIMULATION_DEADLINE.set(time.monotonic()+timeout)
+    try:
+        yield
+    finally:
+        _SIMULATION_DEADLINE.reset(token)
+
+class RetryPolicy:
+    """
+    Retries of one LLM call: exponential backoff with full jitter, until the error is fatal,
+    max_attempts is reached or the deadline (call timeout or simulation deadline) is over.
+    """
+
+    def __init__(self,model,max_attempts=None,timeout=None):
+        self.model = model
+        self.max_attempts = max_attempts
+        self.attempts = 0
+        self.start = time.monotonic()
+        self.start_time = time.time()
+        # The endpoint of the last attempt, when known.
+        self.endpoint = None
+        self.deadline = self.start+(LLM_CALL_TIMEOUT if timeout is None else timeout)
+        simulation_deadline = _SIMULATION_DEADLINE.get()
+        if simulation_deadline is not None:
+            self.deadline = min(self.deadline,simulation_deadline)
+
+    def remaining(self):
+        """Seconds left before the deadline. Also the timeout of the next request."""
+        return max(0.0,self.deadline-time.monotonic())
+
+    def give_up(self,reason,error=None):
+        raise LLMCallError(self.model,reason,self.attempts,time.monotonic()-self.start,error=error)
+
+    def get_delay(self,error=None):
+        """
+        Record a failed attempt (error is None for an empty answer).
+        Returns the seconds to wait before the next attempt, or raises LLMCallError.
+        """
+        self.attempts += 1
+        if error is not None and not is_retryable_error(error):
+            self.give_up('fatal',error)
+        if self.max_attempts and self.attempts>=self.max_attempts:
+            self.give_up('max_attempts',error)
+        delay = _get_retry_after(error)
+        if delay is None:
+            delay = random.uniform(0,min(RETRY_MAX_DELAY,RETRY_BASE_DELAY*2**(self.attempts-1)))
+        if self.remaining()<=delay:
+            self.give_up('deadline',error)
+        return delay
+
+# Listeners of the LLM calls, e.g. for tracing and metrics.
+_LLM_CALL_LISTENERS = []
+
+def add_llm_call_listener(listener):
+    """
+    Call listener(model=,endpoint=,start_time=,latency=,attempts=,error=) after every LLM call.
+    start_time is a unix time, latency includes the retries, error is None when the call succeeded.
+    Listeners run on the thread (or event loop) of the call and must be fast.
+    """
+    if listener not in _LLM_CALL_LISTENERS:
+        _LLM_CALL_LISTENERS.append(listener)
+
+def remove_llm_call_listener(listener):
+    if listener in _LLM_CALL_LISTENERS:
+        _LLM_CALL_LISTENERS.remove(listener)
+
+def notify_llm_call(policy,error=None):
+    attempts = policy.attempts if isinstance(error,LLMCallError) else policy.attempts+1
+    latency = time.monotonic()-policy.start
+    for listener in list(_LLM_CALL_LISTENERS):
+        try:
+            listener(model=policy.model,endpoint=policy.endpoint,start_time=policy.start_time,latency=latency,attempts=attempts,error=error)
+        except Exception as listener_error:
+            logger.warning(f'LLM call listener failed: {listener_error!r}')
+
+# vLLM endpoint routing.
+ROUTER_FAILURE_THRESHOLD = 3  # Consecutive failures that open the circuit of an endpoint.
+ROUTER_OPEN_SECONDS = 15  # First cool-down of an open circuit, doubled on every failed probe.
+ROUTER_MAX_OPEN_SECONDS = 240
+ROUTER_LATENCY_DECAY = 0.8  # Weight of the history in the moving averages.
+ROUTER_RELOAD_INTERVAL = 5  # Seconds between two checks of the modification time of the config file.
+# Errors that mean the endpoint itself is unhealthy.
+ENDPOINT_ERRORS = (openai.APIConnectionError, openai.InternalServerError, httpx.TransportError)
+
+_MODEL_CONFIGS = {}
+_MODEL_CONFIGS_LOCK = threading.Lock()
+
+def load_model_configs(model_config_path):
+    """Load the model config file, re-reading it only when its modification time changes."""
+    mtime = os.path.getmtime(model_config_path)
+    with _MODEL_CONFIGS_LOCK:
+        cached = _MODEL_CONFIGS.get(model_config_path)
+        if cached is not None and cached[0]==mtime:
+            return cached[1]
+    with open(model_config_path) as f:
+        model_configs = json.load(f)
+    with _MODEL_CONFIGS_LOCK:
+        _MODEL_CONFIGS[model_config_path] = (mtime,model_configs)
+    return model_configs
+
+class EndpointStats:
+    def __init__(self):
+        self.in_flight = 0
+        self.latency = None  # Moving average of the latency of the successful requests.
+        self.error_rate = 0.0  # Moving average of the failures.
+        self.failures = 0  # Consecutive failures.
+        self.open_seconds = ROUTER_OPEN_SECONDS
+        self.open_until = 0.0  # The circuit is open until then.
+        self.probing = False  # A request is testing an endpoint whose cool-down is over.
+
+class VLLMRouter:
+    """
+    Routes the requests of a model over its vLLM endpoints (`ip_addr:port`).
+    Picks the better of two random healthy endpoints (power of two choices) by outstanding
+    requests, latency and error rate. Endpoints failing ROUTER_FAILURE_THRESHOLD times in a row
+    are skipped until their cool-down is over, then a single request probes them.
+    The endpoints are reloaded from model_config_path when the file changes.
+    """
+
+    def __init__(self,model,model_config=None,model_config_path=None):
+        self.model = model
+        self.model_config_path = model_config_path
+        self.endpoints = []
+        self.stats = {}
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._model_config = None
+        if model_config:
+            self._set_endpoints(model_config)
+        self._reload()
+
+    def _set_endpoints(self,model_config):
+        self._model_config = model_config
+        self.endpoints = [f"{c['ip_addr']}:{c['port']}" for c in model_config]
+        for endpoint in self.endpoints:
+            self.stats.setdefault(endpoint,EndpointStats())
+
+    def _reload(self):
+        if not os.path.isfile(str(self.model_config_path)):
+            return
+        now = time.monotonic()
+        if now-self._checked_at<ROUTER_RELOAD_INTERVAL and self.endpoints:
+            return
+        self._checked_at = now
+        try:
+            model_config = load_model_configs(self.model_config_path).get(self.model)
+        except (OSError,ValueError) as error:
+            logger.warning(f'Error loading {self.model_config_path}: {error!r}')
+            return
+        if model_config and model_config is not self._model_config:
+            self._set_endpoints(model_config)
+
+    def _score(self,endpoint):
+        stats = self.stats[endpoint]
+        latency = stats.latency if stats.latency is not None else 0.0
+        return (stats.in_flight+1)*(latency+1.0)*(1.0+4*stats.error_rate)
+
+    def acquire(self):
+        """Pick an endpoint and count the request as in flight. Returns None if all circuits are open."""
+        with self._lock:
+            self._reload()
+            now = time.monotonic()
+            available = []
+            for endpoint in self.endpoints:
+                stats = self.stats[endpoint]
+                if stats.failures<ROUTER_FAILURE_THRESHOLD:
+                    available.append(endpoint)
+                elif stats.open_until<=now and not stats.probing:
+                    available.append(endpoint)
+            if not available:
+                return None
+            if len(available)>2:
+                available = random.sample(available,2)
+            endpoint = min(available,key=self._score)
+            stats = self.stats[endpoint]
+            if stats.failures>=ROUTER_FAILURE_THRESHOLD:
+                stats.probing = True
+            stats.in_flight += 1
+            return endpoint
+
+    def release(self,endpoint,latency=None,error=False):
+        """Record the outcome of a request sent to an endpoint by acquire."""
+        with self._lock:
+            stats = self.stats[endpoint]
+            stats.in_flight -= 1
+            stats.probing = False
+            stats.error_rate = ROUTER_LATENCY_DECAY*stats.error_rate+(1-ROUTER_LATENCY_DECAY)*float(error)
+            if error:
+                stats.failures += 1
+                if stats.failures>=ROUTER_FAILURE_THRESHOLD:
+                    if stats.open_until>0:
+                        stats.open_seconds = min(2*stats.open_seconds,ROUTER_MAX_OPEN_SECONDS)
+                    stats.open_until = time.monotonic()+stats.open_seconds
+            else:
+                stats.failures = 0
+                stats.open_seconds = ROUTER_OPEN_SECONDS
+                stats.open_until = 0.0
+                if latency is not None:
+                    if stats.latency is None:
+                        stats.latency = latency
+                    else:
+                        stats.latency = ROUTER_LATENCY_DECAY*stats.latency+(1-ROUTER_LATENCY_DECAY)*latency
+
+    def get_wait_time(self):
+        """Seconds until the next endpoint can be probed."""
+        with self._lock:
+            open_until = [self.stats[e].open_until for e in self.endpoints]
+        if not open_until:
+            return ROUTER_RELOAD_INTERVAL
+        # At least a second, while a probe is in flight.
+        return max(1.0,min(open_until)-time.monotonic())
+
+_ROUTERS = {}
+_ROUTERS_LOCK = threading.Lock()
+
+def get_vllm_router(model,model_config=None,model_config_path=None):
+    """Get the router shared by all the requests to a model."""
+    if os.path.isfile(str(model_config_path)):
+        key = (model,model_config_path)
+    else:
+        key = (model,tuple(f"{c['ip_addr']}:{c['port']}" for c in model_config))
+    with _ROUTERS_LOCK:
+        router = _ROUTERS.get(key)
+        if router is None:
+            router = VLLMRouter(model,model_config=model_config,model_config_path=model_config_path)
+            _ROUTERS[key] = router
+    return router
+
 def convert_openai_tools_to_claude(openai_tools: list) -> list:
     claude_tools = []
     for tool in openai_tools:
@@ -281,16 +634,81 @@ def get_openai_client(model):
     openai.api_base = "https://prod.api.nvidia.com/llm/v1/azure/"
     openai.api_version = "2025-04-01-preview"
     openai.api_key = token
-    client = AzureOpenAI(
-        api_key=token,
+    client = get_llm_client(
+        AzureOpenAI,
+        "https://prod.api.nvidia.com/llm/v1/azure/",
+        token,
+        api_version="2025-04-01-preview",
+        max_retries=0,
+    )
+    return client
+
+def get_azure_openai_token(model):
+    client_id = os.getenv("CLIENT_ID")
+    client_secret = os.getenv("CLIENT_SECRET")
+    token_url = "https://prod.api.nvidia.com/oauth/api/v1/ssa/default/token"
+    scope = "azureopenai-readwrite"
+    token = get_openai_token(token_url, client_id, client_secret, scope)
+    return token
+
+async def get_async_openai_client(model):
+    token = await asyncio.to_thread(get_azure_openai_token,model=model)
+    client = get_llm_client(
+        AsyncAzureOpenAI,
+        "https://prod.api.nvidia.com/llm/v1/azure/",
+        token,
         api_version="2025-04-01-preview",
-        azure_endpoint="https://prod.api.nvidia.com/llm/v1/azure/"
+        max_retries=0,
     )
     return client
 
-def get_llm_response(model,messages,temperature=1.0,return_raw_response=False,tools=None,show_messages=False,model_type=None,max_length=1024,model_config=None,model_config_idx=0,model_config_path=None,payload=None,**kwargs):
+def get_claude_endpoint(model):
+    if 'opus' in model:
+        endpoint = f"https://prod.api.nvidia.com/llm/v1/aws/model/us.anthropic.claude-opus-4-20250514-v1:0/invoke"
+    elif 'sonnet' in model:
+        endpoint = f"https://prod.api.nvidia.com/llm/v1/aws/model/us.anthropic.claude-sonnet-4-20250514-v1:0/invoke"
+    return endpoint
+
+def build_claude_payload(messages,temperature=1.0,tools=None,claude_tools=None):
+    """claude_tools are the tools already in the Claude format, e.g. Tool.claude_schema. Otherwise tools are converted."""
+    updated_messages = []
+    system_message = 'You are a good assistant'
+    for m in messages:
+        if m['role'] == 'system':
+            system_message = m['content']
+        else:
+            updated_messages.append(m)
+    payload = {
+        "anthropic_version": "bedrock-2023-05-31",
+        "messages": updated_messages,
+        "temperature": temperature,
+        "top_p": 1.0,
+        "max_tokens": 4096,
+        'system': system_message,
+    }
+    if claude_tools:
+        payload['tools'] = claude_tools
+    elif tools:
+        payload['tools'] = convert_openai_tools_to_claude(tools)
+    return payload
+
+def get_llm_response(model,messages,temperature=1.0,return_raw_response=False,tools=None,show_messages=False,model_type=None,max_length=1024,model_config=None,model_config_path=None,payload=None,claude_tools=None,retry_count=None,timeout=None,**kwargs):
+    """
+    Get the response of a model. Failed calls are retried with RetryPolicy, up to retry_count
+    attempts and timeout seconds. Raises LLMCallError when giving up.
+    """
     if isinstance(messages,str):
         messages = [{'role': 'user','content': messages}]
+    policy = RetryPolicy(model,max_attempts=retry_count,timeout=timeout)
+    try:
+        answer = _get_llm_response(policy,model,messages,temperature=temperature,return_raw_response=return_raw_response,tools=tools,model_type=model_type,max_length=max_length,model_config=model_config,model_config_path=model_config_path,payload=payload,claude_tools=claude_tools)
+    except Exception as error:
+        notify_llm_call(policy,error=error)
+        raise
+    notify_llm_call(policy)
+    return answer
+
+def _get_llm_response(policy,model,messages,temperature,return_raw_response,tools,model_type,max_length,model_config,model_config_path,payload,claude_tools=None):
     if model in ['o3','o3-mini','gpt-4o','o3-high','gpt-5','gpt-5-mini','gpt-4.1','gpt-4o-mini']:
         if max_length==1024:
             max_length = 40000
@@ -305,14 +723,18 @@ def get_llm_response(model,messages,temperature=1.0,return_raw_response=False,to
                     messages=messages,
                     temperature=temperature,
                     tools=tools,
-                    max_completion_tokens=max_length
+                    max_completion_tokens=max_length,
+                    timeout=policy.remaining()
                 )
                 if return_raw_response:
                     answer = chat_completion
                 else:
                     answer = chat_completion.choices[0].message.content
             except Exception as error:
-                time.sleep(60)
+                time.sleep(policy.get_delay(error))
+                continue
+            if answer=='':
+                time.sleep(policy.get_delay())
         return answer
     elif model_type=='nv/dev':
         answer = ''
@@ -322,101 +744,210 @@ def get_llm_response(model,messages,temperature=1.0,return_raw_response=False,to
                 m['content'] += str(m['tool_calls'])
                 m.pop('tool_calls')
             updated_messages.append(m)
+        extra_args = {'tools': tools} if tools else {}
         while answer=='':
             try:
-                oss_client = OpenAI(
-                    base_url = "https://integrate.api.nvidia.com/v1",
-                    api_key = os.getenv("OSS_KEY")
+                oss_client = get_llm_client(OpenAI,"https://integrate.api.nvidia.com/v1",os.getenv("OSS_KEY"),max_retries=0)
+                chat_completion = oss_client.chat.completions.create(
+                    model=model,
+                    messages=updated_messages,
+                    temperature=temperature,
+                    top_p=0.7,
+                    max_tokens=max_length,
+                    timeout=policy.remaining(),
+                    **extra_args
                 )
-                if tools:
-                    chat_completion = oss_client.chat.completions.create(
-                        model=model, 
-                        messages=updated_messages,
-                        temperature=temperature,
-                        top_p=0.7,
-                        max_tokens=max_length,
-                        tools=tools
-                    )
-                else:
-                    chat_completion = oss_client.chat.completions.create(
-                        model=model, 
-                        messages=updated_messages,
-                        temperature=temperature,
-                        top_p=0.7,
-                        max_tokens=max_length,
-                    )
                 if return_raw_response:
                     answer = chat_completion
                 else:
                     answer = chat_completion.choices[0].message.content
             except Exception as error:
-                time.sleep(60)
+                time.sleep(policy.get_delay(error))
+                continue
+            if answer=='':
+                time.sleep(policy.get_delay())
         return answer
     elif 'qwen' in model.lower() or model_type=='vllm':
+        router = get_vllm_router(model,model_config=model_config,model_config_path=model_config_path)
         answer = ''
         while answer=='':
-            config_idx = random.choice(range(len(model_config)))
-            ip_addr = model_config[config_idx]["ip_addr"]
-            port = model_config[config_idx]["port"]
+            endpoint = router.acquire()
+            if endpoint is None:
+                if policy.remaining()<=0:
+                    policy.give_up('deadline')
+                time.sleep(min(router.get_wait_time(),policy.remaining()))
+                continue
+            policy.endpoint = endpoint
+            start_time = time.monotonic()
             try:
-                vllm_client = OpenAI(
-                    api_key="EMPTY",
-                    base_url=f"http://{ip_addr}:{port}/v1",
-                )
+                vllm_client = get_llm_client(OpenAI,f"http://{endpoint}/v1","EMPTY",max_retries=0)
                 chat_completion = vllm_client.chat.completions.create(
                     model=model,
                     messages=messages,
                     max_tokens=max_length,
                     temperature=temperature,
-                    tools=tools
+                    tools=tools,
+                    timeout=policy.remaining()
+                )
+            except Exception as error:
+                logger.warning(f'LLM call to {endpoint} failed: {error!r}')
+                router.release(endpoint,error=isinstance(error,ENDPOINT_ERRORS))
+                # The router moves the next attempt to another endpoint if this one is down.
+                time.sleep(policy.get_delay(error))
+                continue
+            router.release(endpoint,latency=time.monotonic()-start_time)
+            if return_raw_response:
+                answer = chat_completion
+            else:
+                answer = chat_completion.choices[0].message.content
+            if answer=='':
+                time.sleep(policy.get_delay())
+        return answer
+    elif 'claude' in model.lower():
+        access_token = get_claude_token()
+        endpoint = get_claude_endpoint(model)
+        policy.endpoint = endpoint
+        if not payload:
+            payload = build_claude_payload(messages,temperature=temperature,tools=tools,claude_tools=claude_tools)
+
+        payload['messages'] = convert_openai_messages_to_claude(payload['messages'])
+        headers = {
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+        }
+        answer = ''
+        while answer=='':
+            try:
+                response = get_http_client(endpoint).post(endpoint, headers=headers, json=payload, timeout=policy.remaining())
+                response.raise_for_status()
+                if return_raw_response:
+                    answer = response.json()
+                else:
+                    answer = response.json()['content'][0]['text']
+            except Exception as error:
+                time.sleep(policy.get_delay(error))
+                continue
+            if answer=='':
+                time.sleep(policy.get_delay())
+        return answer
+
+
+
+async def aget_llm_response(model,messages,temperature=1.0,return_raw_response=False,tools=None,show_messages=False,model_type=None,max_length=1024,model_config=None,model_config_path=None,payload=None,claude_tools=None,retry_count=None,timeout=None,**kwargs):
+    """Async counterpart of get_llm_response. Awaits the provider instead of blocking the calling thread."""
+    if isinstance(messages,str):
+        messages = [{'role': 'user','content': messages}]
+    policy = RetryPolicy(model,max_attempts=retry_count,timeout=timeout)
+    try:
+        answer = await _aget_llm_response(policy,model,messages,temperature=temperature,return_raw_response=return_raw_response,tools=tools,model_type=model_type,max_length=max_length,model_config=model_config,model_config_path=model_config_path,payload=payload,claude_tools=claude_tools)
+    except Exception as error:
+        notify_llm_call(policy,error=error)
+        raise
+    notify_llm_call(policy)
+    return answer
+
+async def _aget_llm_response(policy,model,messages,temperature,return_raw_response,tools,model_type,max_length,model_config,model_config_path,payload,claude_tools=None):
+    if model in ['o3','o3-mini','gpt-4o','o3-high','gpt-5','gpt-5-mini','gpt-4.1','gpt-4o-mini']:
+        if max_length==1024:
+            max_length = 40000
+        if model in ['gpt-4.1','gpt-4o-mini']:
+            max_length = 8000
+        openai_client = await get_async_openai_client(model=model)
+        answer = ''
+        while answer=='':
+            try:
+                chat_completion = await openai_client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    tools=tools,
+                    max_completion_tokens=max_length,
+                    timeout=policy.remaining()
                 )
                 if return_raw_response:
                     answer = chat_completion
                 else:
                     answer = chat_completion.choices[0].message.content
             except Exception as error:
-                print('Error',error)
-                if os.path.isfile(str(model_config_path)):
-                    # print(f"call {model} error, load {model_config_path}")
-                    with open(model_config_path) as f:
-                        update_model_configs = json.load(f)
-                    model_config = update_model_configs[model]
-                time.sleep(60)
+                await asyncio.sleep(policy.get_delay(error))
+                continue
+            if answer=='':
+                await asyncio.sleep(policy.get_delay())
         return answer
-    elif 'claude' in model.lower():
-        access_token = get_claude_token()
-        if 'opus' in model:
-            endpoint = f"https://prod.api.nvidia.com/llm/v1/aws/model/us.anthropic.claude-opus-4-20250514-v1:0/invoke"
-        elif 'sonnet' in model:
-            endpoint = f"https://prod.api.nvidia.com/llm/v1/aws/model/us.anthropic.claude-sonnet-4-20250514-v1:0/invoke"
-        if not payload:
-            updated_messages = []
-            system_message = 'You are a good assistant'
-            for m in messages:
-                if m['role'] == 'system':
-                    system_message = m['content']
+    elif model_type=='nv/dev':
+        answer = ''
+        updated_messages = []
+        for m in messages:
+            if 'tool_calls' in m:
+                m['content'] += str(m['tool_calls'])
+                m.pop('tool_calls')
+            updated_messages.append(m)
+        extra_args = {'tools': tools} if tools else {}
+        while answer=='':
+            try:
+                oss_client = get_llm_client(AsyncOpenAI,"https://integrate.api.nvidia.com/v1",os.getenv("OSS_KEY"),max_retries=0)
+                chat_completion = await oss_client.chat.completions.create(
+                    model=model,
+                    messages=updated_messages,
+                    temperature=temperature,
+                    top_p=0.7,
+                    max_tokens=max_length,
+                    timeout=policy.remaining(),
+                    **extra_args
+                )
+                if return_raw_response:
+                    answer = chat_completion
                 else:
-                    updated_messages.append(m)
-            if not tools:
-                payload = {
-                    "anthropic_version": "bedrock-2023-05-31",
-                    "messages": updated_messages,
-                    "temperature": temperature,
-                    "top_p": 1.0,
-                    "max_tokens": 4096,
-                    'system': system_message,
-                }
+                    answer = chat_completion.choices[0].message.content
+            except Exception as error:
+                await asyncio.sleep(policy.get_delay(error))
+                continue
+            if answer=='':
+                await asyncio.sleep(policy.get_delay())
+        return answer
+    elif 'qwen' in model.lower() or model_type=='vllm':
+        router = get_vllm_router(model,model_config=model_config,model_config_path=model_config_path)
+        answer = ''
+        while answer=='':
+            endpoint = router.acquire()
+            if endpoint is None:
+                if policy.remaining()<=0:
+                    policy.give_up('deadline')
+                await asyncio.sleep(min(router.get_wait_time(),policy.remaining()))
+                continue
+            policy.endpoint = endpoint
+            start_time = time.monotonic()
+            try:
+                vllm_client = get_llm_client(AsyncOpenAI,f"http://{endpoint}/v1","EMPTY",max_retries=0)
+                chat_completion = await vllm_client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    max_tokens=max_length,
+                    temperature=temperature,
+                    tools=tools,
+                    timeout=policy.remaining()
+                )
+            except Exception as error:
+                logger.warning(f'LLM call to {endpoint} failed: {error!r}')
+                router.release(endpoint,error=isinstance(error,ENDPOINT_ERRORS))
+                # The router moves the next attempt to another endpoint if this one is down.
+                await asyncio.sleep(policy.get_delay(error))
+                continue
+            router.release(endpoint,latency=time.monotonic()-start_time)
+            if return_raw_response:
+                answer = chat_completion
             else:
-                claude_tools = convert_openai_tools_to_claude(tools)
-                payload = {
-                    "anthropic_version": "bedrock-2023-05-31",
-                    "messages": updated_messages,
-                    "temperature": temperature,
-                    "top_p": 1.0,
-                    "max_tokens": 4096,
-                    'system': system_message,
-                    'tools': claude_tools
-                }
+                answer = chat_completion.choices[0].message.content
+            if answer=='':
+                await asyncio.sleep(policy.get_delay())
+        return answer
+    elif 'claude' in model.lower():
+        access_token = await asyncio.to_thread(get_claude_token)
+        endpoint = get_claude_endpoint(model)
+        policy.endpoint = endpoint
+        if not payload:
+            payload = build_claude_payload(messages,temperature=temperature,tools=tools,claude_tools=claude_tools)
 
         payload['messages'] = convert_openai_messages_to_claude(payload['messages'])
         headers = {
@@ -427,14 +958,15 @@ def get_llm_response(model,messages,temperature=1.0,return_raw_response=False,to
         answer = ''
         while answer=='':
             try:
-                response = requests.post(endpoint, headers=headers, json=payload)
+                response = await get_async_http_client(endpoint).post(endpoint, headers=headers, json=payload, timeout=policy.remaining())
                 response.raise_for_status()
                 if return_raw_response:
                     answer = response.json()
                 else:
                     answer = response.json()['content'][0]['text']
             except Exception as error:
-                time.sleep(60)
+                await asyncio.sleep(policy.get_delay(error))
+                continue
+            if answer=='':
+                await asyncio.sleep(policy.get_delay())
         return answer
-
-
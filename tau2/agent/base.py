@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC, abstractmethod
 from typing import Generic, Optional, TypeVar
 
@@ -46,6 +47,22 @@ class BaseAgent(ABC, Generic[AgentState]):
         """
         raise NotImplementedError
 
+    async def agenerate_next_message(
+        self, message: ValidAgentInputMessage, state: AgentState
+    ) -> tuple[AssistantMessage, AgentState]:
+        """
+        Async version of generate_next_message.
+        By default, the sync implementation is run in a worker thread.
+        Agents calling an LLM should override this to await the LLM directly.
+        Args:
+            message: The user message or tool message(s).
+            state: The agent state.
+
+        Returns:
+            A tuple of an assistant message and an agent state.
+        """
+        return await asyncio.to_thread(self.generate_next_message, message, state)
+
     @abstractmethod
     def get_init_state(
         self,
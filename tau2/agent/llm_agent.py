@@ -2,7 +2,7 @@ from copy import deepcopy
 from typing import List, Optional
 
 from loguru import logger
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 
 from tau2.agent.base import (
     LocalAgent,
@@ -19,7 +19,7 @@ from tau2.data_model.message import (
 )
 from tau2.data_model.tasks import Action, Task
 from tau2.environment.tool import Tool, as_tool
-from tau2.utils.llm_utils import generate
+from tau2.utils.llm_utils import MessageTokenCounts, agenerate, generate
 
 # AGENT_INSTRUCTION = """
 # You are a customer service agent that either helps the user according to the <policy>, or call_expert such that the user request can be solved by more professionally compared to existing functions.\nIn each turn you can either:\n- Send a message to the user.\n- Make a tool call.\n- call_expert. You cannot do more than one at the same time.
@@ -52,6 +52,12 @@ class LLMAgentState(BaseModel):
 
     system_messages: list[SystemMessage]
     messages: list[APICompatibleMessage]
+    _token_counts: MessageTokenCounts = PrivateAttr(default_factory=MessageTokenCounts)
+
+    @property
+    def token_counts(self) -> MessageTokenCounts:
+        """The token counts of the messages, used to truncate the context."""
+        return self._token_counts
 
 
 class LLMAgent(LocalAgent[LLMAgentState]):
@@ -121,9 +127,37 @@ class LLMAgent(LocalAgent[LLMAgentState]):
             state.messages.append(message)
         messages = state.system_messages + state.messages
         assistant_message = generate(
+            messages=messages,
+            token_counts=state.token_counts,
+            **self._get_generate_args(),
+        )
+        state.messages.append(assistant_message)
+        return assistant_message, state
+
+    async def agenerate_next_message(
+        self, message: ValidAgentInputMessage, state: LLMAgentState
+    ) -> tuple[AssistantMessage, LLMAgentState]:
+        """
+        Respond to a user or tool message, awaiting the LLM.
+        """
+        if isinstance(message, MultiToolMessage):
+            state.messages.extend(message.tool_messages)
+        else:
+            state.messages.append(message)
+        messages = state.system_messages + state.messages
+        assistant_message = await agenerate(
+            messages=messages,
+            token_counts=state.token_counts,
+            **self._get_generate_args(),
+        )
+        state.messages.append(assistant_message)
+        return assistant_message, state
+
+    def _get_generate_args(self) -> dict:
+        """Arguments passed to generate/agenerate, besides the messages."""
+        return dict(
             model=self.llm,
             tools=self.tools,
-            messages=messages,
             role='assistant',
             cur_transfer_dir=self.cur_transfer_dir,
             use_model_tool=self.use_model_tool,
@@ -131,8 +165,6 @@ class LLMAgent(LocalAgent[LLMAgentState]):
             domain=self.domain,
             **self.llm_args,
         )
-        state.messages.append(assistant_message)
-        return assistant_message, state
 
     def set_seed(self, seed: int):
         """Set the seed for the LLM."""
@@ -3,6 +3,8 @@ import sys
 sys.path.append('/lustre/fsw/portfolios/nvr/users/hongjins/tau2-bench-rollout')
 from tau2.config import (
     DEFAULT_AGENT_IMPLEMENTATION,
+    DEFAULT_EVAL_CONCURRENCY,
+    DEFAULT_EVAL_QUEUE_SIZE,
     DEFAULT_LLM_AGENT,
     DEFAULT_LLM_TEMPERATURE_AGENT,
     DEFAULT_LLM_TEMPERATURE_USER,
@@ -11,8 +13,10 @@ from tau2.config import (
     DEFAULT_MAX_CONCURRENCY,
     DEFAULT_MAX_ERRORS,
     DEFAULT_MAX_STEPS,
+    DEFAULT_METRICS_INTERVAL,
     DEFAULT_NUM_TRIALS,
     DEFAULT_SEED,
+    DEFAULT_SIMULATION_TIMEOUT,
     DEFAULT_USER_IMPLEMENTATION,
 )
 from tau2.data_model.simulation import RunConfig
@@ -122,6 +126,12 @@ def main():
         default=DEFAULT_MAX_ERRORS,
         help=f"The maximum number of tool errors allowed in a row in the simulation. Default is {DEFAULT_MAX_ERRORS}.",
     )
+    parser.add_argument(
+        "--simulation-timeout",
+        type=float,
+        default=DEFAULT_SIMULATION_TIMEOUT,
+        help="The number of seconds the LLM calls of a simulation may take, retries included. When exceeded, the simulation ends with termination reason llm_error. If not provided, only each call is bounded.",
+    )
     parser.add_argument(
         "--save-to",
         type=str,
@@ -140,6 +150,48 @@ def main():
         default=DEFAULT_MAX_CONCURRENCY,
         help=f"The maximum number of concurrent simulations to run. Default is {DEFAULT_MAX_CONCURRENCY}.",
     )
+    parser.add_argument(
+        "--eval-concurrency",
+        type=int,
+        default=DEFAULT_EVAL_CONCURRENCY,
+        help=f"The number of processes used to evaluate the simulations. If 0, simulations are evaluated on the conversation threads. Default is {DEFAULT_EVAL_CONCURRENCY}.",
+    )
+    parser.add_argument(
+        "--eval-queue-size",
+        type=int,
+        default=DEFAULT_EVAL_QUEUE_SIZE,
+        help=f"The maximum number of finished conversations waiting for evaluation. Default is {DEFAULT_EVAL_QUEUE_SIZE}.",
+    )
+    parser.add_argument(
+        "--gold-cache-dir",
+        type=str,
+        default=None,
+        help="The directory where the gold environment results are cached, so that they are shared between processes and runs. If not provided, they are only cached in memory.",
+    )
+    parser.add_argument(
+        "--duration-history",
+        type=str,
+        nargs="+",
+        default=None,
+        help="Results logs (directories) or results files of past runs, used to predict the duration of each task and run the longest first.",
+    )
+    parser.add_argument(
+        "--file-order",
+        action="store_true",
+        help="Run the simulations in file order instead of longest-expected-first.",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="Serve the live metrics of the run on http://127.0.0.1:<port>/metrics (Prometheus text format) and /metrics.json.",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        type=str,
+        default=None,
+        help=f"Write the live metrics of the run to this JSON file every {DEFAULT_METRICS_INTERVAL:.0f} seconds.",
+    )
     parser.add_argument(
         "--seed",
         type=int,
@@ -156,6 +208,11 @@ def main():
         "--use_model_tool",
         action='store_true',
     )
+    parser.add_argument(
+        "--use_async",
+        action='store_true',
+        help="Run the simulations as asyncio coroutines instead of threads.",
+    )
     args = parser.parse_args()
     run_domain(
             RunConfig(
@@ -172,15 +229,26 @@ def main():
                 num_trials=args.num_trials,
                 max_steps=args.max_steps,
                 max_errors=args.max_errors,
+                simulation_timeout=args.simulation_timeout,
                 save_to=args.save_to,
                 max_concurrency=args.max_concurrency,
+                eval_concurrency=args.eval_concurrency,
+                eval_queue_size=args.eval_queue_size,
+                gold_cache_dir=args.gold_cache_dir,
+                duration_history=args.duration_history,
+                longest_first=not args.file_order,
+                metrics_port=args.metrics_port,
+                metrics_file=args.metrics_file,
                 seed=args.seed,
                 log_level=args.log_level,
                 task_path=args.task_path,
                 cur_transfer_dir=args.cur_transfer_dir,
                 model_config_path=args.model_config_path,
                 output_file=args.output_file,
-                use_model_tool=args.use_model_tool
+                use_model_tool=args.use_model_tool,
+                use_async=args.use_async,
+                # The results are read from the results log, only keep summaries in memory.
+                keep_messages=False,
             )
         )
     
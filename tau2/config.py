@@ -1,11 +1,24 @@
 # SIMULATION
 DEFAULT_MAX_STEPS = 200
 DEFAULT_MAX_ERRORS = 10
+# Seconds the LLM calls of one simulation may take, retries included. None for no limit.
+DEFAULT_SIMULATION_TIMEOUT = None
 DEFAULT_SEED = 300
 DEFAULT_MAX_CONCURRENCY = 64
+DEFAULT_EVAL_CONCURRENCY = 0
+DEFAULT_EVAL_QUEUE_SIZE = 64
 DEFAULT_NUM_TRIALS = 1
 DEFAULT_SAVE_TO = None
 DEFAULT_LOG_LEVEL = "ERROR"
+# If True, every incremental DB hash is checked against the full hash.
+VERIFY_DB_HASH = False
+# The results log is fsynced every RESULTS_FSYNC_EVERY simulations or RESULTS_FSYNC_INTERVAL seconds.
+RESULTS_FSYNC_EVERY = 32
+RESULTS_FSYNC_INTERVAL = 5.0
+# Live run metrics: seconds between two writes of the metrics file, and number of recent
+# latencies the percentiles are computed over.
+DEFAULT_METRICS_INTERVAL = 10.0
+METRICS_LATENCY_WINDOW = 2048
 
 # LLM
 DEFAULT_AGENT_IMPLEMENTATION = "llm_agent"
@@ -1,9 +1,10 @@
 import json
+import time
 from typing import Literal, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr, field_serializer
 
-from tau2.utils.utils import get_now
+from tau2.utils.utils import format_time_ns
 
 SystemRole = Literal["system"]
 UserRole = Literal["user"]
@@ -12,7 +13,33 @@ ToolRole = Literal["tool"]
 ToolRequestor = Literal["user", "assistant"]
 
 
-class SystemMessage(BaseModel):
+class TimedMessage(BaseModel):
+    """
+    Base of the messages with a timestamp.
+    The creation time of a message is captured with time.time_ns() and only formatted when
+    the message is serialized, unless the timestamp was given. Messages are ordered by their
+    turn_idx, not by their timestamp.
+    """
+
+    _time_ns: int = PrivateAttr(default_factory=time.time_ns)
+
+    def get_timestamp(self) -> str:
+        """The given timestamp of the message, or its creation time."""
+        if self.timestamp is not None:
+            return self.timestamp
+        return format_time_ns(self._time_ns)
+
+    def set_time_now(self):
+        """Reset the creation time of the message (and drop its given timestamp)."""
+        self.timestamp = None
+        self._time_ns = time.time_ns()
+
+    @field_serializer("timestamp", check_fields=False)
+    def _serialize_timestamp(self, timestamp: Optional[str]) -> str:
+        return self.get_timestamp()
+
+
+class SystemMessage(TimedMessage):
     """
     A system message.
     """
@@ -25,7 +52,7 @@ class SystemMessage(BaseModel):
         description="The index of the turn in the conversation.", default=None
     )
     timestamp: Optional[str] = Field(
-        description="The timestamp of the message.", default_factory=get_now
+        description="The timestamp of the message. Defaults to its creation time.", default=None
     )
 
     def __str__(self) -> str:
@@ -34,8 +61,7 @@ class SystemMessage(BaseModel):
         ]
         if self.turn_idx is not None:
             lines.append(f"turn_idx: {self.turn_idx}")
-        if self.timestamp is not None:
-            lines.append(f"timestamp: {self.timestamp}")
+        lines.append(f"timestamp: {self.get_timestamp()}")
         if self.content is not None:
             lines.append(f"content: {self.content}")
         return "\n".join(lines)
@@ -78,7 +104,7 @@ class ToolCall(BaseModel):
         )
 
 
-class ParticipantMessageBase(BaseModel):
+class ParticipantMessageBase(TimedMessage):
     """
     A message from a participant in the conversation.
     if content is None, then tool_calls must be provided
@@ -97,7 +123,7 @@ class ParticipantMessageBase(BaseModel):
         description="The index of the turn in the conversation.", default=None
     )
     timestamp: Optional[str] = Field(
-        description="The timestamp of the message.", default_factory=get_now
+        description="The timestamp of the message. Defaults to its creation time.", default=None
     )
     cost: Optional[float] = Field(description="The cost of the message.", default=None)
 
@@ -137,8 +163,7 @@ class ParticipantMessageBase(BaseModel):
         lines = [f"{self.role.capitalize()}Message"]
         if self.turn_idx is not None:
             lines.append(f"turn_idx: {self.turn_idx}")
-        if self.timestamp is not None:
-            lines.append(f"timestamp: {self.timestamp}")
+        lines.append(f"timestamp: {self.get_timestamp()}")
         if self.content is not None:
             lines.append(f"content: {self.content}")
         if self.tool_calls is not None:
@@ -174,7 +199,7 @@ class UserMessage(ParticipantMessageBase):
     role: UserRole = Field(description="The role of the message sender.")
 
 
-class ToolMessage(BaseModel):
+class ToolMessage(TimedMessage):
     """
     A message from the tool.
     """
@@ -191,15 +216,14 @@ class ToolMessage(BaseModel):
         description="The index of the turn in the conversation.", default=None
     )
     timestamp: Optional[str] = Field(
-        description="The timestamp of the message.", default_factory=get_now
+        description="The timestamp of the message. Defaults to its creation time.", default=None
     )
 
     def __str__(self) -> str:
         lines = [f"ToolMessage (responding to {self.requestor})"]
         if self.turn_idx is not None:
             lines.append(f"turn_idx: {self.turn_idx}")
-        if self.timestamp is not None:
-            lines.append(f"timestamp: {self.timestamp}")
+        lines.append(f"timestamp: {self.get_timestamp()}")
         if self.content is not None:
             lines.append(f"content: {self.content}")
         if self.error:
@@ -1,7 +1,7 @@
 from copy import deepcopy
 from enum import Enum
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional
 
 import pandas as pd
 from pydantic import BaseModel, Field
@@ -12,6 +12,8 @@ from tau2.config import (
     DEFAULT_LLM_ARGS_AGENT,
     DEFAULT_LLM_ARGS_USER,
     DEFAULT_LLM_USER,
+    DEFAULT_EVAL_CONCURRENCY,
+    DEFAULT_EVAL_QUEUE_SIZE,
     DEFAULT_LOG_LEVEL,
     DEFAULT_MAX_CONCURRENCY,
     DEFAULT_MAX_ERRORS,
@@ -19,6 +21,7 @@ from tau2.config import (
     DEFAULT_NUM_TRIALS,
     DEFAULT_SAVE_TO,
     DEFAULT_SEED,
+    DEFAULT_SIMULATION_TIMEOUT,
 )
 from tau2.data_model.message import Message
 from tau2.data_model.tasks import Action, EnvAssertion, RewardType, Task
@@ -153,6 +156,13 @@ class RunConfig(BaseModel):
             default=DEFAULT_MAX_ERRORS,
         ),
     ]
+    simulation_timeout: Annotated[
+        Optional[float],
+        Field(
+            description="The number of seconds the LLM calls of a simulation may take, retries included. If None, only each call is bounded",
+            default=DEFAULT_SIMULATION_TIMEOUT,
+        ),
+    ]
     save_to: Annotated[
         Optional[str],
         Field(
@@ -167,6 +177,62 @@ class RunConfig(BaseModel):
             default=DEFAULT_MAX_CONCURRENCY,
         ),
     ]
+    eval_concurrency: Annotated[
+        int,
+        Field(
+            description="The number of processes used to evaluate the simulations. If 0, simulations are evaluated on the conversation threads",
+            default=DEFAULT_EVAL_CONCURRENCY,
+        ),
+    ]
+    eval_queue_size: Annotated[
+        int,
+        Field(
+            description="The maximum number of finished conversations waiting for evaluation",
+            default=DEFAULT_EVAL_QUEUE_SIZE,
+        ),
+    ]
+    gold_cache_dir: Annotated[
+        Optional[str],
+        Field(
+            description="The directory where the gold environment results are cached. If None, they are only cached in memory",
+            default=None,
+        ),
+    ]
+    duration_history: Annotated[
+        Optional[list[str]],
+        Field(
+            description="Results logs (directories) or results files of past runs, used to predict the duration of each task",
+            default=None,
+        ),
+    ]
+    longest_first: Annotated[
+        bool,
+        Field(
+            description="Whether to run the simulations longest-expected-first instead of in file order",
+            default=True,
+        ),
+    ]
+    keep_messages: Annotated[
+        bool,
+        Field(
+            description="Whether to keep the messages of the simulations in the returned results. If False, only summaries are kept in memory",
+            default=True,
+        ),
+    ]
+    metrics_port: Annotated[
+        Optional[int],
+        Field(
+            description="The local port to serve the live metrics of the run on (/metrics in the Prometheus text format, /metrics.json). If None, they are not served",
+            default=None,
+        ),
+    ]
+    metrics_file: Annotated[
+        Optional[str],
+        Field(
+            description="The JSON file the live metrics of the run are periodically written to. If None, they are not written",
+            default=None,
+        ),
+    ]
     seed: Annotated[
         Optional[int],
         Field(
@@ -188,6 +254,13 @@ class RunConfig(BaseModel):
             default=False,
         ),
     ]
+    use_async: Annotated[
+        bool,
+        Field(
+            description="Run the simulations as asyncio coroutines instead of threads",
+            default=False,
+        ),
+    ]
 
     def validate(self) -> None:
         """
@@ -340,6 +413,48 @@ class TerminationReason(str, Enum):
     AGENT_STOP = "agent_stop"
     MAX_STEPS = "max_steps"
     TOO_MANY_ERRORS = "too_many_errors"
+    LLM_ERROR = "llm_error"
+
+
+class SimulationFailure(BaseModel):
+    """
+    An LLM call that gave up and ended the simulation.
+    """
+
+    error_type: str = Field(description="The type of the error.")
+    message: str = Field(description="The error message.")
+    model: Optional[str] = Field(description="The model that was called.", default=None)
+    reason: Optional[str] = Field(
+        description="Why the call gave up: fatal, max_attempts or deadline.",
+        default=None,
+    )
+    attempts: Optional[int] = Field(description="The number of attempts.", default=None)
+    elapsed: Optional[float] = Field(
+        description="The seconds spent on the call, retries included.", default=None
+    )
+
+
+class TimingSpan(BaseModel):
+    """
+    The wall time of one phase of a simulation (see tau2.utils.tracing).
+    """
+
+    phase: str = Field(
+        description="The phase: initialize, generate, tool_calls, sync_tools, llm_call, get_trajectory or evaluate."
+    )
+    role: Optional[str] = Field(
+        description="The role the phase ran for: agent, user or env.", default=None
+    )
+    step: Optional[int] = Field(
+        description="The step of the orchestrator, if the phase ran during a step.",
+        default=None,
+    )
+    start: float = Field(description="The start of the phase, in seconds since the epoch.")
+    end: float = Field(description="The end of the phase, in seconds since the epoch.")
+    attributes: dict[str, Any] = Field(
+        description="Details of the phase, e.g. model, endpoint, attempts and token counts of LLM calls.",
+        default_factory=dict,
+    )
 
 
 class SimulationRun(BaseModel):
@@ -374,6 +489,13 @@ class SimulationRun(BaseModel):
     seed: Optional[int] = Field(
         description="Seed used for the simulation.", default=None
     )
+    failure: Optional[SimulationFailure] = Field(
+        description="The LLM call that ended the simulation, if termination_reason is llm_error.",
+        default=None,
+    )
+    spans: Optional[list[TimingSpan]] = Field(
+        description="The wall time of the phases of the simulation.", default=None
+    )
 
 
 class Results(BaseModel):
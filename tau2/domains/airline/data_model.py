@@ -1,6 +1,7 @@
+from bisect import bisect_left
 from typing import Annotated, Any, Dict, List, Literal, Optional, Union
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 from tau2.domains.airline.utils import AIRLINE_DB_PATH
 from tau2.environment.db import DB
@@ -246,6 +247,35 @@ class Reservation(BaseModel):
     )
 
 
+# Number of flights indexed, and (origin, date) -> (flight numbers, destinations, departure
+# times, sorted departure times, positions by departure time) of the flights leaving origin
+# on date, in database order.
+Routes = tuple[
+    int,
+    Dict[tuple[str, str], tuple[List[str], List[str], List[str], List[str], List[int]]],
+]
+
+
+def _build_routes(flights: Dict[str, Flight]) -> Routes:
+    """Index the schedule of the flights by origin and date."""
+    routes: Dict[tuple[str, str], List[Flight]] = {}
+    for flight in flights.values():
+        for date in flight.dates:
+            routes.setdefault((flight.origin, date), []).append(flight)
+    index = {}
+    for route, route_flights in routes.items():
+        departure_times = [flight.scheduled_departure_time_est for flight in route_flights]
+        by_time = sorted(range(len(route_flights)), key=departure_times.__getitem__)
+        index[route] = (
+            [flight.flight_number for flight in route_flights],
+            [flight.destination for flight in route_flights],
+            departure_times,
+            [departure_times[i] for i in by_time],
+            by_time,
+        )
+    return len(flights), index
+
+
 class FlightDB(DB):
     """Database of all flights, users, and reservations."""
 
@@ -259,6 +289,75 @@ class FlightDB(DB):
         description="Dictionary of all reservations indexed by reservation ID"
     )
 
+    # Route index of the schedule (see DB and _build_routes), shared by the databases loaded
+    # from the same snapshot. Only the schedule is indexed: status, seats and prices are read
+    # from the flights on every search. The index is stale when the number of flights changes,
+    # or when a flight it returns is gone or no longer matches its entry; a private one is
+    # then built.
+    _routes: Optional[Routes] = PrivateAttr(default=None)
+
+    def _get_routes(self) -> Routes:
+        if self._routes is None:
+            if self._snapshot is not None:
+                self._routes = self._snapshot.get_index(
+                    "routes", lambda db: _build_routes(db.flights)
+                )
+            else:
+                self._routes = _build_routes(self.flights)
+        if self._routes[0] != len(self.flights):
+            self._routes = _build_routes(self.flights)
+        return self._routes
+
+    def _get_route(
+        self,
+        origin: str,
+        date: str,
+        destination: Optional[str],
+        leave_after: Optional[str],
+    ) -> Optional[List[Flight]]:
+        """Get the flights of a route from the index, or None if the index is stale."""
+        route = self._get_routes()[1].get((origin, date))
+        if route is None:
+            return []
+        flight_numbers, destinations, departure_times, sorted_times, by_time = route
+        if leave_after is None:
+            positions = range(len(flight_numbers))
+        else:
+            positions = sorted(by_time[bisect_left(sorted_times, leave_after) :])
+        flights = []
+        for i in positions:
+            if destination is not None and destinations[i] != destination:
+                continue
+            flight = self.flights.get(flight_numbers[i])
+            if (
+                flight is None
+                or flight.origin != origin
+                or flight.destination != destinations[i]
+                or flight.scheduled_departure_time_est != departure_times[i]
+                or date not in flight.dates
+            ):
+                return None
+            flights.append(flight)
+        return flights
+
+    def find_flights(
+        self,
+        origin: str,
+        date: str,
+        destination: Optional[str] = None,
+        leave_after: Optional[str] = None,
+    ) -> List[Flight]:
+        """
+        Get the flights leaving origin on date, whatever their status, in database order.
+        If given, only the flights to destination, and scheduled to depart at or after
+        leave_after, are returned.
+        """
+        flights = self._get_route(origin, date, destination, leave_after)
+        if flights is None:
+            self._routes = _build_routes(self.flights)
+            flights = self._get_route(origin, date, destination, leave_after)
+        return flights
+
     def get_statistics(self) -> dict[str, Any]:
         """Get the statistics of the database."""
         num_flights = len(self.flights)
@@ -1,5 +1,6 @@
 """Toolkit for the airline reservation system."""
 
+from bisect import bisect_left
 from copy import deepcopy
 from typing import List, Optional
 
@@ -116,30 +117,37 @@ class AirlineTools(ToolKitBase):  # Tools
             destination: The destination city airport in three letters, such as 'LAX'.
             leave_after: The time to leave after the flight, such as '15:00:00'.
         """
-        results = []
-        for flight in self.db.flights.values():
-            check = (
-                (origin is None or flight.origin == origin)
-                and (destination is None or flight.destination == destination)
-                and (date in flight.dates)
-                and (flight.dates[date].status == "available")
+        if origin is None:
+            flights = [
+                flight
+                for flight in self.db.flights.values()
+                if (destination is None or flight.destination == destination)
+                and date in flight.dates
                 and (
                     leave_after is None
                     or flight.scheduled_departure_time_est >= leave_after
                 )
+            ]
+        else:
+            flights = self.db.find_flights(
+                origin, date, destination=destination, leave_after=leave_after
             )
-            if check:
-                direct_flight = DirectFlight(
-                    flight_number=flight.flight_number,
-                    origin=flight.origin,
-                    destination=flight.destination,
-                    status="available",
-                    scheduled_departure_time_est=flight.scheduled_departure_time_est,
-                    scheduled_arrival_time_est=flight.scheduled_arrival_time_est,
-                    available_seats=flight.dates[date].available_seats,
-                    prices=flight.dates[date].prices,
-                )
-                results.append(direct_flight)
+        results = []
+        for flight in flights:
+            flight_date = flight.dates[date]
+            if flight_date.status != "available":
+                continue
+            direct_flight = DirectFlight(
+                flight_number=flight.flight_number,
+                origin=flight.origin,
+                destination=flight.destination,
+                status="available",
+                scheduled_departure_time_est=flight.scheduled_departure_time_est,
+                scheduled_arrival_time_est=flight.scheduled_arrival_time_est,
+                available_seats=flight_date.available_seats,
+                prices=flight_date.prices,
+            )
+            results.append(direct_flight)
         return results
 
     def _payment_for_update(
@@ -464,6 +472,9 @@ class AirlineTools(ToolKitBase):  # Tools
             A list of pairs of DirectFlight objects.
         """
         results = []
+        # Second legs to the destination by (connecting airport, date), in database order,
+        # with their departure times sorted and their positions by departure time.
+        connections = {}
         for result1 in self._search_direct_flight(
             date=date, origin=origin, destination=None
         ):
@@ -474,14 +485,26 @@ class AirlineTools(ToolKitBase):  # Tools
                 else date
             )
             # TODO: flight1.scheduled_arrival_time_est could have a +1?
-            for result2 in self._search_direct_flight(
-                date=date2,
-                origin=result1.destination,
-                destination=destination,
-                leave_after=result1.scheduled_arrival_time_est,
-            ):
-                result2.date = date2
-                results.append([result1, result2])
+            connection = (result1.destination, date2)
+            if connection not in connections:
+                legs = self._search_direct_flight(
+                    date=date2, origin=result1.destination, destination=destination
+                )
+                for result2 in legs:
+                    result2.date = date2
+                by_time = sorted(
+                    range(len(legs)),
+                    key=lambda i: legs[i].scheduled_departure_time_est,
+                )
+                connections[connection] = (
+                    [legs[i].scheduled_departure_time_est for i in by_time],
+                    by_time,
+                    legs,
+                )
+            departure_times, by_time, legs = connections[connection]
+            start = bisect_left(departure_times, result1.scheduled_arrival_time_est)
+            for i in sorted(by_time[start:]):
+                results.append([result1, legs[i]])
         return results
 
     @is_tool(ToolType.WRITE)
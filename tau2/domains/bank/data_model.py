@@ -1,6 +1,8 @@
-from typing import Any, Dict, List, Literal, Optional, Union
+import math
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List, Literal, Optional, Tuple, Union
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 from tau2.environment.db import DB
 
@@ -439,6 +441,151 @@ class BankDB(DB):
         description="Dictionary of all beneficiaries indexed by beneficiary ID"
     )
 
+    # Owner indexes (see DB): maps "accounts" or "cards" -> ID -> client ID. An index is stale
+    # when an ID is not found, or not owned by the indexed client.
+    _owners: Dict[str, Dict[str, str]] = PrivateAttr(default_factory=dict)
+    # Transaction index (see DB): maps account ID -> (keys, transaction IDs) of the transactions
+    # of the account, sorted by key. The key of a transaction is its timestamp and its position
+    # in the transactions (negated), so that reading the index backwards gives the newest first
+    # and keeps the insertion order of equal timestamps, as a stable sort would. Transactions
+    # are added by add_transaction. The index is stale when the number of transactions changes
+    # otherwise, or when a transaction it returns no longer matches its key.
+    _account_transactions: Dict[str, Tuple[List[Tuple[str, int]], List[str]]] = (
+        PrivateAttr(default_factory=dict)
+    )
+    _transaction_positions: Dict[str, int] = PrivateAttr(default_factory=dict)
+    _num_indexed_transactions: Optional[int] = PrivateAttr(default=None)
+
+    def _build_owners(self, collection: str) -> Dict[str, str]:
+        owners = {}
+        for client_id, client in self.clients.items():
+            for key in getattr(client, collection):
+                owners.setdefault(key, client_id)
+        self._owners[collection] = owners
+        return owners
+
+    def _find_owned(self, collection: str, key: str) -> Optional[Tuple[str, Any]]:
+        client_id = self._owners.get(collection, {}).get(key)
+        if client_id is not None:
+            client = self.clients.get(client_id)
+            if client is not None and key in getattr(client, collection):
+                return client_id, getattr(client, collection)[key]
+        client_id = self._build_owners(collection).get(key)
+        if client_id is None:
+            return None
+        return client_id, getattr(self.clients[client_id], collection)[key]
+
+    def find_account(self, account_id: str) -> Optional[Tuple[str, Account]]:
+        """Get the client ID and the account with account_id, or None."""
+        return self._find_owned("accounts", account_id)
+
+    def find_card(self, card_id: str) -> Optional[Tuple[str, Card]]:
+        """Get the client ID and the card with card_id, or None."""
+        return self._find_owned("cards", card_id)
+
+    def _build_account_transactions(self) -> None:
+        self._account_transactions = {}
+        self._transaction_positions = {}
+        for i, (transaction_id, transaction) in enumerate(self.transactions.items()):
+            self._transaction_positions[transaction_id] = i
+            keys, transaction_ids = self._account_transactions.setdefault(
+                transaction.account_id, ([], [])
+            )
+            keys.append((transaction.timestamp, -i))
+            transaction_ids.append(transaction_id)
+        for account_id, (keys, transaction_ids) in self._account_transactions.items():
+            order = sorted(range(len(keys)), key=keys.__getitem__)
+            self._account_transactions[account_id] = (
+                [keys[i] for i in order],
+                [transaction_ids[i] for i in order],
+            )
+        self._num_indexed_transactions = len(self.transactions)
+
+    def add_transaction(self, transaction: Transaction) -> None:
+        """
+        Add a transaction to the database, or replace the one with the same ID, and update
+        the transaction index.
+        """
+        transaction_id = transaction.transaction_id
+        replaced = self.transactions.get(transaction_id)
+        indexed = self._num_indexed_transactions == len(self.transactions)
+        self.transactions[transaction_id] = transaction
+        if not indexed:
+            # The index is rebuilt on next use.
+            return
+        if replaced is not None:
+            # The transaction keeps the position of the one it replaces.
+            position = self._transaction_positions[transaction_id]
+            keys, transaction_ids = self._account_transactions[replaced.account_id]
+            i = bisect_left(keys, (replaced.timestamp, -position))
+            if i == len(keys) or transaction_ids[i] != transaction_id:
+                self._num_indexed_transactions = None
+                return
+            del keys[i], transaction_ids[i]
+        else:
+            position = self._num_indexed_transactions
+            self._transaction_positions[transaction_id] = position
+            self._num_indexed_transactions += 1
+        key = (transaction.timestamp, -position)
+        keys, transaction_ids = self._account_transactions.setdefault(
+            transaction.account_id, ([], [])
+        )
+        i = bisect_left(keys, key)
+        keys.insert(i, key)
+        transaction_ids.insert(i, transaction_id)
+
+    def _get_account_transactions(
+        self,
+        account_id: str,
+        start_date: Optional[str],
+        end_date: Optional[str],
+        statuses: Optional[Tuple[str, ...]],
+        limit: Optional[int],
+    ) -> Optional[List[Transaction]]:
+        """Get the transactions of an account from the index, or None if it is stale."""
+        keys, transaction_ids = self._account_transactions.get(account_id, ([], []))
+        start = bisect_left(keys, (start_date,)) if start_date else 0
+        end = bisect_right(keys, (end_date, math.inf)) if end_date else len(keys)
+        results = []
+        for i in range(end - 1, start - 1, -1):
+            if limit is not None and len(results) >= limit:
+                break
+            transaction = self.transactions.get(transaction_ids[i])
+            if (
+                transaction is None
+                or transaction.account_id != account_id
+                or transaction.timestamp != keys[i][0]
+            ):
+                return None
+            if statuses is None or transaction.status in statuses:
+                results.append(transaction)
+        return results
+
+    def find_account_transactions(
+        self,
+        account_id: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        statuses: Optional[Tuple[str, ...]] = None,
+        limit: Optional[int] = None,
+    ) -> List[Transaction]:
+        """
+        Get the transactions of an account, newest first (in insertion order for equal
+        timestamps). If given, only the transactions with a timestamp between start_date and
+        end_date (inclusive) and one of statuses are returned, at most limit of them.
+        """
+        if self._num_indexed_transactions != len(self.transactions):
+            self._build_account_transactions()
+        transactions = self._get_account_transactions(
+            account_id, start_date, end_date, statuses, limit
+        )
+        if transactions is None:
+            self._build_account_transactions()
+            transactions = self._get_account_transactions(
+                account_id, start_date, end_date, statuses, limit
+            )
+        return transactions
+
     def get_statistics(self) -> dict[str, Any]:
         """Get the statistics of the bank database."""
         num_clients = len(self.clients)
@@ -39,6 +39,8 @@ class BankTools(ToolKitBase):
     """
 
     db: BankDB
+    # Transactions and verifications are stamped with the current time (see _now).
+    deterministic = False
 
     def __init__(self, db: BankDB) -> None:
         super().__init__(db)
@@ -53,10 +55,10 @@ class BankTools(ToolKitBase):
         return self.db.clients[client_id]
 
     def _get_account_by_id(self, account_id: str) -> Tuple[str, Account]:
-        for cid, client in self.db.clients.items():
-            if account_id in client.accounts:
-                return cid, client.accounts[account_id]
-        raise ValueError("Account not found")
+        found = self.db.find_account(account_id)
+        if found is None:
+            raise ValueError("Account not found")
+        return found
 
     def _get_account(self, client_id: str, account_id: str) -> Account:
         client = self._get_client(client_id)
@@ -65,10 +67,10 @@ class BankTools(ToolKitBase):
         return client.accounts[account_id]
 
     def _get_card_by_id(self, card_id: str) -> Tuple[str, Card]:
-        for cid, client in self.db.clients.items():
-            if card_id in client.cards:
-                return cid, client.cards[card_id]
-        raise ValueError("Card not found")
+        found = self.db.find_card(card_id)
+        if found is None:
+            raise ValueError("Card not found")
+        return found
 
     def _get_loan(self, loan_id: str) -> Loan:
         if loan_id not in self.db.loans:
@@ -308,13 +310,9 @@ class BankTools(ToolKitBase):
             ValueError: If the account is not found.
         """
         _, _ = self._get_account_by_id(account_id)  # validate existence
-        txs = [
-            tx
-            for tx in self.db.transactions.values()
-            if tx.account_id == account_id and tx.status in ("posted", "pending")
-        ]
-        txs.sort(key=lambda t: t.timestamp, reverse=True)
-        return txs[: max(0, limit)]
+        return self.db.find_account_transactions(
+            account_id, statuses=("posted", "pending"), limit=max(0, limit)
+        )
 
     @is_tool(ToolType.READ)
     def search_transactions(
@@ -352,13 +350,6 @@ class BankTools(ToolKitBase):
         account = self._get_account(client_id, account_id)
         _ = account  # ensure ownership
 
-        def in_range(ts: str) -> bool:
-            if start_date and ts < start_date:
-                return False
-            if end_date and ts > end_date:
-                return False
-            return True
-
         def amount_ok(a: float) -> bool:
             if min_amount is not None and a < min_amount:
                 return False
@@ -369,11 +360,10 @@ class BankTools(ToolKitBase):
         m_sub = merchant_name_contains.lower() if merchant_name_contains else None
 
         results = []
-        for tx in self.db.transactions.values():
-            if tx.account_id != account_id:
-                continue
-            if not in_range(tx.timestamp):
-                continue
+        # Newest first, only the transactions in the date range are read.
+        for tx in self.db.find_account_transactions(
+            account_id, start_date=start_date, end_date=end_date
+        ):
             if not amount_ok(tx.amount):
                 continue
             if transaction_type and tx.type != transaction_type:
@@ -385,8 +375,6 @@ class BankTools(ToolKitBase):
                 if mname.find(m_sub) == -1:
                     continue
             results.append(tx)
-
-        results.sort(key=lambda t: t.timestamp, reverse=True)
         return results
 
     # -------------------------
@@ -495,8 +483,8 @@ class BankTools(ToolKitBase):
         tx_out.related_transaction_id = tx_id_in
 
         # Save
-        self.db.transactions[tx_id_out] = tx_out
-        self.db.transactions[tx_id_in] = tx_in
+        self.db.add_transaction(tx_out)
+        self.db.add_transaction(tx_in)
 
         return [tx_out, tx_in]
 
@@ -713,7 +701,7 @@ class BankTools(ToolKitBase):
             related_transaction_id=None,
             balance_after=acc.balance.current,
         )
-        self.db.transactions[tx_id] = tx
+        self.db.add_transaction(tx)
         return tx
 
     @is_tool(ToolType.WRITE)
@@ -871,7 +859,7 @@ class BankTools(ToolKitBase):
             related_transaction_id=None,
             balance_after=acc.balance.current,
         )
-        self.db.transactions[tx_id] = tx
+        self.db.add_transaction(tx)
 
         # Update loan repayment history (simplified allocation)
         loan.repayment_history.append(
@@ -1,4 +1,3 @@
-import json
 from typing import Optional
 
 from tau2.data_model.tasks import Task
@@ -11,20 +10,21 @@ from tau2.domains.mock.utils import (
     MOCK_TASK_SET_PATH,
 )
 from tau2.environment.environment import Environment
+from tau2.utils import load_text_snapshot
+from tau2.utils.task_store import load_tasks_from_file
 
 
 def get_environment(
     db: Optional[MockDB] = None, solo_mode: bool = False
 ) -> Environment:
     if db is None:
-        db = MockDB.load(MOCK_DB_PATH)
+        db = MockDB.load_snapshot(MOCK_DB_PATH, domain="mock")
     tools = MockTools(db)
     if not solo_mode:
         policy_path = MOCK_POLICY_PATH
     else:
         policy_path = MOCK_POLICY_SOLO_PATH
-    with open(policy_path, "r") as fp:
-        policy = fp.read()
+    policy = load_text_snapshot(policy_path)
     env = Environment(
         domain_name="mock",
         policy=policy,
@@ -35,7 +35,11 @@ def get_environment(
     return env
 
 
-def get_tasks() -> list[Task]:
-    with open(MOCK_TASK_SET_PATH, "r") as fp:
-        tasks = json.load(fp)
-    return [Task.model_validate(task) for task in tasks]
+def get_tasks(
+    task_path: Optional[str] = None,
+    task_ids: Optional[list[str]] = None,
+    num_tasks: Optional[int] = None,
+) -> list[Task]:
+    return load_tasks_from_file(
+        task_path or MOCK_TASK_SET_PATH, task_ids=task_ids, num_tasks=num_tasks
+    )
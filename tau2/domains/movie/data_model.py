@@ -1,6 +1,6 @@
-from typing import Annotated, Any, Dict, List, Literal, Optional, Union
+from typing import Annotated, Any, Dict, FrozenSet, List, Literal, Optional, Tuple, Union
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 from tau2.environment.db import DB
 
@@ -311,6 +311,89 @@ class MovieTheaterDB(DB):
         description="Dictionary of all bookings indexed by booking ID"
     )
 
+    # Booked-seat index (see DB): maps (theater ID, show ID) -> booking ID -> seat IDs of the
+    # confirmed bookings of the show. Bookings are added and updated by add_booking and
+    # index_booking. The index is stale when the number of bookings changes otherwise, or when
+    # a booking it returns no longer matches its entry.
+    _show_bookings: Dict[Tuple[str, str], Dict[str, Tuple[str, ...]]] = PrivateAttr(
+        default_factory=dict
+    )
+    _num_indexed_bookings: Optional[int] = PrivateAttr(default=None)
+    # Seat IDs of each seat map, by seat map identity. The tools never change seat maps.
+    _seat_ids: Dict[int, Tuple[SeatMap, FrozenSet[str]]] = PrivateAttr(
+        default_factory=dict
+    )
+
+    def get_seat_ids(self, auditorium: Auditorium) -> FrozenSet[str]:
+        """Get the IDs of all the seats of an auditorium."""
+        seat_map = auditorium.seat_map
+        cached = self._seat_ids.get(id(seat_map))
+        if cached is not None and cached[0] is seat_map:
+            return cached[1]
+        seat_ids = frozenset(
+            seat.seat_id for seats in seat_map.rows.values() for seat in seats
+        )
+        self._seat_ids[id(seat_map)] = (seat_map, seat_ids)
+        return seat_ids
+
+    def _build_show_bookings(self) -> None:
+        self._show_bookings = {}
+        for booking in self.bookings.values():
+            self._index_booking(booking)
+        self._num_indexed_bookings = len(self.bookings)
+
+    def _index_booking(self, booking: Booking) -> None:
+        show_bookings = self._show_bookings.setdefault(
+            (booking.theater_id, booking.show_id), {}
+        )
+        if booking.status == "confirmed":
+            show_bookings[booking.booking_id] = tuple(s.seat_id for s in booking.seats)
+        else:
+            show_bookings.pop(booking.booking_id, None)
+
+    def add_booking(self, booking: Booking) -> None:
+        """Add a booking to the database, and to the booked-seat index."""
+        indexed = (
+            self._num_indexed_bookings == len(self.bookings)
+            and booking.booking_id not in self.bookings
+        )
+        self.bookings[booking.booking_id] = booking
+        if indexed:
+            self._index_booking(booking)
+            self._num_indexed_bookings += 1
+
+    def index_booking(self, booking: Booking) -> None:
+        """Update the booked-seat index after the status or the seats of a booking changed."""
+        if self._num_indexed_bookings == len(self.bookings):
+            self._index_booking(booking)
+
+    def _get_booked_seats(self, theater_id: str, show_id: str) -> Optional[set[str]]:
+        """Get the booked seats of a show from the index, or None if it is stale."""
+        seat_ids: set[str] = set()
+        for booking_id, booked in self._show_bookings.get((theater_id, show_id), {}).items():
+            booking = self.bookings.get(booking_id)
+            if (
+                booking is None
+                or booking.status != "confirmed"
+                or booking.theater_id != theater_id
+                or booking.show_id != show_id
+                or len(booking.seats) != len(booked)
+                or any(s.seat_id != seat_id for s, seat_id in zip(booking.seats, booked))
+            ):
+                return None
+            seat_ids.update(booked)
+        return seat_ids
+
+    def find_booked_seats(self, theater_id: str, show_id: str) -> set[str]:
+        """Get the IDs of the seats of the confirmed bookings of a show."""
+        if self._num_indexed_bookings != len(self.bookings):
+            self._build_show_bookings()
+        seat_ids = self._get_booked_seats(theater_id, show_id)
+        if seat_ids is None:
+            self._build_show_bookings()
+            seat_ids = self._get_booked_seats(theater_id, show_id)
+        return seat_ids
+
     def get_statistics(self) -> dict[str, Any]:
         """Get the statistics of the movie theater database."""
         num_movies = len(self.movies)
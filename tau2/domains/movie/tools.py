@@ -1,5 +1,5 @@
 from copy import deepcopy
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
 
 from loguru import logger
 
@@ -99,24 +99,14 @@ class MovieTheaterTools(ToolKitBase):
         # start_time_local format: YY-MM-DD-HH-MM
         return "-".join(show.start_time_local.split("-")[0:3])
 
-    def _list_all_seat_ids(self, auditorium: Auditorium) -> Set[str]:
-        seat_ids: Set[str] = set()
-        for row_id, seats in auditorium.seat_map.rows.items():
-            for seat in seats:
-                seat_ids.add(seat.seat_id)
-        return seat_ids
+    def _list_all_seat_ids(self, auditorium: Auditorium) -> FrozenSet[str]:
+        return self.db.get_seat_ids(auditorium)
 
     def _booked_seats_for_show(self, theater_id: str, show_id: str) -> Set[str]:
         """
         Seats already booked for this show (only confirmed bookings count).
         """
-        seat_ids: Set[str] = set()
-        for booking in self.db.bookings.values():
-            if booking.theater_id == theater_id and booking.show_id == show_id:
-                if booking.status == "confirmed":
-                    for s in booking.seats:
-                        seat_ids.add(s.seat_id)
-        return seat_ids
+        return self.db.find_booked_seats(theater_id, show_id)
 
     def _validate_seats_exist(self, auditorium: Auditorium, seat_ids: Set[str]) -> None:
         all_seats = self._list_all_seat_ids(auditorium)
@@ -446,7 +436,7 @@ class MovieTheaterTools(ToolKitBase):
         )
 
         # Save
-        self.db.bookings[booking_id] = booking
+        self.db.add_booking(booking)
         return booking
 
     @is_tool(ToolType.WRITE)
@@ -478,6 +468,7 @@ class MovieTheaterTools(ToolKitBase):
 
         booking.status = "canceled"
         booking.canceled_at = self._now_str()
+        self.db.index_booking(booking)
         logger.warning("Seat release is implicit via availability calculation (ignores canceled bookings).")
         return booking
 
@@ -570,6 +561,7 @@ class MovieTheaterTools(ToolKitBase):
         booking.totals.tax_total = new_tax_total
         booking.totals.grand_total = new_grand_total
         booking.totals.amount_due = round(booking.totals.grand_total - booking.totals.amount_paid, 2)
+        self.db.index_booking(booking)
 
         return booking
 
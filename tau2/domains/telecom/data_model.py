@@ -2,7 +2,7 @@ import datetime
 from enum import Enum
 from typing import Any, Dict, List, Optional
 
-from pydantic import Field
+from pydantic import Field, PrivateAttr
 
 from tau2.domains.telecom.utils import TELECOM_DB_PATH
 from tau2.environment.db import DB
@@ -227,6 +227,65 @@ class TelecomDB(DB):
         default_factory=list, description="All devices in the system"
     )
 
+    # Secondary indexes (see DB): maps (collection, key field) -> key -> position. An index is
+    # stale when a key is not found, or found on another record. Keys are assumed to be unique.
+    _indexes: Dict[tuple[str, str], Dict[str, int]] = PrivateAttr(default_factory=dict)
+
+    def _build_index(self, collection: str, key_field: str) -> Dict[str, int]:
+        index = {}
+        for i, record in enumerate(getattr(self, collection)):
+            index.setdefault(getattr(record, key_field), i)
+        self._indexes[(collection, key_field)] = index
+        return index
+
+    def find(self, collection: str, key_field: str, key: str) -> Optional[Any]:
+        """
+        Get the first record of a collection whose key_field is key, or None.
+        Records are accessed by position, so the DB hasher sees which ones are touched.
+        """
+        records = getattr(self, collection)
+        index = self._indexes.get((collection, key_field))
+        if index is not None:
+            position = index.get(key)
+            if position is not None and position < len(records):
+                record = records[position]
+                if getattr(record, key_field) == key:
+                    return record
+        position = self._build_index(collection, key_field).get(key)
+        return records[position] if position is not None else None
+
+    def find_customer_by_phone(self, phone_number: str) -> Optional[Customer]:
+        """
+        Get the first customer whose primary phone number or one of whose lines has
+        phone_number, or None.
+        """
+        index = self._indexes.get(("customers", "phone_number"))
+        if index is not None:
+            position = index.get(phone_number)
+            if position is not None and position < len(self.customers):
+                customer = self.customers[position]
+                if self._has_phone_number(customer, phone_number):
+                    return customer
+        index = {}
+        for i, customer in enumerate(self.customers):
+            index.setdefault(customer.phone_number, i)
+            for line_id in customer.line_ids:
+                line = self.find("lines", "line_id", line_id)
+                if line is not None:
+                    index.setdefault(line.phone_number, i)
+        self._indexes[("customers", "phone_number")] = index
+        position = index.get(phone_number)
+        return self.customers[position] if position is not None else None
+
+    def _has_phone_number(self, customer: Customer, phone_number: str) -> bool:
+        if customer.phone_number == phone_number:
+            return True
+        for line_id in customer.line_ids:
+            line = self.find("lines", "line_id", line_id)
+            if line is not None and line.phone_number == phone_number:
+                return True
+        return False
+
     def get_statistics(self) -> Dict[str, Any]:
         """Get the statistics of the database."""
         num_plans = len(self.plans)
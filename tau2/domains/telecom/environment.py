@@ -1,8 +1,6 @@
 # Copyright Sierra
 from functools import partial
 from typing import Optional
-import os
-import json
 from tau2.data_model.tasks import Task
 from tau2.domains.telecom.data_model import LineStatus, TelecomDB
 from tau2.domains.telecom.tools import TelecomTools
@@ -22,7 +20,8 @@ from tau2.domains.telecom.utils import (
     TELECOM_USER_DB_PATH,
 )
 from tau2.environment.environment import Environment
-from tau2.utils import load_file
+from tau2.utils import load_file, load_text_snapshot
+from tau2.utils.task_store import load_tasks_from_file
 
 
 class TelecomEnvironment(Environment):
@@ -42,7 +41,16 @@ class TelecomEnvironment(Environment):
         """
         Sync the tools with the user's surroundings.
         If the line is roaming enabled, then the user is allowed to roam.
+        Skipped if no WRITE tool or environment function ran since the last sync: the
+        surroundings only depend on the two databases, and syncing twice changes nothing.
         """
+        if not self.tools_changed_since_sync():
+            return
+        self._sync_tools()
+        # Writes made by the sync itself (paid bills) do not require another sync.
+        self.mark_tools_synced()
+
+    def _sync_tools(self):
         if self.user_tools.db.surroundings.phone_number is None:
             return
         phone_number = self.user_tools.db.surroundings.phone_number
@@ -78,7 +86,8 @@ class TelecomEnvironment(Environment):
         current_payment_request = self.user_tools.db.surroundings.payment_request
         if current_payment_request is not None:
             if current_payment_request.paid:
-                self.tools._set_bill_to_paid(current_payment_request.bill_id)
+                with self.tools.db_write_scope():
+                    self.tools._set_bill_to_paid(current_payment_request.bill_id)
                 self.user_tools.db.surroundings.payment_request = None
 
         # Check if the user has a payment request
@@ -102,10 +111,10 @@ def get_environment(
     policy_type: str = "manual",  # "manual" or "workflow"
 ) -> TelecomEnvironment:
     if db is None:
-        db = TelecomDB.load(TELECOM_DB_PATH)
+        db = TelecomDB.load_snapshot(TELECOM_DB_PATH, domain="telecom")
     tools = TelecomTools(db)
     if user_db is None:
-        user_db = TelecomUserDB.load(TELECOM_USER_DB_PATH)
+        user_db = TelecomUserDB.load_snapshot(TELECOM_USER_DB_PATH, domain="telecom")
     user_tools = TelecomUserTools(user_db)
     if not solo_mode:
         policy_path = TELECOM_MAIN_POLICY_PATH
@@ -123,8 +132,8 @@ def get_environment(
             tech_support_policy_path = TELECOM_TECH_SUPPORT_POLICY_WORKFLOW_SOLO_PATH
         else:
             raise ValueError(f"Invalid policy type: {policy_type}")
-    main_policy = load_file(policy_path)
-    tech_support_policy = load_file(tech_support_policy_path)
+    main_policy = load_text_snapshot(policy_path)
+    tech_support_policy = load_text_snapshot(tech_support_policy_path)
     policy = (
         "<main_policy>\n"
         + main_policy
@@ -171,38 +180,14 @@ def get_tasks_small() -> list[Task]:
 # def get_tasks() -> list[Task]:
 #     return load_tasks(TELECOM_TASK_SET_PATH)
 
-def get_tasks(task_path,save_to) -> list[Task]:
-    print(f"Load tasks from {task_path}")
-    with open(task_path, "r") as fp:
-        tasks = json.load(fp)
-    tasks_dict = {}
-    for t in tasks:
-        tasks_dict[t['id']] = t
-    save_dir = str(save_to)
-    assert save_dir.endswith('.json'),f"{save_dir}"
-    save_dir = save_dir[:-len('.json')]
-    processed_task_ids = set()
-    if os.path.isdir(save_dir):
-        for subfile in os.listdir(save_dir):
-            if subfile.endswith('.json'):
-                try:
-                    with open(os.path.join(save_dir,subfile)) as f:
-                        o = json.load(f)
-                    processed_task_ids.add(o['task_id'])
-                except:
-                    continue
-    updated_tasks = []
-    for k,v in tasks_dict.items():
-        if not k in processed_task_ids:
-            updated_tasks.append(v)
-    print("Total tasks:",len(tasks))
-    print("Tasks to run:",len(updated_tasks))
-    tasks = updated_tasks
-    # print(37,tasks[0])
-    return_tasks = [Task.model_validate(task) for task in tasks]
-    # print(39,return_tasks[0])
-    # exit(0)
-    return return_tasks
+def get_tasks(
+    task_path,
+    task_ids: Optional[list[str]] = None,
+    num_tasks: Optional[int] = None,
+) -> list[Task]:
+    return load_tasks_from_file(
+        task_path, task_ids=task_ids, num_tasks=num_tasks
+    )
 
 
 if __name__ == "__main__":
@@ -56,17 +56,9 @@ class TelecomTools(ToolKitBase):
         Returns:
             Customer object if found, None otherwise.
         """
-        # Check primary contact number
-        for customer in self.db.customers:
-            if customer.phone_number == phone_number:
-                return customer
-
-            # Check lines
-            for line_id in customer.line_ids:
-                line = self._get_line_by_id(line_id)
-                if line and line.phone_number == phone_number:
-                    return customer
-
+        customer = self.db.find_customer_by_phone(phone_number)
+        if customer is not None:
+            return customer
         raise ValueError(f"Customer with phone number {phone_number} not found")
 
     @is_tool(ToolType.READ)
@@ -80,10 +72,9 @@ class TelecomTools(ToolKitBase):
         Returns:
             Customer object if found, None otherwise.
         """
-        for customer in self.db.customers:
-            if customer.customer_id == customer_id:
-                return customer
-
+        customer = self.db.find("customers", "customer_id", customer_id)
+        if customer is not None:
+            return customer
         raise ValueError(f"Customer with ID {customer_id} not found")
 
     @is_tool(ToolType.READ)
@@ -124,9 +115,9 @@ class TelecomTools(ToolKitBase):
         Raises:
             ValueError: If the line with the specified phone number is not found.
         """
-        for line in self.db.lines:
-            if line.phone_number == phone_number:
-                return line
+        line = self.db.find("lines", "phone_number", phone_number)
+        if line is not None:
+            return line
         raise ValueError(f"Line with phone number {phone_number} not found")
 
     # Helper method to get a line by ID
@@ -143,9 +134,9 @@ class TelecomTools(ToolKitBase):
         Raises:
             ValueError: If the line with the specified ID is not found.
         """
-        for line in self.db.lines:
-            if line.line_id == line_id:
-                return line
+        line = self.db.find("lines", "line_id", line_id)
+        if line is not None:
+            return line
         raise ValueError(f"Line with ID {line_id} not found")
 
     # Helper method to get a plan by ID
@@ -162,9 +153,9 @@ class TelecomTools(ToolKitBase):
         Raises:
             ValueError: If the plan with the specified ID is not found.
         """
-        for plan in self.db.plans:
-            if plan.plan_id == plan_id:
-                return plan
+        plan = self.db.find("plans", "plan_id", plan_id)
+        if plan is not None:
+            return plan
         raise ValueError(f"Plan with ID {plan_id} not found")
 
     # Helper method to get a device by ID
@@ -181,9 +172,9 @@ class TelecomTools(ToolKitBase):
         Raises:
             ValueError: If the device with the specified ID is not found.
         """
-        for device in self.db.devices:
-            if device.device_id == device_id:
-                return device
+        device = self.db.find("devices", "device_id", device_id)
+        if device is not None:
+            return device
         raise ValueError(f"Device with ID {device_id} not found")
 
     # Helper method to get a bill by ID
@@ -200,9 +191,9 @@ class TelecomTools(ToolKitBase):
         Raises:
             ValueError: If the bill with the specified ID is not found.
         """
-        for bill in self.db.bills:
-            if bill.bill_id == bill_id:
-                return bill
+        bill = self.db.find("bills", "bill_id", bill_id)
+        if bill is not None:
+            return bill
         raise ValueError(f"Bill with ID {bill_id} not found")
 
     def _get_target_line(self, customer_id: str, line_id: str) -> Line:
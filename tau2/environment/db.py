@@ -1,21 +1,108 @@
-from typing import Any, Optional
+import os
+import pickle
+import threading
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from pydantic import PrivateAttr
 
 from tau2.utils import dump_file, get_pydantic_hash, load_file
 from tau2.utils.pydantic_utils import BaseModelNoExtra
 
 
+class DBSnapshot:
+    """A parsed database file, shared by all the databases loaded from it."""
+
+    def __init__(self, path: str, mtime: float, data: bytes):
+        self.path = path
+        self.mtime = mtime
+        # The pickled database.
+        self.data = data
+        # JSON of the records of the database, computed on first use by tau2.environment.db_hash.
+        self.fragments: Optional[dict] = None
+        # Read-only indexes of the records of the database, built on first use by get_index.
+        self.indexes: dict[str, Any] = {}
+
+    def get_index(self, name: str, build: Callable[["DB"], Any]) -> Any:
+        """
+        Get an index of the snapshot, shared by all the databases loaded from it.
+        Built once per snapshot, by calling build on a pristine copy of the snapshot.
+        The index must never be modified.
+        """
+        index = self.indexes.get(name)
+        if index is None:
+            with _DB_SNAPSHOT_INDEXES_LOCK:
+                index = self.indexes.get(name)
+                if index is None:
+                    index = build(pickle.loads(self.data))
+                    self.indexes[name] = index
+        return index
+
+
+# Process-wide cache of parsed databases.
+# Maps (domain, resolved path) -> snapshot.
+_DB_SNAPSHOTS: dict[tuple[str, str], DBSnapshot] = {}
+_DB_SNAPSHOTS_LOCK = threading.Lock()
+_DB_SNAPSHOT_INDEXES_LOCK = threading.Lock()
+
+
 class DB(BaseModelNoExtra):
     """Domain database.
 
     This is a base class for all domain databases.
+
+    A database may keep indexes of its records in private attributes, so that lookups do not
+    scan a whole collection. Indexes are built on first use and must stay consistent with any
+    write to the database, whether made by a tool, by update_db or directly: a lookup checks
+    the records it returns against their index entries, and an index found stale is rebuilt
+    from the records. Indexes of data the tools never change can be shared read-only by all
+    the databases loaded from a snapshot, see DBSnapshot.get_index.
     """
 
+    # The snapshot this database was loaded from, if it was loaded with load_snapshot.
+    _snapshot: Optional[DBSnapshot] = PrivateAttr(default=None)
+
     @classmethod
     def load(cls, path: str) -> "DB":
         """Load the database from a structured file like JSON, YAML, or TOML."""
         data = load_file(path)
         return cls.model_validate(data)
 
+    @classmethod
+    def load_snapshot(cls, path: str | Path, domain: Optional[str] = None) -> "DB":
+        """Load the database through the process-wide snapshot cache.
+
+        The file is parsed and validated once per (domain, path, mtime). Every call
+        returns a fresh, isolated copy of the snapshot, so writes made by one
+        simulation never leak into another.
+        """
+        domain = domain or cls.__name__
+        path = str(Path(path).resolve())
+        mtime = os.path.getmtime(path)
+        key = (domain, path)
+        with _DB_SNAPSHOTS_LOCK:
+            snapshot = _DB_SNAPSHOTS.get(key)
+            if snapshot is None or snapshot.mtime != mtime:
+                # NOTE: Unpickling is much cheaper than re-parsing and re-validating
+                # the file, and gives a deep copy that shares nothing with the snapshot.
+                snapshot = DBSnapshot(path, mtime, pickle.dumps(cls.load(path)))
+                _DB_SNAPSHOTS[key] = snapshot
+        db = pickle.loads(snapshot.data)
+        if not isinstance(db, cls):
+            raise TypeError(
+                f"Snapshot for {key} is a {type(db).__name__}, expected {cls.__name__}"
+            )
+        db._snapshot = snapshot
+        return db
+
+    def __getstate__(self) -> dict[str, Any]:
+        # Do not pickle the snapshot along with the database.
+        state = super().__getstate__()
+        private = state.get("__pydantic_private__")
+        if private and private.get("_snapshot") is not None:
+            state["__pydantic_private__"] = {**private, "_snapshot": None}
+        return state
+
     def dump(self, path: str, exclude_defaults: bool = False, **kwargs: Any) -> None:
         """Dump the database to a file."""
         data = self.model_dump(exclude_defaults=exclude_defaults)
@@ -34,6 +121,12 @@ class DB(BaseModelNoExtra):
         return {}
 
 
+def clear_db_snapshots() -> None:
+    """Drop all the cached database snapshots of this process."""
+    with _DB_SNAPSHOTS_LOCK:
+        _DB_SNAPSHOTS.clear()
+
+
 def get_db_json_schema(db: Optional[DB] = None) -> dict[str, Any]:
     """Get the JSONschema of the database."""
     if db is None:
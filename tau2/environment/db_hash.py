@@ -0,0 +1,453 @@
+"""
+Incremental hashing of domain databases.
+
+`get_dict_hash(db.model_dump())` serializes the whole database every time a hash is needed.
+`DBHasher` produces exactly the same digest, but keeps the JSON of every record of the
+top-level collections (dict and list fields of the DB) and only re-serializes the records
+that were touched inside a write scope (WRITE tool calls, environment functions, update_db).
+The JSON of the records of a snapshot (see `DB.load_snapshot`) is computed once per process
+and shared by all the databases loaded from it.
+
+Records are marked as touched when they are looked up, iterated over or replaced through the
+collection while a write scope is open. Mutations made outside of a write scope are not seen,
+so code that writes to the DB outside of a tool call must open one with `db_write_scope`.
+Use `verify=True` to check the incremental hash against the full hash.
+"""
+
+import hashlib
+import json
+import pickle
+import threading
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional, get_args, get_origin
+
+from pydantic import TypeAdapter
+
+from tau2.environment.db import DB, DBSnapshot
+from tau2.utils import get_dict_hash
+
+# Maps (DB class, field name) -> TypeAdapter of the records of the collection.
+_RECORD_ADAPTERS: dict[tuple[type, str], Optional[TypeAdapter]] = {}
+_SNAPSHOT_FRAGMENTS_LOCK = threading.Lock()
+
+
+def _dumps(obj: Any) -> str:
+    """Serialize an object like `get_dict_hash` does."""
+    return json.dumps(obj, sort_keys=True, default=str)
+
+
+def _get_collection_type(db_class: type[DB], name: str) -> Optional[type]:
+    """Get `dict` or `list` if the field is a collection of records, else None."""
+    annotation = db_class.model_fields[name].annotation
+    origin = get_origin(annotation)
+    args = get_args(annotation)
+    if origin is dict and len(args) == 2 and args[0] is str:
+        return dict
+    if origin is list and len(args) == 1:
+        return list
+    return None
+
+
+def _get_record_adapter(db_class: type[DB], name: str) -> Optional[TypeAdapter]:
+    """Get the TypeAdapter of the records of a collection field, or None if the field is not a collection."""
+    key = (db_class, name)
+    if key not in _RECORD_ADAPTERS:
+        adapter = None
+        if _get_collection_type(db_class, name) is not None:
+            adapter = TypeAdapter(get_args(db_class.model_fields[name].annotation)[-1])
+        _RECORD_ADAPTERS[key] = adapter
+    return _RECORD_ADAPTERS[key]
+
+
+def _record_fragment(adapter: TypeAdapter, collection_type: type, key: Any, record: Any) -> str:
+    """
+    Get the JSON of one record, as it appears in the JSON of the whole DB.
+    For dicts, this is the `"key": value` pair.
+    """
+    if collection_type is dict:
+        return _dumps({key: adapter.dump_python(record)})[1:-1]
+    return _dumps(adapter.dump_python(record))
+
+
+def _collection_fragments(db: DB, name: str) -> Optional[dict | list]:
+    """Get the JSON of every record of a collection field."""
+    adapter = _get_record_adapter(type(db), name)
+    if adapter is None:
+        return None
+    value = getattr(db, name)
+    if isinstance(value, dict):
+        return {k: _record_fragment(adapter, dict, k, v) for k, v in dict.items(value)}
+    if isinstance(value, list):
+        return [_record_fragment(adapter, list, i, v) for i, v in enumerate(list.__iter__(value))]
+    return None
+
+
+def get_snapshot_fragments(snapshot: DBSnapshot) -> dict[str, dict | list]:
+    """
+    Get the JSON of every record of the collections of a DB snapshot.
+    Computed once per snapshot, from a pristine copy of the snapshot.
+    """
+    if snapshot.fragments is None:
+        with _SNAPSHOT_FRAGMENTS_LOCK:
+            if snapshot.fragments is None:
+                db = pickle.loads(snapshot.data)
+                fragments = {}
+                for name in type(db).model_fields:
+                    field_fragments = _collection_fragments(db, name)
+                    if field_fragments is not None:
+                        fragments[name] = field_fragments
+                snapshot.fragments = fragments
+    return snapshot.fragments
+
+
+class _CollectionState:
+    """Cached JSON of the records of one collection."""
+
+    def __init__(self, collection_type: type, adapter: TypeAdapter, base: Optional[dict | list]):
+        self.collection_type = collection_type
+        self.adapter = adapter
+        # JSON of the records of the snapshot, shared between databases. Never modified.
+        self.base = base
+        # JSON of the records serialized by this hasher.
+        self.own: dict[Any, str] = {}
+        # Records touched since the last hash.
+        self.dirty: set = set()
+        self.all_dirty = False
+        self.container = None
+
+    def mark(self, key: Any):
+        self.dirty.add(key)
+
+    def mark_all(self):
+        self.all_dirty = True
+
+    def get_fragment(self, key: Any, record: Any) -> str:
+        if key not in self.dirty:
+            fragment = self.own.get(key)
+            if fragment is not None:
+                return fragment
+            if self.base is not None:
+                if self.collection_type is dict:
+                    fragment = self.base.get(key)
+                elif key < len(self.base):
+                    fragment = self.base[key]
+                if fragment is not None:
+                    return fragment
+        fragment = _record_fragment(self.adapter, self.collection_type, key, record)
+        self.own[key] = fragment
+        return fragment
+
+    def to_json(self) -> str:
+        if self.all_dirty:
+            self.own = {}
+            self.base = None
+            self.all_dirty = False
+        container = self.container
+        if self.collection_type is dict:
+            fragments = [
+                self.get_fragment(key, dict.__getitem__(container, key))
+                for key in sorted(dict.keys(container))
+            ]
+            json_str = "{" + ", ".join(fragments) + "}"
+        else:
+            fragments = [
+                self.get_fragment(i, record)
+                for i, record in enumerate(list.__iter__(container))
+            ]
+            json_str = "[" + ", ".join(fragments) + "]"
+        self.dirty.clear()
+        return json_str
+
+
+class _TrackedDict(dict):
+    """Dict collection of a DB that reports the records touched inside a write scope."""
+
+    def __init__(self, data: dict, hasher: "DBHasher", state: _CollectionState):
+        super().__init__(data)
+        self._hasher = hasher
+        self._state = state
+
+    def _mark(self, key: Any):
+        if self._hasher.depth:
+            self._state.mark(key)
+
+    def _mark_all(self):
+        if self._hasher.depth:
+            self._state.mark_all()
+
+    def __getitem__(self, key):
+        self._mark(key)
+        return dict.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        self._mark(key)
+        return dict.get(self, key, default)
+
+    def __setitem__(self, key, value):
+        self._mark(key)
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        self._mark(key)
+        dict.__delitem__(self, key)
+
+    def pop(self, key, *args):
+        self._mark(key)
+        return dict.pop(self, key, *args)
+
+    def setdefault(self, key, default=None):
+        self._mark(key)
+        return dict.setdefault(self, key, default)
+
+    def popitem(self):
+        self._mark_all()
+        return dict.popitem(self)
+
+    def clear(self):
+        self._mark_all()
+        dict.clear(self)
+
+    def update(self, *args, **kwargs):
+        self._mark_all()
+        dict.update(self, *args, **kwargs)
+
+    def __ior__(self, other):
+        self._mark_all()
+        return dict.__ior__(self, other)
+
+    def copy(self):
+        self._mark_all()
+        return dict.copy(self)
+
+    def __iter__(self):
+        # NOTE: Overriding __iter__ disables the C fast paths of dict(d) and {**d},
+        # which then go through __getitem__.
+        return dict.__iter__(self)
+
+    def values(self):
+        if self._hasher.depth:
+            return _TrackedView(self, items=False)
+        return dict.values(self)
+
+    def items(self):
+        if self._hasher.depth:
+            return _TrackedView(self, items=True)
+        return dict.items(self)
+
+    def __reduce_ex__(self, protocol):
+        return (dict, (list(dict.items(self)),))
+
+
+class _TrackedView:
+    """View over the values or items of a _TrackedDict, marking the records as they are iterated over."""
+
+    def __init__(self, container: _TrackedDict, items: bool):
+        self._container = container
+        self._items = items
+
+    def __len__(self) -> int:
+        return dict.__len__(self._container)
+
+    def __iter__(self) -> Iterator:
+        state = self._container._state
+        for key, value in dict.items(self._container):
+            state.mark(key)
+            yield (key, value) if self._items else value
+
+
+class _TrackedList(list):
+    """List collection of a DB that reports the records touched inside a write scope."""
+
+    def __init__(self, data: list, hasher: "DBHasher", state: _CollectionState):
+        super().__init__(data)
+        self._hasher = hasher
+        self._state = state
+
+    def _mark(self, index: int):
+        if self._hasher.depth:
+            if index < 0:
+                index += list.__len__(self)
+            self._state.mark(index)
+
+    def _mark_all(self):
+        if self._hasher.depth:
+            self._state.mark_all()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            if self._hasher.depth:
+                for i in range(*index.indices(list.__len__(self))):
+                    self._state.mark(i)
+        else:
+            self._mark(index)
+        return list.__getitem__(self, index)
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            self._mark_all()
+        else:
+            self._mark(index)
+        list.__setitem__(self, index, value)
+
+    def __iter__(self):
+        if not self._hasher.depth:
+            return list.__iter__(self)
+        return self._iter_marked()
+
+    def _iter_marked(self) -> Iterator:
+        state = self._state
+        for i, value in enumerate(list.__iter__(self)):
+            state.mark(i)
+            yield value
+
+    def __reversed__(self):
+        self._mark_all()
+        return list.__reversed__(self)
+
+    def copy(self):
+        self._mark_all()
+        return list.copy(self)
+
+    # Operations that move records to other indices invalidate the whole collection.
+    # Appending does not: the new indices have no cached JSON.
+    def __delitem__(self, index):
+        self._mark_all()
+        list.__delitem__(self, index)
+
+    def insert(self, index, value):
+        self._mark_all()
+        list.insert(self, index, value)
+
+    def pop(self, index=-1):
+        self._mark_all()
+        return list.pop(self, index)
+
+    def remove(self, value):
+        self._mark_all()
+        list.remove(self, value)
+
+    def clear(self):
+        self._mark_all()
+        list.clear(self)
+
+    def sort(self, *args, **kwargs):
+        self._mark_all()
+        list.sort(self, *args, **kwargs)
+
+    def reverse(self):
+        self._mark_all()
+        list.reverse(self)
+
+    def __imul__(self, n):
+        self._mark_all()
+        return list.__imul__(self, n)
+
+    def __reduce_ex__(self, protocol):
+        return (list, (list(list.__iter__(self)),))
+
+
+class DBHasher:
+    """
+    Computes the same hash as `get_dict_hash(db.model_dump())`, re-serializing only the
+    records touched inside a write scope since the last hash.
+    """
+
+    def __init__(self, db: DB, base: Optional[dict[str, dict | list]] = None):
+        """
+        Args:
+            db: The database to hash. Its collections are replaced by tracked copies.
+            base: The JSON of the records of the snapshot the database was loaded from.
+                Defaults to the snapshot of `db`, if any.
+        """
+        if base is None and db._snapshot is not None:
+            base = get_snapshot_fragments(db._snapshot)
+        self.db = db
+        self.depth = 0
+        self._collections: dict[str, _CollectionState] = {}
+        for name in type(db).model_fields:
+            adapter = _get_record_adapter(type(db), name)
+            if adapter is None:
+                continue
+            collection_type = _get_collection_type(type(db), name)
+            state = _CollectionState(
+                collection_type, adapter, base.get(name) if base else None
+            )
+            self._collections[name] = state
+            self._track(name, state)
+
+    def _track(self, name: str, state: _CollectionState):
+        """Replace a collection of the DB by a tracked copy."""
+        value = getattr(self.db, name)
+        if state.collection_type is dict and isinstance(value, dict):
+            container = _TrackedDict(value, self, state)
+        elif state.collection_type is list and isinstance(value, list):
+            container = _TrackedList(value, self, state)
+        else:
+            container = None
+        if container is not None:
+            # NOTE: Bypass pydantic so that the container is not converted back.
+            self.db.__dict__[name] = container
+        state.container = container
+
+    @contextmanager
+    def write_scope(self):
+        """Record the records touched inside the scope."""
+        self.depth += 1
+        try:
+            yield
+        finally:
+            self.depth -= 1
+
+    def rebind(self, db: DB, update_data: dict[str, Any]) -> "DBHasher":
+        """
+        Get a hasher for the result of `update_pydantic_model_with_dict(self.db, update_data)`.
+        Only the records listed in update_data are re-serialized.
+        """
+        hasher = DBHasher.__new__(DBHasher)
+        hasher.db = db
+        hasher.depth = 0
+        hasher._collections = {}
+        for name, state in self._collections.items():
+            if name in update_data:
+                if state.collection_type is dict and isinstance(update_data[name], dict):
+                    state.dirty.update(update_data[name].keys())
+                else:
+                    state.mark_all()
+            hasher._collections[name] = state
+            hasher._track(name, state)
+        return hasher
+
+    def to_json(self) -> str:
+        """Get `json.dumps(db.model_dump(), sort_keys=True, default=str)`."""
+        fields = []
+        for name in sorted(type(self.db).model_fields):
+            state = self._collections.get(name)
+            if state is not None and self.db.__dict__.get(name) is not state.container:
+                # The collection was replaced (e.g. `db.users = {...}`).
+                state.mark_all()
+                self._track(name, state)
+            if state is not None and state.container is not None:
+                value = state.to_json()
+            else:
+                value = _dumps(self.db.model_dump(include={name})[name])
+            fields.append(_dumps(name) + ": " + value)
+        return "{" + ", ".join(fields) + "}"
+
+    def get_hash(self, verify: bool = False) -> str:
+        """
+        Get the hash of the database.
+        Args:
+            verify: If True, also compute the full hash and raise a ValueError if they differ.
+        """
+        json_str = self.to_json()
+        db_hash = hashlib.sha256(json_str.encode()).hexdigest()
+        if verify:
+            full_hash = get_dict_hash(self.db.model_dump())
+            if db_hash != full_hash:
+                full = self.db.model_dump()
+                incremental = json.loads(json_str)
+                fields = [name for name in full if _dumps(full[name]) != _dumps(incremental.get(name))]
+                raise ValueError(
+                    f"Incremental hash of {type(self.db).__name__} differs from the full hash. Fields: {fields}"
+                )
+        return db_hash
@@ -60,6 +60,8 @@ class Environment:
         self.solo_mode = solo_mode
         if self.solo_mode:
             self.validate_solo_mode()
+        # Databases and their versions at the end of the last sync_tools.
+        self._synced_db_versions: Optional[list[tuple[Any, int]]] = None
         self.sync_tools()
 
     def get_domain_name(self) -> str:
@@ -161,9 +163,37 @@ class Environment:
         """
         Sync the user and assistant tools.
         Subclass should override this method if tools need to be synced.
+        Subclasses can skip syncing when tools_changed_since_sync() is False.
         """
         pass
 
+    def _get_db_versions(self) -> list[tuple[Any, int]]:
+        return [
+            (tool_kit.db, tool_kit.get_db_version())
+            for tool_kit in (self.tools, self.user_tools)
+            if tool_kit is not None
+        ]
+
+    def tools_changed_since_sync(self) -> bool:
+        """
+        Whether the databases of the tools may have been modified since the last call to
+        mark_tools_synced, i.e. whether a WRITE tool, an environment function or update_db
+        was run, or a database was replaced.
+        """
+        if self._synced_db_versions is None:
+            return True
+        versions = self._get_db_versions()
+        return len(versions) != len(self._synced_db_versions) or any(
+            db is not synced_db or version != synced_version
+            for (db, version), (synced_db, synced_version) in zip(
+                versions, self._synced_db_versions
+            )
+        )
+
+    def mark_tools_synced(self):
+        """Record that the tools are in sync with the current state of the databases."""
+        self._synced_db_versions = self._get_db_versions()
+
     def run_env_function_call(self, env_function_call: EnvFunctionCall) -> Any:
         """
         Runs any function available on agent environment or user environment.
@@ -179,7 +209,8 @@ class Environment:
         func = getattr(tool_kit, func_name)
         if func is None:
             raise ValueError(f"Function {func_name} not found in {env_type} tools")
-        res = func(**env_function_call.arguments)
+        with tool_kit.db_write_scope():
+            res = func(**env_function_call.arguments)
         self.sync_tools()
         return res
 
@@ -74,6 +74,8 @@ class Tool(BaseTool):
         self._use_short_desc = use_short_desc
         self._predefined = predefined
         self._func = func
+        self._openai_schema = None
+        self._claude_schema = None
         self.__name__ = name
         self.__signature__ = sig  # type: ignore
         self.__doc__ = doc  # overwrite the doc string
@@ -138,15 +140,43 @@ class Tool(BaseTool):
     @override
     @property
     def openai_schema(self) -> dict:
-        """Get the OpenAI schema of the tool."""
-        return {
-            "type": "function",
-            "function": {
-                "name": self.name,
-                "description": self._get_description(),
-                "parameters": self.params.model_json_schema(),
-            },
-        }
+        """Get the OpenAI schema of the tool.
+        The schema is computed once and shared with the copies made by `bind`.
+        Callers must not modify it.
+        """
+        if self._openai_schema is None:
+            self._openai_schema = {
+                "type": "function",
+                "function": {
+                    "name": self.name,
+                    "description": self._get_description(),
+                    "parameters": self.params.model_json_schema(),
+                },
+            }
+        return self._openai_schema
+
+    @property
+    def claude_schema(self) -> dict:
+        """Get the Claude schema of the tool.
+        Like the OpenAI schema, it is computed once and shared with the copies made by `bind`.
+        """
+        if self._claude_schema is None:
+            function = self.openai_schema["function"]
+            self._claude_schema = {
+                "name": function["name"],
+                "description": function["description"],
+                "input_schema": function["parameters"],
+            }
+        return self._claude_schema
+
+    def bind(self, func: Callable) -> "Tool":
+        """Get a copy of the tool that calls `func` instead.
+        The description, parameters and schemas are shared with this tool, so `func`
+        must have the same signature and docstring as the function of this tool.
+        """
+        tool = self.model_copy()
+        tool._func = func
+        return tool
 
     def to_str(self) -> str:
         """Represent the tool as a string."""
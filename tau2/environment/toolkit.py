@@ -1,9 +1,13 @@
+import threading
+from contextlib import contextmanager
 from enum import Enum
 from typing import Annotated, Any, Callable, Dict, Optional, TypeVar
 
 from pydantic import BaseModel, Field
 
+from tau2.config import VERIFY_DB_HASH
 from tau2.environment.db import DB
+from tau2.environment.db_hash import DBHasher
 from tau2.environment.tool import Tool, as_tool
 from tau2.utils import get_dict_hash, update_pydantic_model_with_dict
 
@@ -33,14 +37,18 @@ class ToolKitType(type):
         #     print('\n\n')
         #     raise ValueError('debug')
 
+        cls._own_func_tools = func_tools
+        all_func_tools = func_tools.copy()
+        for base in cls.__mro__[1:]:
+            if isinstance(base, ToolKitType):
+                all_func_tools.update(base._own_func_tools)
+        # Tool objects built from the first instance, shared by all the instances of the class.
+        cls._class_tools = None
+        cls._class_tools_lock = threading.Lock()
+
         @property
         def _func_tools(self) -> Dict[str, Callable]:
             """Get the tools available in the ToolKit."""
-            all_func_tools = func_tools.copy()
-            try:
-                all_func_tools.update(super(cls, self)._func_tools)
-            except AttributeError:
-                pass
             return all_func_tools
 
         cls._func_tools = _func_tools
@@ -73,34 +81,65 @@ def is_tool(tool_type: ToolType = ToolType.READ):
 class ToolKitBase(metaclass=ToolKitType):
     """Base class for ToolKit classes."""
 
+    # Whether the tools give the same database for the same calls. Tools that read the wall
+    # clock are not, and the end state of their gold environment is not cached.
+    deterministic: bool = True
+
     def __init__(self, db: Optional[T] = None):
         self.db: Optional[T] = db
 
     @property
     def tools(self) -> Dict[str, Callable]:
         """Get the tools available in the ToolKit."""
-        return_tools = {name: getattr(self, name) for name in self._func_tools.keys()}
-        # print(75,return_tools)
-        # exit(0)
+        # Bound methods are created once per instance.
+        return_tools = self.__dict__.get("_bound_tools")
+        if return_tools is None:
+            return_tools = {name: getattr(self, name) for name in self._func_tools.keys()}
+            self._bound_tools = return_tools
         return return_tools
 
     def use_tool(self, tool_name: str, **kwargs) -> str:
         """Use a tool."""
-        if tool_name not in self.tools:
+        tool = self.tools.get(tool_name)
+        if tool is None:
             raise ValueError(f"Tool '{tool_name}' not found.")
-        return self.tools[tool_name](**kwargs)
+        if getattr(tool, TOOL_TYPE_ATTR) in (ToolType.READ, ToolType.THINK):
+            return tool(**kwargs)
+        with self.db_write_scope():
+            return tool(**kwargs)
 
     def get_tools(self) -> Dict[str, Tool]:
         """Get the tools available in the ToolKit.
         Uses the `as_tool` to convert the functions to Tool objects.
+        The Tool objects are built once per ToolKit class and bound to each instance.
 
         Returns:
             A dictionary of tools available in the ToolKit.
         """
-        # NOTE: as_tool needs to get the function (self.foo), not the `foo(self, ...)`
-        # Otherwise, the `self` will exists in the arguments.
-        # Therefore, it needs to be called with getattr(self, name)
-        return {name: as_tool(tool) for name, tool in self.tools.items()}
+        tool_objects = self.__dict__.get("_tool_objects")
+        if tool_objects is None:
+            class_tools = self._get_class_tools()
+            tool_objects = {
+                name: class_tools[name].bind(tool) for name, tool in self.tools.items()
+            }
+            self._tool_objects = tool_objects
+        return tool_objects
+
+    def _get_class_tools(self) -> Dict[str, Tool]:
+        """Get the Tool objects of the ToolKit class, building them on first use."""
+        cls = type(self)
+        if cls._class_tools is None:
+            with cls._class_tools_lock:
+                if cls._class_tools is None:
+                    # NOTE: as_tool needs to get the function (self.foo), not the `foo(self, ...)`
+                    # Otherwise, the `self` will exists in the arguments.
+                    # Therefore, it needs to be called with getattr(self, name)
+                    class_tools = {name: as_tool(tool) for name, tool in self.tools.items()}
+                    for tool in class_tools.values():
+                        tool.openai_schema
+                        tool.claude_schema
+                    cls._class_tools = class_tools
+        return cls._class_tools
 
     def has_tool(self, tool_name: str) -> bool:
         """Check if a tool exists in the ToolKit."""
@@ -139,11 +178,53 @@ class ToolKitBase(metaclass=ToolKitType):
             update_data = {}
         if self.db is None:
             raise ValueError("Database has not been initialized.")
+        db_hasher = self._get_db_hasher()
         self.db = update_pydantic_model_with_dict(self.db, update_data)
+        self._db_hasher = db_hasher.rebind(self.db, update_data)
+        self._db_version = self.get_db_version() + 1
 
-    def get_db_hash(self) -> str:
-        """Get the hash of the database."""
-        return get_dict_hash(self.db.model_dump())
+    @contextmanager
+    def db_write_scope(self):
+        """
+        Scope in which the database may be modified.
+        The records touched inside the scope are re-hashed by get_db_hash, and the version of
+        the database is incremented when the scope is closed.
+        WRITE tools called with use_tool are run in a write scope.
+        """
+        if self.db is None:
+            yield
+            return
+        try:
+            with self._get_db_hasher().write_scope():
+                yield
+        finally:
+            self._db_version = self.get_db_version() + 1
+
+    def get_db_version(self) -> int:
+        """
+        Get the version of the database: the number of write scopes closed and update_db calls
+        so far. The database is not modified as long as its version does not change (and the
+        database object is not replaced), as long as it is only written inside write scopes.
+        """
+        return self.__dict__.get("_db_version", 0)
+
+    def _get_db_hasher(self) -> DBHasher:
+        """Get the incremental hasher of the database, creating it if the database was replaced."""
+        db_hasher = self.__dict__.get("_db_hasher")
+        if db_hasher is None or db_hasher.db is not self.db:
+            db_hasher = DBHasher(self.db)
+            self._db_hasher = db_hasher
+        return db_hasher
+
+    def get_db_hash(self, verify: bool = VERIFY_DB_HASH) -> str:
+        """Get the hash of the database.
+        Same as get_dict_hash(self.db.model_dump()), but only the records modified since the
+        database was loaded are serialized.
+
+        Args:
+            verify: If True, check the result against the full hash.
+        """
+        return self._get_db_hasher().get_hash(verify=verify)
 
 
 class ToolSignature(BaseModel):
@@ -167,14 +248,18 @@ def get_tool_signatures(tools: ToolKitBase) -> dict[str, ToolSignature]:
     Returns:
         A dictionary of tool signatures.
     """
-    signatures = {}
-    for name, tool in tools.get_tools().items():
-        signatures[name] = ToolSignature(
-            name=name,
-            doc=str(tool),
-            params=tool._serialize_params(tool.params),
-            returns=tool._serialize_returns(tool.returns),
-        )
+    cls = type(tools)
+    signatures = cls.__dict__.get("_class_tool_signatures")
+    if signatures is None:
+        signatures = {}
+        for name, tool in tools.get_tools().items():
+            signatures[name] = ToolSignature(
+                name=name,
+                doc=str(tool),
+                params=tool._serialize_params(tool.params),
+                returns=tool._serialize_returns(tool.returns),
+            )
+        cls._class_tool_signatures = signatures
     return signatures
 
 
@@ -184,7 +269,7 @@ def get_tool_types(tools: ToolKitBase) -> dict[str, ToolType]:
     Returns:
         A dictionary of tool types.
     """
-    return {name: tools.tool_type(name) for name in tools.get_tools().keys()}
+    return {name: tools.tool_type(name) for name in tools.tools.keys()}
 
 
 class GenericToolKit(ToolKitBase):
@@ -1,4 +1,5 @@
 from enum import Enum
+from typing import Optional
 
 from tau2.data_model.simulation import RewardInfo, SimulationRun, TerminationReason
 from tau2.data_model.tasks import RewardType, Task
@@ -23,14 +24,17 @@ def evaluate_simulation(
     evaluation_type: EvaluationType,
     solo_mode: bool,
     domain: str,
+    gold_cache_dir: Optional[str] = None,
 ) -> RewardInfo:
     """
     Evaluate the simulation based on the evaluation type.
+    gold_cache_dir is the directory where the gold environment results are cached (in memory only if None).
     """
     # print(30,'eval simulation')
     if simulation.termination_reason in {
         TerminationReason.TOO_MANY_ERRORS,
         TerminationReason.MAX_STEPS,
+        TerminationReason.LLM_ERROR,
     }:
         return RewardInfo(
             reward=0.0,
@@ -49,6 +53,7 @@ def evaluate_simulation(
             task=task,
             full_trajectory=simulation.messages,
             solo_mode=solo_mode,
+            gold_cache_dir=gold_cache_dir,
         )
     elif evaluation_type == EvaluationType.NL_ASSERTIONS:
         reward_info = NLAssertionsEvaluator.calculate_reward(
@@ -72,6 +77,7 @@ def evaluate_simulation(
             task=task,
             full_trajectory=simulation.messages,
             solo_mode=solo_mode,
+            gold_cache_dir=gold_cache_dir,
         )
         action_reward_info = ActionEvaluator.calculate_reward(
             task=task,
@@ -1,12 +1,171 @@
-from typing import Callable
+import os
+import threading
+from typing import Callable, Optional
 
 from loguru import logger
+from pydantic import BaseModel
 
 from tau2.data_model.message import AssistantMessage, Message, ToolCall, UserMessage
 from tau2.data_model.simulation import DBCheck, EnvAssertionCheck, RewardInfo
 from tau2.data_model.tasks import RewardType, Task
 from tau2.environment.environment import Environment
 from tau2.evaluator.evaluator_base import EvaluatorBase
+from tau2.utils import get_dict_hash
+
+
+class GoldEnvironmentResult(BaseModel):
+    """The end state of the gold environment of a task."""
+
+    agent_db_hash: Optional[str]
+    user_db_hash: Optional[str]
+    action_errors: list[str] = []
+
+
+class GoldEnvironmentCache:
+    """
+    Cache of the gold environment results.
+    The gold environment only depends on the task and on the domain data, so it is shared
+    by all the trials of a task. Results are kept in memory, and in cache_dir if provided,
+    so that they are shared between processes and runs.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = cache_dir
+        self._results: dict[str, GoldEnvironmentResult] = {}
+        self._lock = threading.Lock()
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _get_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[GoldEnvironmentResult]:
+        with self._lock:
+            result = self._results.get(key)
+        if result is None and self.cache_dir is not None:
+            path = self._get_path(key)
+            if os.path.exists(path):
+                with open(path, "r") as fp:
+                    result = GoldEnvironmentResult.model_validate_json(fp.read())
+                with self._lock:
+                    self._results[key] = result
+        return result
+
+    def put(self, key: str, result: GoldEnvironmentResult):
+        with self._lock:
+            self._results[key] = result
+        if self.cache_dir is not None:
+            path = self._get_path(key)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as fp:
+                fp.write(result.model_dump_json())
+            os.replace(tmp_path, path)
+
+
+# Process-wide caches, by cache directory.
+_GOLD_ENVIRONMENT_CACHES: dict[Optional[str], GoldEnvironmentCache] = {}
+# Maps environment constructor name -> (database files, hashes of a fresh environment), where
+# the database files are the (path, mtime) the databases were loaded from. The hashes are None
+# if the gold environment cannot be cached.
+_ENVIRONMENT_FINGERPRINTS: dict[str, tuple[tuple[tuple[str, float], ...], Optional[str]]] = {}
+_GOLD_ENVIRONMENT_CACHES_LOCK = threading.Lock()
+
+
+def get_gold_environment_cache(cache_dir: Optional[str] = None) -> GoldEnvironmentCache:
+    """Get the process-wide gold environment cache stored in cache_dir (in memory only if None)."""
+    with _GOLD_ENVIRONMENT_CACHES_LOCK:
+        cache = _GOLD_ENVIRONMENT_CACHES.get(cache_dir)
+        if cache is None:
+            cache = GoldEnvironmentCache(cache_dir)
+            _GOLD_ENVIRONMENT_CACHES[cache_dir] = cache
+    return cache
+
+
+def _get_db_files(environment: Environment) -> Optional[tuple[tuple[str, float], ...]]:
+    """Get the (path, mtime) of the database files of an environment, None if not known."""
+    db_files = []
+    for toolkit in (environment.tools, environment.user_tools):
+        if toolkit is None or toolkit.db is None:
+            continue
+        snapshot = toolkit.db._snapshot
+        if snapshot is None:
+            return None
+        db_files.append((snapshot.path, snapshot.mtime))
+    return tuple(db_files)
+
+
+def _is_fresh(db_files: tuple[tuple[str, float], ...]) -> bool:
+    try:
+        return all(os.path.getmtime(path) == mtime for path, mtime in db_files)
+    except OSError:
+        return False
+
+
+def _get_environment_fingerprint(
+    constructor_name: str, environment_constructor: Callable[[], Environment]
+) -> Optional[str]:
+    """
+    Get the hashes of a fresh environment, None if its gold environment cannot be cached.
+    They are computed once per database files, and on every call for environments whose
+    databases are not loaded from a file (see DB.load_snapshot).
+    """
+    memo = _ENVIRONMENT_FINGERPRINTS.get(constructor_name)
+    if memo is not None and _is_fresh(memo[0]):
+        return memo[1]
+    environment = environment_constructor()
+    if any(
+        toolkit is not None and not toolkit.deterministic
+        for toolkit in (environment.tools, environment.user_tools)
+    ):
+        fingerprint = None
+    else:
+        fingerprint = get_dict_hash(
+            {
+                "agent_db_hash": environment.get_db_hash(),
+                "user_db_hash": environment.get_user_db_hash(),
+            }
+        )
+    db_files = _get_db_files(environment)
+    if db_files is not None:
+        _ENVIRONMENT_FINGERPRINTS[constructor_name] = (db_files, fingerprint)
+    return fingerprint
+
+
+def get_gold_environment_key(
+    environment_constructor: Callable[[], Environment], task: Task
+) -> Optional[str]:
+    """
+    Get the cache key of the gold environment of a task.
+    The key covers the domain data (through the hashes of a fresh environment), the initial
+    state of the task and its golden actions. Returns None if the environment constructor
+    has no stable name, or if its tools are not deterministic (see ToolKitBase.deterministic).
+    """
+    module = getattr(environment_constructor, "__module__", None)
+    qualname = getattr(environment_constructor, "__qualname__", None)
+    if module is None or qualname is None or "<" in qualname:
+        return None
+    constructor_name = f"{module}.{qualname}"
+    fingerprint = _get_environment_fingerprint(constructor_name, environment_constructor)
+    if fingerprint is None:
+        return None
+    return get_dict_hash(
+        {
+            "environment": constructor_name,
+            "fingerprint": fingerprint,
+            "initial_state": (
+                # The creation time and turn of the history messages do not change the gold
+                # environment, and differ between copies of the task.
+                task.initial_state.model_dump(
+                    exclude={"message_history": {"__all__": {"timestamp", "turn_idx"}}}
+                )
+                if task.initial_state is not None
+                else None
+            ),
+            "actions": [
+                action.model_dump() for action in task.evaluation_criteria.actions or []
+            ],
+        }
+    )
 
 
 class EnvironmentEvaluator(EvaluatorBase):
@@ -23,6 +182,7 @@ class EnvironmentEvaluator(EvaluatorBase):
             Message
         ],  # FIXME: It would be better to be able to get only the messages that are after the initial state
         solo_mode: bool = False,
+        gold_cache_dir: Optional[str] = None,
     ) -> RewardInfo:
         """
         Calculate the reward for the simulation.
@@ -31,6 +191,7 @@ class EnvironmentEvaluator(EvaluatorBase):
             task: Task
             full_trajectory: list[Message] (Must include the message history from task initial state)
             solo_mode: bool
+            gold_cache_dir: Directory where the gold environment results are cached. If None, they are only cached in memory.
         Returns:
             RewardInfo
         """
@@ -62,13 +223,6 @@ class EnvironmentEvaluator(EvaluatorBase):
         ):
             initialization_actions = task.initial_state.initialization_actions
 
-        message_history = []
-        if (
-            task.initial_state is not None
-            and task.initial_state.message_history is not None
-        ):
-            message_history = task.initial_state.message_history
-
         predicted_environment = environment_constructor(solo_mode=solo_mode)
         predicted_environment.set_state(
             initialization_data=initialization_data,
@@ -84,28 +238,15 @@ class EnvironmentEvaluator(EvaluatorBase):
                 predicted_tool_calls.extend(message.tool_calls)
 
         # Setting up gold environment
-        gold_environment = environment_constructor()
-        gold_environment.set_state(
-            initialization_data=initialization_data,
-            initialization_actions=initialization_actions,
-            message_history=message_history,
+        gold_result = cls.get_gold_environment_result(
+            environment_constructor=environment_constructor,
+            task=task,
+            gold_cache_dir=gold_cache_dir,
         )
-        golden_actions = task.evaluation_criteria.actions or []
-        for action in golden_actions:
-            try:
-                gold_environment.make_tool_call(
-                    tool_name=action.name,
-                    requestor=action.requestor,
-                    **action.arguments,
-                )
-            except Exception as e:
-                print(
-                    f"Error in golden actions {action.name}({action.arguments}): {e}"
-                )
 
         # Comparing the environments
-        agent_db_hash = gold_environment.get_db_hash()
-        user_db_hash = gold_environment.get_user_db_hash()
+        agent_db_hash = gold_result.agent_db_hash
+        user_db_hash = gold_result.user_db_hash
         predicted_agent_db_hash = predicted_environment.get_db_hash()
         predicted_user_db_hash = predicted_environment.get_user_db_hash()
         agent_db_match = agent_db_hash == predicted_agent_db_hash
@@ -152,3 +293,67 @@ class EnvironmentEvaluator(EvaluatorBase):
             reward_basis=task.evaluation_criteria.reward_basis,
             reward_breakdown=reward_breakdown,
         )
+
+    @classmethod
+    def get_gold_environment_result(
+        cls,
+        environment_constructor: Callable[[], Environment],
+        task: Task,
+        gold_cache_dir: Optional[str] = None,
+    ) -> GoldEnvironmentResult:
+        """
+        Get the end state of the gold environment of a task, replaying it only on a cache miss.
+        """
+        cache = get_gold_environment_cache(gold_cache_dir)
+        key = get_gold_environment_key(environment_constructor, task)
+        result = cache.get(key) if key is not None else None
+        if result is None:
+            result = cls.run_gold_environment(environment_constructor, task)
+            if key is not None:
+                cache.put(key, result)
+        for error in result.action_errors:
+            print(error)
+        return result
+
+    @classmethod
+    def run_gold_environment(
+        cls,
+        environment_constructor: Callable[[], Environment],
+        task: Task,
+    ) -> GoldEnvironmentResult:
+        """
+        Replay the initial state and the golden actions of a task in a fresh environment.
+        """
+        initialization_data = None
+        initialization_actions = None
+        message_history = []
+        if task.initial_state is not None:
+            initialization_data = task.initial_state.initialization_data
+            initialization_actions = task.initial_state.initialization_actions
+            message_history = task.initial_state.message_history or []
+
+        gold_environment = environment_constructor()
+        gold_environment.set_state(
+            initialization_data=initialization_data,
+            initialization_actions=initialization_actions,
+            message_history=message_history,
+        )
+        golden_actions = task.evaluation_criteria.actions or []
+        action_errors = []
+        for action in golden_actions:
+            try:
+                gold_environment.make_tool_call(
+                    tool_name=action.name,
+                    requestor=action.requestor,
+                    **action.arguments,
+                )
+            except Exception as e:
+                action_errors.append(
+                    f"Error in golden actions {action.name}({action.arguments}): {e}"
+                )
+
+        return GoldEnvironmentResult(
+            agent_db_hash=gold_environment.get_db_hash(),
+            user_db_hash=gold_environment.get_user_db_hash(),
+            action_errors=action_errors,
+        )
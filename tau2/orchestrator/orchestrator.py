@@ -1,12 +1,11 @@
 import time
 import uuid
-from copy import deepcopy
-from datetime import datetime, timedelta
 from enum import Enum
 from typing import Any, Optional
 import os
 from loguru import logger
 
+from LLM_CALL import LLMCallError, simulation_deadline
 from tau2.agent.base import BaseAgent, is_valid_agent_history_message
 from tau2.agent.llm_agent import LLMSoloAgent
 from tau2.data_model.message import (
@@ -16,13 +15,19 @@ from tau2.data_model.message import (
     ToolMessage,
     UserMessage,
 )
-from tau2.data_model.simulation import SimulationRun, TerminationReason
+from tau2.data_model.simulation import (
+    SimulationFailure,
+    SimulationRun,
+    TerminationReason,
+)
 from tau2.data_model.tasks import EnvFunctionCall, InitializationData, Task
 from tau2.environment.environment import Environment, EnvironmentInfo
 from tau2.user.base import BaseUser, is_valid_user_history_message
 from tau2.user.user_simulator import DummyUser, UserSimulator, UserState
 from tau2.utils.llm_utils import get_cost
-from tau2.utils.utils import format_time, get_now
+from tau2.utils.run_metrics import RUN_METRICS
+from tau2.utils.tracing import SpanRecorder, get_usage_attributes
+from tau2.utils.utils import get_now
 
 
 class Role(str, Enum):
@@ -51,6 +56,7 @@ class Orchestrator:
         task: Task,
         max_steps: int = 100,
         max_errors: int = 10,
+        simulation_timeout: Optional[float] = None,
         seed: Optional[int] = None,
         solo_mode: bool = False,
         cur_transfer_dir: str = None,
@@ -72,13 +78,16 @@ class Orchestrator:
         self.trajectory: list[Message] = []
         self.max_steps = max_steps
         self.max_errors = max_errors
+        self.simulation_timeout = simulation_timeout
         self.step_count = 0
         self.done = False
         self.termination_reason: Optional[TerminationReason] = None
         self.num_errors = 0
+        self.failure: Optional[SimulationFailure] = None
         self.from_role: Optional[Role] = None
         self.to_role: Optional[Role] = None
         self.message: Optional[Message] = None
+        self.tracer = SpanRecorder()
 
     def initialize(self):
         """
@@ -87,6 +96,22 @@ class Orchestrator:
         - Initialize the agent and user states.
         - Send the first message (default message from the agent to the user).
         """
+        with self.tracer.span("initialize"):
+            needs_first_message = self._initialize_state()
+        if needs_first_message:
+            with self.tracer.span("generate", role=Role.AGENT.value) as attributes:
+                first_message, self.agent_state = self.agent.generate_next_message(
+                    None, self.agent_state
+                )
+                attributes.update(get_usage_attributes(first_message.usage))
+            self._set_solo_first_message(first_message)
+        self._sync_tools()
+
+    def _initialize_state(self) -> bool:
+        """
+        Initialize the environment, the agent and user states and the first message.
+        Returns True if the first message still has to be generated by the solo agent.
+        """
         initial_state = self.task.initial_state
         # 85 initial_state None
         initialization_data = (
@@ -95,17 +120,17 @@ class Orchestrator:
         initialization_actions = (
             initial_state.initialization_actions if initial_state is not None else None
         )
+        # Shallow copies: only the turn_idx and creation time of the messages are set, the task
+        # (shared between simulations) is left untouched.
         message_history = (
-            deepcopy(initial_state.message_history)
+            [msg.model_copy() for msg in initial_state.message_history]
             if initial_state is not None and initial_state.message_history is not None
             else []
         )
+        # Messages of the history without a timestamp are timed when they are replayed.
         for msg in message_history:
-            msg.turn_idx = None
-
-        # Add timestamps to the message history
-        message_history = self._add_timestamps(message_history)
-        # message_history []
+            if msg.timestamp is None:
+                msg.set_time_now()
 
         if self.solo_mode:
             assert self.environment.solo_mode, "Environment should be in solo mode"
@@ -226,7 +251,7 @@ class Orchestrator:
                 raise ValueError(
                     f"Last message should be of type AssistantMessage, UserMessage, or ToolMessage, got {type(last_message)}"
                 )
-            self.trajectory = message_history
+            self._reset_trajectory(message_history)
 
         else:
             # 226 self.agent tau2.agent.llm_agent.LLMAgent
@@ -235,25 +260,27 @@ class Orchestrator:
             self.user_state = self.user.get_init_state()
             # 230 self.solo_mode False
             if not self.solo_mode:
-                first_message = deepcopy(DEFAULT_FIRST_AGENT_MESSAGE)
-                first_message.timestamp = get_now()
-                self.trajectory = [first_message]
+                first_message = DEFAULT_FIRST_AGENT_MESSAGE.model_copy()
+                first_message.set_time_now()
+                self._reset_trajectory([first_message])
                 self.message = first_message
                 self.from_role = Role.AGENT
                 self.to_role = Role.USER
             else:
-                first_message, agent_state = self.agent.generate_next_message(
-                    None, self.agent_state
-                )
-                self.trajectory = [first_message]
-                self.message = first_message
-                self.from_role = Role.AGENT
-                self.to_role = Role.ENV
-                self.done = self.agent.is_stop(first_message)
-                if self.done:
-                    self.termination_reason = TerminationReason.AGENT_STOP
+                return True
+        return False
 
-        self.environment.sync_tools()
+    def _set_solo_first_message(self, first_message: AssistantMessage):
+        """
+        Set the first message generated by the solo agent.
+        """
+        self._reset_trajectory([first_message])
+        self.message = first_message
+        self.from_role = Role.AGENT
+        self.to_role = Role.ENV
+        self.done = self.agent.is_stop(first_message)
+        if self.done:
+            self.termination_reason = TerminationReason.AGENT_STOP
 
     def run(self) -> SimulationRun:
         """
@@ -264,21 +291,51 @@ class Orchestrator:
         """
         start_time = get_now()
         start = time.perf_counter()
-        self.initialize()
-        while not self.done:
-            # with open(os.path.join(self.cur_transfer_dir,f"tau_loop_{self.step_count}"),'w') as f:
-            #     f.write(f"263, tau self.step_count, {self.step_count}")
-            # print(263,'Step',self.step_count)
-            self.step()
-            if self.step_count >= self.max_steps:
-                self.done = True
-                self.termination_reason = TerminationReason.MAX_STEPS
-            if self.num_errors >= self.max_errors:
-                self.done = True
-                self.termination_reason = TerminationReason.TOO_MANY_ERRORS
-        # print(279,'finish all steps')
+        with simulation_deadline(self.simulation_timeout), self.tracer.activate():
+            try:
+                self.initialize()
+                while not self.done:
+                    self.step()
+                    self._check_termination()
+            except LLMCallError as error:
+                self._fail(error)
         duration = time.perf_counter() - start
-        messages = self.get_trajectory()
+        return self._make_simulation_run(start_time=start_time, duration=duration)
+
+    def _check_termination(self):
+        """
+        Stop the simulation if the step or error budget is exhausted.
+        """
+        if self.step_count >= self.max_steps:
+            self.done = True
+            self.termination_reason = TerminationReason.MAX_STEPS
+        if self.num_errors >= self.max_errors:
+            self.done = True
+            self.termination_reason = TerminationReason.TOO_MANY_ERRORS
+
+    def _fail(self, error: LLMCallError):
+        """
+        End the simulation because an LLM call gave up.
+        """
+        logger.error(f"Simulation of task {self.task.id} ended by an LLM error: {error}")
+        self.done = True
+        self.termination_reason = TerminationReason.LLM_ERROR
+        self.failure = SimulationFailure(
+            error_type=type(error.error).__name__ if error.error is not None else type(error).__name__,
+            message=str(error),
+            model=error.model,
+            reason=error.reason,
+            attempts=error.attempts,
+            elapsed=error.elapsed,
+        )
+
+    def _make_simulation_run(self, start_time: str, duration: float) -> SimulationRun:
+        """
+        Build the simulation run from the final state of the orchestrator.
+        """
+        self.tracer.step = None
+        with self.tracer.span("get_trajectory"):
+            messages = self.get_trajectory()
         res = get_cost(messages)
         if res is None:
             agent_cost, user_cost = None, None
@@ -296,6 +353,8 @@ class Orchestrator:
             agent_cost=agent_cost,
             messages=messages,
             seed=self.seed,
+            failure=self.failure,
+            spans=self.tracer.spans,
         )
         return simulation_run
 
@@ -306,7 +365,39 @@ class Orchestrator:
         This can either be a message from agent to user/environment, environment to agent, or user to agent
         Updates self.trajectory
         """
-        # print(299,'step')
+        recipient = self._get_recipient()
+        self.tracer.step = self.step_count
+        # AGENT/ENV -> USER
+        if recipient == Role.USER:
+            with self.tracer.span("generate", role=Role.USER.value) as attributes:
+                user_msg, self.user_state = self.user.generate_next_message(
+                    self.message, self.user_state
+                )
+                attributes.update(get_usage_attributes(user_msg.usage))
+            self._on_user_message(user_msg)
+        # USER/ENV -> AGENT
+        elif recipient == Role.AGENT:
+            with self.tracer.span("generate", role=Role.AGENT.value) as attributes:
+                agent_msg, self.agent_state = self.agent.generate_next_message(
+                    self.message, self.agent_state
+                )
+                attributes.update(get_usage_attributes(agent_msg.usage))
+            self._on_agent_message(agent_msg)
+        # AGENT/USER -> ENV
+        else:
+            self._on_env_message()
+        self.step_count += 1
+        self._sync_tools()
+        self.tracer.step = None
+
+    def _sync_tools(self):
+        with self.tracer.span("sync_tools", role=Role.ENV.value):
+            self.environment.sync_tools()
+
+    def _get_recipient(self) -> Role:
+        """
+        Check that a step can be performed and return the role receiving self.message.
+        """
         if self.done:
             raise ValueError("Simulation is done")
         logger.debug(
@@ -315,89 +406,97 @@ class Orchestrator:
         logger.debug(
             f"Step {self.step_count}.\nFrom role: {self.from_role}\nTo role: {self.to_role}\nMessage: {self.message}"
         )
-        # AGENT/ENV -> USER
         if self.from_role in [Role.AGENT, Role.ENV] and self.to_role == Role.USER:
-            user_msg, self.user_state = self.user.generate_next_message(
-                self.message, self.user_state
-            )
-            user_msg.validate()
-            if UserSimulator.is_stop(user_msg):
-                self.done = True
-                self.termination_reason = TerminationReason.USER_STOP
-            self.trajectory.append(user_msg)
-            self.message = user_msg
-            self.from_role = Role.USER
-            # print(320,'user_msg.is_tool_call()',user_msg.is_tool_call())
-            if user_msg.is_tool_call():
-                self.to_role = Role.ENV
-            else:
-                self.to_role = Role.AGENT
-        # USER/ENV -> AGENT
-        elif (
-            self.from_role == Role.USER or self.from_role == Role.ENV
-        ) and self.to_role == Role.AGENT:
-            agent_msg, self.agent_state = self.agent.generate_next_message(
-                self.message, self.agent_state
-            )
-            agent_msg.validate()
-            if self.agent.is_stop(agent_msg):
-                self.done = True
-                self.termination_reason = TerminationReason.AGENT_STOP
-            self.trajectory.append(agent_msg)
-            self.message = agent_msg
-            self.from_role = Role.AGENT
-            # print(339,'agent_msg.is_tool_call()',agent_msg.is_tool_call())
-            if agent_msg.is_tool_call():
-                self.to_role = Role.ENV
-            else:
-                self.to_role = Role.USER
-        # AGENT/USER -> ENV
-        elif self.from_role in [Role.AGENT, Role.USER] and self.to_role == Role.ENV:
-            # print(353,'tool call')
-            if not self.message.is_tool_call():
-                raise ValueError("Agent or User should send tool call to environment")
-            tool_msgs = []
+            return Role.USER
+        if self.from_role in [Role.USER, Role.ENV] and self.to_role == Role.AGENT:
+            return Role.AGENT
+        if self.from_role in [Role.AGENT, Role.USER] and self.to_role == Role.ENV:
+            return Role.ENV
+        raise ValueError(
+            f"Invalid role combination. From role: {self.from_role}, To role: {self.to_role}"
+        )
+
+    def _on_user_message(self, user_msg: UserMessage):
+        """
+        Record a message generated by the user and route it.
+        """
+        user_msg.validate()
+        if UserSimulator.is_stop(user_msg):
+            self.done = True
+            self.termination_reason = TerminationReason.USER_STOP
+        self._extend_trajectory([user_msg])
+        self.message = user_msg
+        self.from_role = Role.USER
+        if user_msg.is_tool_call():
+            self.to_role = Role.ENV
+        else:
+            self.to_role = Role.AGENT
+
+    def _on_agent_message(self, agent_msg: AssistantMessage):
+        """
+        Record a message generated by the agent and route it.
+        """
+        agent_msg.validate()
+        if self.agent.is_stop(agent_msg):
+            self.done = True
+            self.termination_reason = TerminationReason.AGENT_STOP
+        self._extend_trajectory([agent_msg])
+        self.message = agent_msg
+        self.from_role = Role.AGENT
+        if agent_msg.is_tool_call():
+            self.to_role = Role.ENV
+        else:
+            self.to_role = Role.USER
+
+    def _on_env_message(self):
+        """
+        Execute the tool calls of self.message and send the results back to the requestor.
+        """
+        if not self.message.is_tool_call():
+            raise ValueError("Agent or User should send tool call to environment")
+        tool_msgs = []
+        with self.tracer.span(
+            "tool_calls", role=Role.ENV.value, num_tool_calls=len(self.message.tool_calls)
+        ):
             for tool_call in self.message.tool_calls:
                 tool_msg = self.environment.get_response(tool_call)
                 tool_msgs.append(tool_msg)
-            assert len(self.message.tool_calls) == len(tool_msgs), (
-                "Number of tool calls and tool messages should be the same"
+        assert len(self.message.tool_calls) == len(tool_msgs), (
+            "Number of tool calls and tool messages should be the same"
+        )
+        RUN_METRICS.record_tool_calls(self.domain, len(tool_msgs))
+        self._extend_trajectory(tool_msgs)
+        if (
+            len(tool_msgs) > 1
+        ):  # Packaging multiple tool messages into a MultiToolMessage
+            self.message = MultiToolMessage(
+                role="tool",
+                tool_messages=tool_msgs,
             )
-            self.trajectory.extend(tool_msgs)
-            if (
-                len(tool_msgs) > 1
-            ):  # Packaging multiple tool messages into a MultiToolMessage
-                self.message = MultiToolMessage(
-                    role="tool",
-                    tool_messages=tool_msgs,
-                )
-            else:
-                self.message = tool_msgs[0]
-            self.to_role = self.from_role
-            self.from_role = Role.ENV
-            # print(375,'tool call')
         else:
-            raise ValueError(
-                f"Invalid role combination. From role: {self.from_role}, To role: {self.to_role}"
-            )
-        self.step_count += 1
-        self.environment.sync_tools()
+            self.message = tool_msgs[0]
+        self.to_role = self.from_role
+        self.from_role = Role.ENV
+
+    def _reset_trajectory(self, messages: list[Message]):
+        self.trajectory = []
+        self._extend_trajectory(messages)
+
+    def _extend_trajectory(self, messages: list[Message]):
+        """
+        Append messages to the trajectory, setting their turn_idx.
+        Messages are appended in the order they are produced, so the trajectory is always in order.
+        """
+        for msg in messages:
+            msg.turn_idx = len(self.trajectory)
+            self.trajectory.append(msg)
 
     def get_trajectory(self) -> list[Message]:
         """
-        Get the trajectory of the simulation.
-        The trajectory is sorted by timestamp, turn_idx are added to messages, trajectory is returned.
+        Get the trajectory of the simulation, in order and with turn_idx set.
+        The messages are not copied: they are not modified once in the trajectory.
         """
-        messages: list[Message] = sorted(
-            deepcopy(self.trajectory),
-            key=lambda x: x.timestamp,
-        )
-        trajectory = []
-        for i, msg in enumerate(messages):
-            msg = deepcopy(msg)
-            msg.turn_idx = i
-            trajectory.append(msg)
-        return trajectory
+        return list(self.trajectory)
 
     @classmethod
     def validate_message_history(cls, message_history: list[Message]):
@@ -463,14 +562,71 @@ class Orchestrator:
             1 for msg in message_history if isinstance(msg, ToolMessage) and msg.error
         )
 
-    def _add_timestamps(
-        self, message_history: list[Message]
-    ) -> list[tuple[str, Message]]:
+
+class AsyncOrchestrator(Orchestrator):
+    """
+    Orchestrator running the simulation in an asyncio event loop.
+    Agent and user generation are awaited, so many simulations can share one loop.
+    Tool calls are executed synchronously, in the same order as the Orchestrator.
+    """
+
+    async def ainitialize(self):
+        """
+        Async version of initialize.
+        """
+        with self.tracer.span("initialize"):
+            needs_first_message = self._initialize_state()
+        if needs_first_message:
+            with self.tracer.span("generate", role=Role.AGENT.value) as attributes:
+                first_message, self.agent_state = await self.agent.agenerate_next_message(
+                    None, self.agent_state
+                )
+                attributes.update(get_usage_attributes(first_message.usage))
+            self._set_solo_first_message(first_message)
+        self._sync_tools()
+
+    async def arun(self) -> SimulationRun:
+        """
+        Run the simulation.
+
+        Returns:
+            SimulationRun: The simulation run.
         """
-        Add timestamps to the message history.
-        This is used to sort the messages by timestamp.
+        start_time = get_now()
+        start = time.perf_counter()
+        with simulation_deadline(self.simulation_timeout), self.tracer.activate():
+            try:
+                await self.ainitialize()
+                while not self.done:
+                    await self.astep()
+                    self._check_termination()
+            except LLMCallError as error:
+                self._fail(error)
+        duration = time.perf_counter() - start
+        return self._make_simulation_run(start_time=start_time, duration=duration)
+
+    async def astep(self):
         """
-        time_offset = datetime.now() - timedelta(seconds=len(message_history))
-        for i, msg in enumerate(message_history):
-            msg.timestamp = format_time(time_offset + timedelta(seconds=i))
-        return message_history
+        Async version of step.
+        """
+        recipient = self._get_recipient()
+        self.tracer.step = self.step_count
+        if recipient == Role.USER:
+            with self.tracer.span("generate", role=Role.USER.value) as attributes:
+                user_msg, self.user_state = await self.user.agenerate_next_message(
+                    self.message, self.user_state
+                )
+                attributes.update(get_usage_attributes(user_msg.usage))
+            self._on_user_message(user_msg)
+        elif recipient == Role.AGENT:
+            with self.tracer.span("generate", role=Role.AGENT.value) as attributes:
+                agent_msg, self.agent_state = await self.agent.agenerate_next_message(
+                    self.message, self.agent_state
+                )
+                attributes.update(get_usage_attributes(agent_msg.usage))
+            self._on_agent_message(agent_msg)
+        else:
+            self._on_env_message()
+        self.step_count += 1
+        self._sync_tools()
+        self.tracer.step = None
@@ -69,7 +69,7 @@ class Registry:
         self._users: Dict[str, Type[BaseUser]] = {}
         self._agents: Dict[str, Type[BaseAgent]] = {}
         self._domains: Dict[str, Callable[[], Environment]] = {}
-        self._tasks: Dict[str, Callable[[], list[Task]]] = {}
+        self._tasks: Dict[str, Callable[..., list[Task]]] = {}
 
     def register_user(
         self,
@@ -117,7 +117,7 @@ class Registry:
 
     def register_tasks(
         self,
-        get_tasks: Callable[[], list[Task]],
+        get_tasks: Callable[..., list[Task]],
         name: str,
     ):
         """Register a new Domain implementation"""
@@ -147,7 +147,7 @@ class Registry:
             raise KeyError(f"Domain {name} not found in registry")
         return self._domains[name]
 
-    def get_tasks_loader(self, name: str) -> Callable[[], list[Task]]:
+    def get_tasks_loader(self, name: str) -> Callable[..., list[Task]]:
         """Get a registered Task Set by name"""
         if name not in self._tasks:
             raise KeyError(f"Task Set {name} not found in registry")
@@ -1,13 +1,22 @@
+import asyncio
+import itertools
 import json
 import multiprocessing
+import queue
 import random
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, Iterable, Iterator, Optional
 import os
 from loguru import logger
 import time
 from tau2.agent.llm_agent import LLMAgent, LLMGTAgent, LLMSoloAgent
+from tau2.config import DEFAULT_EVAL_CONCURRENCY, DEFAULT_EVAL_QUEUE_SIZE
 from tau2.data_model.simulation import (
     AgentInfo,
     Info,
@@ -20,11 +29,26 @@ from tau2.data_model.tasks import Task
 from tau2.environment.environment import Environment, EnvironmentInfo
 from tau2.evaluator.evaluator import EvaluationType, evaluate_simulation
 from tau2.metrics.agent_metrics import compute_metrics
-from tau2.orchestrator.orchestrator import Orchestrator
+from tau2.orchestrator.orchestrator import AsyncOrchestrator, Orchestrator
 from tau2.registry import RegistryInfo, registry
 from tau2.user.user_simulator import DummyUser, get_global_user_sim_guidelines
 from tau2.utils.display import ConsoleDisplay
 from tau2.utils.pydantic_utils import get_pydantic_hash
+from tau2.utils.results_log import (
+    RESULTS_LOG_NAME,
+    ResultKey,
+    ResultsLog,
+    close_results_log,
+    get_results_log,
+)
+from tau2.utils.run_metrics import RUN_METRICS, MetricsFileWriter, MetricsServer
+from tau2.utils.scheduling import (
+    load_task_durations,
+    predict_durations,
+    predict_makespan,
+    schedule_longest_first,
+)
+from tau2.utils.tracing import add_evaluation_span
 from tau2.utils.utils import DATA_DIR, get_commit_hash, get_now, show_dict_diff
 
 
@@ -46,13 +70,19 @@ def get_environment_info(
     return env_constructor().get_info(include_tool_info=include_tool_info)
 
 
-def load_tasks(task_set_name: str, task_path: str, save_to) -> list[Task]:
+def load_tasks(
+    task_set_name: str,
+    task_path: Optional[str] = None,
+    task_ids: Optional[list[str]] = None,
+    num_tasks: Optional[int] = None,
+) -> list[Task]:
     """
     Loads the tasks for the given domain.
+    Only the selected tasks are validated, see tau2.utils.task_store.
     """
     global registry
     task_loader = registry.get_tasks_loader(task_set_name)
-    tasks = task_loader(task_path=task_path,save_to=save_to)
+    tasks = task_loader(task_path=task_path, task_ids=task_ids, num_tasks=num_tasks)
     return tasks
 
 
@@ -60,25 +90,18 @@ def get_tasks(
     task_set_name: str,
     task_ids: Optional[list[str]] = None,
     num_tasks: Optional[int] = None,
-    task_path = '',
-    save_to = ''
+    task_path: Optional[str] = None,
 ) -> list[Task]:
     """
     Loads the tasks for the given domain.
+    The simulations already run are skipped by run_tasks, see get_done_runs.
     """
-    if task_ids is None:
-        return load_tasks(task_set_name=task_set_name,task_path=task_path,save_to=save_to)
-    tasks = [
-        task for task in load_tasks(task_set_name=task_set_name,task_path=task_path) if task.id in task_ids
-    ]
-    if len(tasks) != len(task_ids):
-        missing_tasks = set(task_ids) - set([task.id for task in tasks])
-        raise ValueError(
-            f"Not all tasks were found for task set {task_set_name}: {missing_tasks}"
-        )
-    if num_tasks is not None:
-        tasks = tasks[:num_tasks]
-    return tasks
+    return load_tasks(
+        task_set_name=task_set_name,
+        task_path=task_path,
+        task_ids=task_ids,
+        num_tasks=num_tasks,
+    )
 
 
 def make_run_name(config: RunConfig) -> str:
@@ -105,7 +128,7 @@ def run_domain(config: RunConfig) -> Results:
         task_set_name = config.domain
     else:
         task_set_name = config.task_set_name
-    tasks = get_tasks(task_set_name, config.task_ids, config.num_tasks, task_path=config.task_path, save_to=config.output_file)
+    tasks = get_tasks(task_set_name, config.task_ids, config.num_tasks, task_path=config.task_path)
     # print(104,'tasks',tasks)
     # exit(0)
     # 104 config.agent llm_agent
@@ -130,7 +153,7 @@ def run_domain(config: RunConfig) -> Results:
         save_to = make_run_name(config)
     save_to = config.output_file
     # print('save path:',save_to)
-    simulation_results = run_tasks(
+    run_args = dict(
         domain=config.domain,
         tasks=tasks,
         agent=config.agent,
@@ -142,6 +165,7 @@ def run_domain(config: RunConfig) -> Results:
         num_trials=num_trials,
         max_steps=config.max_steps,
         max_errors=config.max_errors,
+        simulation_timeout=config.simulation_timeout,
         save_to=save_to,
         console_display=True,
         evaluation_type=EvaluationType.ALL,
@@ -150,8 +174,29 @@ def run_domain(config: RunConfig) -> Results:
         log_level=config.log_level,
         cur_transfer_dir=config.cur_transfer_dir,
         model_config_path=config.model_config_path,
-        use_model_tool=config.use_model_tool
+        use_model_tool=config.use_model_tool,
+        gold_cache_dir=config.gold_cache_dir,
+        duration_history=config.duration_history,
+        longest_first=config.longest_first,
+        keep_messages=config.keep_messages,
     )
+    exporters = []
+    if config.metrics_port is not None:
+        exporters.append(MetricsServer(config.metrics_port).start())
+    if config.metrics_file is not None:
+        exporters.append(MetricsFileWriter(config.metrics_file).start())
+    try:
+        if config.use_async:
+            simulation_results = asyncio.run(run_tasks_async(**run_args))
+        else:
+            simulation_results = run_tasks(
+                **run_args,
+                eval_concurrency=config.eval_concurrency,
+                eval_queue_size=config.eval_queue_size,
+            )
+    finally:
+        for exporter in exporters:
+            exporter.stop()
     # metrics = compute_metrics(simulation_results)
     # ConsoleDisplay.display_agent_metrics(metrics)
 
@@ -170,6 +215,7 @@ def run_tasks(
     num_trials: int = 1,
     max_steps: int = 100,
     max_errors: int = 10,
+    simulation_timeout: Optional[float] = None,
     save_to: Optional[str | Path] = None,
     console_display: bool = True,
     evaluation_type: EvaluationType = EvaluationType.ALL,
@@ -178,7 +224,13 @@ def run_tasks(
     log_level: Optional[str] = "INFO",
     cur_transfer_dir: str = '',
     model_config_path: str = '',
-    use_model_tool: bool = False
+    use_model_tool: bool = False,
+    eval_concurrency: int = DEFAULT_EVAL_CONCURRENCY,
+    eval_queue_size: int = DEFAULT_EVAL_QUEUE_SIZE,
+    gold_cache_dir: Optional[str] = None,
+    duration_history: Optional[list[str]] = None,
+    longest_first: bool = True,
+    keep_messages: bool = True,
 ) -> Results:
     """
     Runs tasks for a given domain.
@@ -195,20 +247,603 @@ def run_tasks(
         llm_args_user (dict): The arguments to pass to the LLM for the user.
         max_steps (int): The maximum number of steps to run the simulation.
         max_errors (int): The maximum number of errors to allow in the simulation.
+        simulation_timeout (float): The number of seconds the LLM calls of a simulation may take, retries included.
+            When exceeded, the simulation ends with termination reason llm_error. If None, only each call is bounded.
         save_to (str | Path): The path to json file where to save the simulation results. If the file already exists, it will try to resume the run.
         evaluation_type (EvaluationType): The type of evaluation to use.
         max_concurrency (int): The maximum number of concurrent simulations to run.
         seed (int): The seed to use for the simulation.
         log_level (str): The log level to use.
+        eval_concurrency (int): The number of processes used to evaluate the simulations.
+            If 0, each simulation is evaluated on the thread that ran its conversation.
+        eval_queue_size (int): The maximum number of finished conversations waiting for evaluation.
+        gold_cache_dir (str): The directory where the gold environment results are cached.
+            If None, they are only cached in memory, per process.
+        duration_history (list[str]): Results logs (directories) or results files of past runs, used to
+            predict the duration of each task. The results log of save_to is always used.
+        longest_first (bool): Whether to run the simulations longest-expected-first instead of in file order.
+        keep_messages (bool): Whether to keep the messages of the simulations in the returned results.
+            If False, only summaries are kept in memory; the full simulations are in the results log of save_to.
+    Returns:
+        The simulation results, in the order they finished.
+    """
+    simulation_results, save_dir, seeds = _setup_run(
+        domain=domain,
+        tasks=tasks,
+        agent=agent,
+        user=user,
+        llm_agent=llm_agent,
+        llm_args_agent=llm_args_agent,
+        llm_user=llm_user,
+        llm_args_user=llm_args_user,
+        num_trials=num_trials,
+        max_steps=max_steps,
+        max_errors=max_errors,
+        save_to=save_to,
+        seed=seed,
+        log_level=log_level,
+    )
+    simulations = _iter_simulations(
+        domain=domain,
+        tasks=tasks,
+        agent=agent,
+        user=user,
+        llm_agent=llm_agent,
+        llm_args_agent=llm_args_agent,
+        llm_user=llm_user,
+        llm_args_user=llm_args_user,
+        num_trials=num_trials,
+        max_steps=max_steps,
+        max_errors=max_errors,
+        simulation_timeout=simulation_timeout,
+        evaluation_type=evaluation_type,
+        max_concurrency=max_concurrency,
+        cur_transfer_dir=cur_transfer_dir,
+        model_config_path=model_config_path,
+        use_model_tool=use_model_tool,
+        eval_concurrency=eval_concurrency,
+        eval_queue_size=eval_queue_size,
+        gold_cache_dir=gold_cache_dir,
+        duration_history=duration_history,
+        longest_first=longest_first,
+        save_dir=save_dir,
+        seeds=seeds,
+    )
+    for simulation in simulations:
+        if not keep_messages:
+            simulation = summarize_simulation(simulation)
+        simulation_results.simulations.append(simulation)
+    print(len(simulation_results.simulations))
+    return simulation_results
+
+
+def iter_tasks(
+    domain: str,
+    tasks: list[Task],
+    agent: str,
+    user: str,
+    llm_agent: Optional[str] = None,
+    llm_args_agent: Optional[dict] = None,
+    llm_user: Optional[str] = None,
+    llm_args_user: Optional[dict] = None,
+    num_trials: int = 1,
+    max_steps: int = 100,
+    max_errors: int = 10,
+    simulation_timeout: Optional[float] = None,
+    save_to: Optional[str | Path] = None,
+    evaluation_type: EvaluationType = EvaluationType.ALL,
+    max_concurrency: int = 1,
+    seed: Optional[int] = 300,
+    log_level: Optional[str] = "INFO",
+    cur_transfer_dir: str = '',
+    model_config_path: str = '',
+    use_model_tool: bool = False,
+    eval_concurrency: int = DEFAULT_EVAL_CONCURRENCY,
+    eval_queue_size: int = DEFAULT_EVAL_QUEUE_SIZE,
+    gold_cache_dir: Optional[str] = None,
+    duration_history: Optional[list[str]] = None,
+    longest_first: bool = True,
+) -> Iterator[SimulationRun]:
+    """
+    Runs tasks for a given domain, yielding the simulations as they finish.
+    Only a bounded number of simulations are in flight at any time, and none is kept
+    once it has been yielded (each one is saved to the results log of save_to).
+    Args:
+        See run_tasks.
+    Yields:
+        The simulations, in the order they finished.
+    """
+    _, save_dir, seeds = _setup_run(
+        domain=domain,
+        tasks=tasks,
+        agent=agent,
+        user=user,
+        llm_agent=llm_agent,
+        llm_args_agent=llm_args_agent,
+        llm_user=llm_user,
+        llm_args_user=llm_args_user,
+        num_trials=num_trials,
+        max_steps=max_steps,
+        max_errors=max_errors,
+        save_to=save_to,
+        seed=seed,
+        log_level=log_level,
+    )
+    yield from _iter_simulations(
+        domain=domain,
+        tasks=tasks,
+        agent=agent,
+        user=user,
+        llm_agent=llm_agent,
+        llm_args_agent=llm_args_agent,
+        llm_user=llm_user,
+        llm_args_user=llm_args_user,
+        num_trials=num_trials,
+        max_steps=max_steps,
+        max_errors=max_errors,
+        simulation_timeout=simulation_timeout,
+        evaluation_type=evaluation_type,
+        max_concurrency=max_concurrency,
+        cur_transfer_dir=cur_transfer_dir,
+        model_config_path=model_config_path,
+        use_model_tool=use_model_tool,
+        eval_concurrency=eval_concurrency,
+        eval_queue_size=eval_queue_size,
+        gold_cache_dir=gold_cache_dir,
+        duration_history=duration_history,
+        longest_first=longest_first,
+        save_dir=save_dir,
+        seeds=seeds,
+    )
+
+
+def summarize_simulation(simulation: SimulationRun) -> SimulationRun:
+    """
+    Gets a copy of a simulation without its messages, to keep in memory for the metrics.
+    The full simulation can be read back from the results log.
+    """
+    return simulation.model_copy(update={"messages": []})
+
+
+def _iter_simulations(
+    domain: str,
+    tasks: list[Task],
+    agent: str,
+    user: str,
+    llm_agent: Optional[str],
+    llm_args_agent: Optional[dict],
+    llm_user: Optional[str],
+    llm_args_user: Optional[dict],
+    num_trials: int,
+    max_steps: int,
+    max_errors: int,
+    simulation_timeout: Optional[float],
+    evaluation_type: EvaluationType,
+    max_concurrency: int,
+    cur_transfer_dir: str,
+    model_config_path: str,
+    use_model_tool: bool,
+    eval_concurrency: int,
+    eval_queue_size: int,
+    gold_cache_dir: Optional[str],
+    duration_history: Optional[list[str]],
+    longest_first: bool,
+    save_dir: str,
+    seeds: list[int],
+) -> Iterator[SimulationRun]:
+    """
+    Runs the simulations of a run that were not run yet, and yields them as they finish.
+    The results log of save_dir is closed when the iteration ends.
+    """
+
+    def _run(task: Task, trial: int, seed: int, progress_str: str) -> SimulationRun:
+        start_time = time.time()
+        RUN_METRICS.simulation_started()
+        try:
+            simulation = run_task(
+                domain=domain,
+                task=task,
+                agent=agent,
+                user=user,
+                llm_agent=llm_agent,
+                llm_args_agent=llm_args_agent,
+                llm_user=llm_user,
+                llm_args_user=llm_args_user,
+                max_steps=max_steps,
+                max_errors=max_errors,
+                simulation_timeout=simulation_timeout,
+                evaluation_type=evaluation_type,
+                seed=seed,
+                cur_transfer_dir=cur_transfer_dir,
+                model_config_path=model_config_path,
+                use_model_tool=use_model_tool,
+                gold_cache_dir=gold_cache_dir,
+            )
+        except Exception:
+            RUN_METRICS.simulation_failed()
+            raise
+        latency = time.time()-start_time
+        simulation.trial = trial
+        _save_simulation(save_dir, simulation, latency=latency)
+        return simulation
+
+    def _make_orchestrator(task: Task, trial: int, seed: int, progress_str: str) -> tuple[Orchestrator, float]:
+        start_time = time.time()
+        orchestrator = build_orchestrator(
+            domain=domain,
+            task=task,
+            agent=agent,
+            user=user,
+            llm_agent=llm_agent,
+            llm_args_agent=llm_args_agent,
+            llm_user=llm_user,
+            llm_args_user=llm_args_user,
+            max_steps=max_steps,
+            max_errors=max_errors,
+            simulation_timeout=simulation_timeout,
+            seed=seed,
+            cur_transfer_dir=cur_transfer_dir,
+            model_config_path=model_config_path,
+            use_model_tool=use_model_tool,
+        )
+        return orchestrator, start_time
+
+    args, predicted_makespan = _plan_run(
+        tasks=tasks,
+        num_trials=num_trials,
+        seeds=seeds,
+        save_dir=save_dir,
+        max_concurrency=max_concurrency,
+        duration_history=duration_history,
+        longest_first=longest_first,
+    )
+    start_time = time.time()
+    try:
+        if eval_concurrency > 0:
+            yield from _run_pipelined(
+                args=args,
+                make_orchestrator=_make_orchestrator,
+                save_dir=save_dir,
+                domain=domain,
+                evaluation_type=evaluation_type,
+                max_concurrency=max_concurrency,
+                eval_concurrency=eval_concurrency,
+                eval_queue_size=eval_queue_size,
+                gold_cache_dir=gold_cache_dir,
+            )
+        else:
+            yield from _iter_completed(_run, args, max_concurrency=max_concurrency)
+        _report_makespan(time.time() - start_time, predicted_makespan)
+    finally:
+        close_results_log(save_dir)
+
+
+def _plan_run(
+    tasks: list[Task],
+    num_trials: int,
+    seeds: list[int],
+    save_dir: str,
+    max_concurrency: int,
+    duration_history: Optional[list[str]],
+    longest_first: bool,
+) -> tuple[list[tuple[Task, int, int, str]], Optional[float]]:
+    """
+    Lists the simulations of a run that were not run yet, in the order to run them.
+    Returns:
+        The (task, trial, seed, progress_str) of the simulations to run, and their predicted
+        makespan in seconds (None if there are no past durations to predict it from).
+    """
+    done_runs = get_done_runs(save_dir)
+    args = _make_run_args(tasks=tasks, num_trials=num_trials, seeds=seeds, done_runs=done_runs)
+    print("Total simulations:",len(tasks)*num_trials)
+    print("Simulations to run:",len(args))
+    RUN_METRICS.reset(num_planned=len(args))
+    history = list(duration_history or [])
+    if os.path.isfile(os.path.join(save_dir, RESULTS_LOG_NAME)):
+        history.append(save_dir)
+    durations = load_task_durations(history)
+    expected_durations = predict_durations(tasks, durations)
+    file_order_makespan = predict_makespan(
+        [expected_durations[arg[0].id] for arg in args], max_concurrency
+    )
+    if longest_first:
+        args = schedule_longest_first(args, expected_durations)
+    if not durations:
+        return args, None
+    predicted_makespan = predict_makespan(
+        [expected_durations[arg[0].id] for arg in args], max_concurrency
+    )
+    print(
+        f"Predicted makespan: {predicted_makespan:.0f}s "
+        f"(in file order: {file_order_makespan:.0f}s, from the durations of {len(durations)} tasks)"
+    )
+    return args, predicted_makespan
+
+
+def _report_makespan(makespan: float, predicted_makespan: Optional[float]):
+    if predicted_makespan is None:
+        print(f"Makespan: {makespan:.0f}s")
+    else:
+        print(f"Makespan: {makespan:.0f}s (predicted: {predicted_makespan:.0f}s)")
+
+
+def _iter_completed(fn, args: Iterable[tuple], max_concurrency: int) -> Iterator:
+    """
+    Calls fn(*arg) for every arg on a thread pool and yields the results as they finish.
+    Only max_concurrency calls are submitted at a time, so the remaining args are not
+    queued up and the results are not kept once yielded.
+    """
+    args = iter(args)
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        in_flight = {executor.submit(fn, *arg) for arg in itertools.islice(args, max_concurrency)}
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for arg in itertools.islice(args, len(done)):
+                in_flight.add(executor.submit(fn, *arg))
+            for future in done:
+                yield future.result()
+
+
+async def run_tasks_async(
+    domain: str,
+    tasks: list[Task],
+    agent: str,
+    user: str,
+    llm_agent: Optional[str] = None,
+    llm_args_agent: Optional[dict] = None,
+    llm_user: Optional[str] = None,
+    llm_args_user: Optional[dict] = None,
+    num_trials: int = 1,
+    max_steps: int = 100,
+    max_errors: int = 10,
+    simulation_timeout: Optional[float] = None,
+    save_to: Optional[str | Path] = None,
+    console_display: bool = True,
+    evaluation_type: EvaluationType = EvaluationType.ALL,
+    max_concurrency: int = 1,
+    seed: Optional[int] = 300,
+    log_level: Optional[str] = "INFO",
+    cur_transfer_dir: str = '',
+    model_config_path: str = '',
+    use_model_tool: bool = False,
+    gold_cache_dir: Optional[str] = None,
+    duration_history: Optional[list[str]] = None,
+    longest_first: bool = True,
+    keep_messages: bool = True,
+) -> Results:
+    """
+    Runs tasks for a given domain in the current asyncio event loop.
+    Same as run_tasks, but simulations are coroutines instead of threads, so
+    max_concurrency can be in the thousands.
+    Args:
+        See run_tasks.
+    Returns:
+        The simulation results, in the order they finished.
+    """
+    simulation_results, save_dir, seeds = _setup_run(
+        domain=domain,
+        tasks=tasks,
+        agent=agent,
+        user=user,
+        llm_agent=llm_agent,
+        llm_args_agent=llm_args_agent,
+        llm_user=llm_user,
+        llm_args_user=llm_args_user,
+        num_trials=num_trials,
+        max_steps=max_steps,
+        max_errors=max_errors,
+        save_to=save_to,
+        seed=seed,
+        log_level=log_level,
+    )
+
+    async def _run(task: Task, trial: int, seed: int, progress_str: str) -> SimulationRun:
+        start_time = time.time()
+        RUN_METRICS.simulation_started()
+        try:
+            simulation = await run_task_async(
+                domain=domain,
+                task=task,
+                agent=agent,
+                user=user,
+                llm_agent=llm_agent,
+                llm_args_agent=llm_args_agent,
+                llm_user=llm_user,
+                llm_args_user=llm_args_user,
+                max_steps=max_steps,
+                max_errors=max_errors,
+                simulation_timeout=simulation_timeout,
+                evaluation_type=evaluation_type,
+                seed=seed,
+                cur_transfer_dir=cur_transfer_dir,
+                model_config_path=model_config_path,
+                use_model_tool=use_model_tool,
+                gold_cache_dir=gold_cache_dir,
+            )
+        except Exception:
+            RUN_METRICS.simulation_failed()
+            raise
+        latency = time.time()-start_time
+        simulation.trial = trial
+        # NOTE: Serializing and logging the simulation would block the event loop.
+        await asyncio.to_thread(_save_simulation, save_dir, simulation, latency=latency)
+        return simulation
+
+    args, predicted_makespan = _plan_run(
+        tasks=tasks,
+        num_trials=num_trials,
+        seeds=seeds,
+        save_dir=save_dir,
+        max_concurrency=max_concurrency,
+        duration_history=duration_history,
+        longest_first=longest_first,
+    )
+    start_time = time.time()
+    try:
+        async for simulation in _aiter_completed(_run, args, max_concurrency=max_concurrency):
+            if not keep_messages:
+                simulation = summarize_simulation(simulation)
+            simulation_results.simulations.append(simulation)
+        _report_makespan(time.time() - start_time, predicted_makespan)
+    finally:
+        close_results_log(save_dir)
+    print(len(simulation_results.simulations))
+    return simulation_results
+
+
+async def _aiter_completed(fn, args: Iterable[tuple], max_concurrency: int) -> AsyncIterator:
+    """
+    Same as _iter_completed, but fn is a coroutine function run in the current event loop.
+    """
+    args = iter(args)
+    in_flight = {asyncio.ensure_future(fn(*arg)) for arg in itertools.islice(args, max_concurrency)}
+    try:
+        while in_flight:
+            done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for arg in itertools.islice(args, len(done)):
+                in_flight.add(asyncio.ensure_future(fn(*arg)))
+            for future in done:
+                yield future.result()
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+
+def _run_pipelined(
+    args: list[tuple[Task, int, int, str]],
+    make_orchestrator,
+    save_dir: str,
+    domain: str,
+    evaluation_type: EvaluationType,
+    max_concurrency: int,
+    eval_concurrency: int,
+    eval_queue_size: int,
+    gold_cache_dir: Optional[str] = None,
+) -> Iterator[SimulationRun]:
+    """
+    Runs the conversations on a thread pool and evaluate_simulation on a process pool.
+    Finished conversations are handed over through a bounded queue, so when evaluation
+    falls behind the conversation threads wait instead of piling up trajectories.
+    Simulations are only started while fewer than max_concurrency + eval_queue_size +
+    eval_concurrency of them are in flight, and are yielded as soon as they are evaluated.
+    Args:
+        args: The (task, trial, seed, progress_str) of every simulation to run.
+        make_orchestrator: Builds the orchestrator of a simulation. Returns the orchestrator and its start time.
+        save_dir: The directory where each simulation is saved.
+    Yields:
+        The simulations, in the order they finished. Errors are raised once all the simulations are done.
+    """
+    pending = queue.Queue(maxsize=eval_queue_size)
+    # Evaluated simulations, or the errors of the simulations that failed.
+    finished = queue.Queue()
+    errors = []
+
+    def _produce(task: Task, trial: int, seed: int, progress_str: str):
+        RUN_METRICS.simulation_started()
+        try:
+            orchestrator, start_time = make_orchestrator(task, trial, seed, progress_str)
+            simulation = orchestrator.run()
+        except Exception as e:
+            RUN_METRICS.simulation_failed()
+            finished.put(e)
+            return
+        simulation.trial = trial
+        pending.put((task, simulation, orchestrator.solo_mode, start_time))
+
+    def _consume(eval_executor: ProcessPoolExecutor):
+        # One consumer per evaluation process, each keeping a single evaluation in flight.
+        while True:
+            item = pending.get()
+            if item is None:
+                return
+            task, simulation, solo_mode, start_time = item
+            try:
+                evaluation_start = time.time()
+                reward_info = eval_executor.submit(
+                    evaluate_simulation,
+                    domain=domain,
+                    task=task,
+                    simulation=simulation,
+                    evaluation_type=evaluation_type,
+                    solo_mode=solo_mode,
+                    gold_cache_dir=gold_cache_dir,
+                ).result()
+                add_evaluation_span(simulation, evaluation_start, time.time())
+                RUN_METRICS.record_evaluation(time.time() - evaluation_start)
+                simulation.reward_info = reward_info
+                logger.info(
+                    f"FINISHED SIMULATION: Domain: {domain}, Task: {task.id}. Reward: {reward_info.reward}"
+                )
+                _save_simulation(save_dir, simulation, latency=time.time()-start_time)
+            except Exception as e:
+                # Keep draining the queue so that the conversation threads never block on it.
+                RUN_METRICS.simulation_failed()
+                finished.put(e)
+                continue
+            finished.put(simulation)
+
+    max_in_flight = max_concurrency + eval_queue_size + eval_concurrency
+    args = iter(args)
+    RUN_METRICS.set_queue_depth_fn(pending.qsize)
+    with ThreadPoolExecutor(max_workers=max_concurrency) as io_executor, \
+            ThreadPoolExecutor(max_workers=eval_concurrency) as consumer_executor, \
+            ProcessPoolExecutor(
+                max_workers=eval_concurrency,
+                mp_context=multiprocessing.get_context("spawn"),
+            ) as eval_executor:
+        consumers = [consumer_executor.submit(_consume, eval_executor) for _ in range(eval_concurrency)]
+        conversations = [io_executor.submit(_produce, *arg) for arg in itertools.islice(args, max_in_flight)]
+        num_in_flight = len(conversations)
+        try:
+            while num_in_flight:
+                item = finished.get()
+                num_in_flight -= 1
+                for arg in itertools.islice(args, 1):
+                    conversations.append(io_executor.submit(_produce, *arg))
+                    num_in_flight += 1
+                if isinstance(item, Exception):
+                    errors.append(item)
+                    continue
+                yield item
+        finally:
+            # If the caller stops early, let the started conversations finish and be evaluated.
+            wait(conversations)
+            for _ in consumers:
+                pending.put(None)
+            wait(consumers)
+            RUN_METRICS.set_queue_depth_fn(None)
+    for future in consumers:
+        future.result()
+    if errors:
+        raise errors[0]
+
+
+def _setup_run(
+    domain: str,
+    tasks: list[Task],
+    agent: str,
+    user: str,
+    llm_agent: Optional[str],
+    llm_args_agent: Optional[dict],
+    llm_user: Optional[str],
+    llm_args_user: Optional[dict],
+    num_trials: int,
+    max_steps: int,
+    max_errors: int,
+    save_to: Optional[str | Path],
+    seed: Optional[int],
+    log_level: Optional[str],
+) -> tuple[Results, str, list[int]]:
+    """
+    Validates the run arguments, prepares the output location and draws the trial seeds.
     Returns:
-        The simulation results and the annotations (if llm_review is True).
+        The (empty) simulation results, the directory where each simulation is saved and the seed of each trial.
     """
     if isinstance(save_to, str):
         save_to = Path(save_to)
     save_dir = str(save_to)
     assert save_dir.endswith('.json')
     save_dir = save_dir[:-len('.json')]
-    # updated_tasks = []
 
     # Set log level from config
     logger.remove()
@@ -231,8 +866,6 @@ def run_tasks(
     if "seed" in llm_args_user:
         logger.warning("Each trial will modify the seed for the user")
 
-    lock = multiprocessing.Lock()
-
     info = get_info(
         domain=domain,
         agent=agent,
@@ -251,7 +884,6 @@ def run_tasks(
         tasks=tasks,
         simulations=[],
     )
-    done_runs = set()
     if not os.path.isdir(save_dir):
         os.makedirs(save_dir)
     if save_to is not None:
@@ -263,92 +895,87 @@ def run_tasks(
         print(f"Saving simulation batch to {save_to}")
         with open(save_to, "w") as fp:
             fp.write(simulation_results.model_dump_json(indent=2))
+    return simulation_results, save_dir, seeds
 
-    def _save(simulation: SimulationRun,latency):
-        # print(268,'save')
-        if save_to is None:
-            print('269 save_to is None')
-            return
-        # with lock:
-            # with open(save_to, "r") as fp:
-            #     ckpt = json.load(fp)
-            # ckpt["simulations"].append(cur_simulation)
-            # correct = 0
-            # for g in ckpt["simulations"]:
-            #     correct += g['reward_info']['reward']
-            # print("Correct:",correct,"Total:",len(ckpt["simulations"]))
-            # with open(save_to, "w") as fp:
-            #     json.dump(ckpt, fp, indent=2)
-        cur_simulation = simulation.model_dump()
-        # print('283 after model dump')
-        cur_simulation['latency'] = latency
-        # print('save to',os.path.join(save_dir,cur_simulation['id']+'.json'))
-        with open(os.path.join(save_dir,cur_simulation['id']+'.json'),'w') as f:
-            json.dump(cur_simulation,f,indent=2)
-            
 
-    def _run(task: Task, trial: int, seed: int, progress_str: str) -> SimulationRun:
-        # ConsoleDisplay.console.print(
-        #     f"[bold green]{progress_str} Running task {task.id}, trial {trial + 1}[/bold green]"
-        # )
-        # try:
-        start_time = time.time()
-        simulation = run_task(
-            domain=domain,
-            task=task,
-            agent=agent,
-            user=user,
-            llm_agent=llm_agent,
-            llm_args_agent=llm_args_agent,
-            llm_user=llm_user,
-            llm_args_user=llm_args_user,
-            max_steps=max_steps,
-            max_errors=max_errors,
-            evaluation_type=evaluation_type,
-            seed=seed,
-            cur_transfer_dir=cur_transfer_dir,
-            model_config_path=model_config_path,
-            use_model_tool=use_model_tool
-        )
-        # print(310,'before save')
-        latency = time.time()-start_time
-        simulation.trial = trial
-        _save(simulation,latency=latency)
-        # except Exception as e:
-        #     print(f"Tau run error: {e}")
-        #     with open(os.path.join(save_dir,f'{task.id}.json'),'w') as f:
-        #         json.dump({
-        #             'task_id': task.id,
-        #             'tau_run_error': f"Tau run error: {e}"
-        #         },f,indent=2)
-        #     simulation = None
-        return simulation
+def _save_simulation(save_dir: str, simulation: SimulationRun, latency: float):
+    """
+    Appends one simulation to the results log of save_dir.
+    """
+    get_results_log(save_dir).append(simulation, latency=latency)
+    RUN_METRICS.simulation_finished(simulation)
+
+
+def _import_legacy_simulations(save_dir: str, results_log: ResultsLog):
+    """
+    Appends the simulations saved as <save_dir>/<simulation id>.json by runs that predate the
+    results log, so that they are resumed as well.
+    """
+    num_imported = 0
+    for subfile in sorted(os.listdir(save_dir)):
+        if not subfile.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(save_dir,subfile)) as f:
+                o = json.load(f)
+            latency = o.pop('latency', None)
+            simulation = SimulationRun.model_validate(o)
+        except Exception:
+            continue
+        results_log.append(simulation, latency=latency)
+        num_imported += 1
+    if num_imported > 0:
+        logger.info(f"Imported {num_imported} simulations into the results log of {save_dir}")
+
+
+def get_done_runs(save_dir: str) -> set[ResultKey]:
+    """
+    Gets the (task_id, trial, seed) of the simulations already saved in save_dir.
+    Only the index of the results log is read.
+    """
+    results_log = get_results_log(save_dir)
+    if len(results_log) == 0 and os.path.isdir(save_dir):
+        _import_legacy_simulations(save_dir, results_log)
+    return results_log.get_keys()
+
+
+def consolidate_results(save_to: str | Path) -> Results:
+    """
+    Writes the legacy Results JSON of a run: the info and tasks written to save_to when the
+    run started, and every simulation of the results log of the run (including resumed ones).
+    """
+    save_to = Path(save_to)
+    save_dir = str(save_to)[:-len('.json')]
+    header = Results.load(save_to)
+    results = get_results_log(save_dir).to_results(info=header.info, tasks=header.tasks)
+    tmp_path = f"{save_to}.{os.getpid()}.tmp"
+    results.save(tmp_path)
+    os.replace(tmp_path, save_to)
+    return results
+
 
+def _make_run_args(
+    tasks: list[Task],
+    num_trials: int,
+    seeds: list[int],
+    done_runs: Optional[set[ResultKey]] = None,
+) -> list[tuple[Task, int, int, str]]:
+    """
+    Lists the (task, trial, seed, progress_str) of every simulation to run.
+    Simulations whose (task_id, trial, seed) is in done_runs are skipped.
+    """
+    done_runs = done_runs or set()
     args = []
     for trial in range(num_trials):
         for i, task in enumerate(tasks):
-            if (trial, task.id, seeds[trial]) in done_runs:
+            if (task.id, trial, seeds[trial]) in done_runs:
                 ConsoleDisplay.console.print(
                     f"[bold yellow]Skipping task {task.id}, trial {trial} because it has already been run.[/bold yellow]"
                 )
                 continue
             progress_str = f"{i}/{len(tasks)} (trial {trial + 1}/{num_trials})"
             args.append((task, trial, seeds[trial], progress_str))
-
-    # res = list(map(_run, *zip(*args)))
-    # if res:
-    #     simulation_results.simulations.extend(res)
-    # print(309,'len(simulation_results.simulations)', len(simulation_results.simulations))
-    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
-        res = list(executor.map(_run, *zip(*args)))
-        if res:
-            simulation_results.simulations.extend(res)
-        print(len(simulation_results.simulations))
-    # ConsoleDisplay.console.print(
-    #     "\n✨ [bold green]Successfully completed all simulations![/bold green]\n"
-    #     "To review the simulations, run: [bold blue]tau2 view[/bold blue]"
-    # )
-    return simulation_results
+    return args
 
 
 def run_task(
@@ -362,11 +989,13 @@ def run_task(
     llm_args_user: Optional[dict] = None,
     max_steps: int = 100,
     max_errors: int = 10,
+    simulation_timeout: Optional[float] = None,
     evaluation_type: EvaluationType = EvaluationType.ALL,
     seed: Optional[int] = None,
     cur_transfer_dir: str = '',
     model_config_path: str = '',
-    use_model_tool: bool = False
+    use_model_tool: bool = False,
+    gold_cache_dir: Optional[str] = None,
 ) -> SimulationRun:
     """
     Runs tasks for a given domain.
@@ -383,12 +1012,146 @@ def run_task(
          llm_args_user (dict): The arguments to pass to the LLM for the user.
          max_steps (int): The maximum number of steps to run the simulation.
          max_errors (int): The maximum number of errors to allow in the simulation.
+         simulation_timeout (float): The number of seconds the LLM calls of the simulation may take, retries included.
          evaluation_type (EvaluationType): The type of evaluation to use.
          seed (int): The seed to use for the simulation.
      Returns:
          The simulation run.
     """
 
+    orchestrator = build_orchestrator(
+        domain=domain,
+        task=task,
+        agent=agent,
+        user=user,
+        llm_agent=llm_agent,
+        llm_args_agent=llm_args_agent,
+        llm_user=llm_user,
+        llm_args_user=llm_args_user,
+        max_steps=max_steps,
+        max_errors=max_errors,
+        simulation_timeout=simulation_timeout,
+        seed=seed,
+        cur_transfer_dir=cur_transfer_dir,
+        model_config_path=model_config_path,
+        use_model_tool=use_model_tool,
+    )
+    simulation = orchestrator.run()
+
+    evaluation_start = time.time()
+    reward_info = evaluate_simulation(
+        domain=domain,
+        task=task,
+        simulation=simulation,
+        evaluation_type=evaluation_type,
+        solo_mode=orchestrator.solo_mode,
+        gold_cache_dir=gold_cache_dir,
+    )
+    add_evaluation_span(simulation, evaluation_start, time.time())
+    RUN_METRICS.record_evaluation(time.time() - evaluation_start)
+
+    simulation.reward_info = reward_info
+
+    logger.info(
+        f"FINISHED SIMULATION: Domain: {domain}, Task: {task.id}, Agent: {orchestrator.agent.__class__.__name__}, User: {orchestrator.user.__class__.__name__}. Reward: {reward_info.reward}"
+    )
+    return simulation
+
+
+async def run_task_async(
+    domain: str,
+    task: Task,
+    agent: str,
+    user: str,
+    llm_agent: Optional[str] = None,
+    llm_args_agent: Optional[dict] = None,
+    llm_user: Optional[str] = None,
+    llm_args_user: Optional[dict] = None,
+    max_steps: int = 100,
+    max_errors: int = 10,
+    simulation_timeout: Optional[float] = None,
+    evaluation_type: EvaluationType = EvaluationType.ALL,
+    seed: Optional[int] = None,
+    cur_transfer_dir: str = '',
+    model_config_path: str = '',
+    use_model_tool: bool = False,
+    gold_cache_dir: Optional[str] = None,
+) -> SimulationRun:
+    """
+    Async version of run_task. The conversation runs in an AsyncOrchestrator and the
+    evaluation runs in a worker thread, so the event loop is never blocked by an LLM call.
+    Args:
+        See run_task.
+    Returns:
+        The simulation run.
+    """
+    orchestrator = build_orchestrator(
+        domain=domain,
+        task=task,
+        agent=agent,
+        user=user,
+        llm_agent=llm_agent,
+        llm_args_agent=llm_args_agent,
+        llm_user=llm_user,
+        llm_args_user=llm_args_user,
+        max_steps=max_steps,
+        max_errors=max_errors,
+        simulation_timeout=simulation_timeout,
+        seed=seed,
+        cur_transfer_dir=cur_transfer_dir,
+        model_config_path=model_config_path,
+        use_model_tool=use_model_tool,
+        orchestrator_class=AsyncOrchestrator,
+    )
+    simulation = await orchestrator.arun()
+
+    evaluation_start = time.time()
+    reward_info = await asyncio.to_thread(
+        evaluate_simulation,
+        domain=domain,
+        task=task,
+        simulation=simulation,
+        evaluation_type=evaluation_type,
+        solo_mode=orchestrator.solo_mode,
+        gold_cache_dir=gold_cache_dir,
+    )
+    add_evaluation_span(simulation, evaluation_start, time.time())
+    RUN_METRICS.record_evaluation(time.time() - evaluation_start)
+
+    simulation.reward_info = reward_info
+
+    logger.info(
+        f"FINISHED SIMULATION: Domain: {domain}, Task: {task.id}, Agent: {orchestrator.agent.__class__.__name__}, User: {orchestrator.user.__class__.__name__}. Reward: {reward_info.reward}"
+    )
+    return simulation
+
+
+def build_orchestrator(
+    domain: str,
+    task: Task,
+    agent: str,
+    user: str,
+    llm_agent: Optional[str] = None,
+    llm_args_agent: Optional[dict] = None,
+    llm_user: Optional[str] = None,
+    llm_args_user: Optional[dict] = None,
+    max_steps: int = 100,
+    max_errors: int = 10,
+    simulation_timeout: Optional[float] = None,
+    seed: Optional[int] = None,
+    cur_transfer_dir: str = '',
+    model_config_path: str = '',
+    use_model_tool: bool = False,
+    orchestrator_class: type[Orchestrator] = Orchestrator,
+) -> Orchestrator:
+    """
+    Builds the environment, agent and user of a task and wires them into an orchestrator.
+    Args:
+        See run_task.
+        orchestrator_class: The orchestrator class to instantiate.
+    Returns:
+        The orchestrator, ready to run.
+    """
     if max_steps <= 0:
         raise ValueError("Max steps must be greater than 0")
     if max_errors <= 0:
@@ -459,7 +1222,7 @@ def run_task(
         llm_args=llm_args_user,
     )
 
-    orchestrator = Orchestrator(
+    orchestrator = orchestrator_class(
         domain=domain,
         agent=agent,
         user=user,
@@ -467,31 +1230,14 @@ def run_task(
         task=task,
         max_steps=max_steps,
         max_errors=max_errors,
+        simulation_timeout=simulation_timeout,
         seed=seed,
         solo_mode=solo_mode,
         cur_transfer_dir=cur_transfer_dir,
         model_config_path=model_config_path,
         use_model_tool=use_model_tool,
     )
-    simulation = orchestrator.run()
-    # print(472,'after run')
-
-    reward_info = evaluate_simulation(
-        domain=domain,
-        task=task,
-        simulation=simulation,
-        evaluation_type=evaluation_type,
-        solo_mode=solo_mode,
-    )
-    # print(481,'after eval')
-
-    simulation.reward_info = reward_info
-    # print(495,reward_info)
-
-    logger.info(
-        f"FINISHED SIMULATION: Domain: {domain}, Task: {task.id}, Agent: {agent.__class__.__name__}, User: {user.__class__.__name__}. Reward: {reward_info.reward}"
-    )
-    return simulation
+    return orchestrator
 
 
 def get_info(
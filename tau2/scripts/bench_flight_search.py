@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from tau2.domains.airline.data_model import DirectFlight, FlightDB
+from tau2.domains.airline.tools import AirlineTools
+from tau2.environment.db import clear_db_snapshots
+from tau2.utils.display import ConsoleDisplay
+
+AIRPORTS = ["JFK", "LAX", "ORD", "SFO", "SEA"]
+
+
+def make_db(num_flights: int, num_dates: int, seed: int = 0) -> FlightDB:
+    """A synthetic flight schedule, every flight flying every date."""
+    rng = random.Random(seed)
+    dates = [f"2024-05-{day:02d}" for day in range(1, num_dates + 1)]
+    flights = {}
+    for i in range(num_flights):
+        origin, destination = rng.sample(AIRPORTS, 2)
+        departure = rng.randrange(0, 24)
+        arrival = departure + rng.randrange(1, 6)
+        flight_date = {
+            "status": "available",
+            "available_seats": {"basic_economy": 9, "economy": 9, "business": 9},
+            "prices": {"basic_economy": 50, "economy": 100, "business": 400},
+        }
+        flights[f"HAT{i:03d}"] = {
+            "flight_number": f"HAT{i:03d}",
+            "origin": origin,
+            "destination": destination,
+            "scheduled_departure_time_est": f"{departure:02d}:00:00",
+            "scheduled_arrival_time_est": f"{arrival % 24:02d}:00:00"
+            + ("+1" if arrival >= 24 else ""),
+            "dates": {date: flight_date for date in dates},
+        }
+    return FlightDB(flights=flights, users={}, reservations={})
+
+
+class ScanAirlineTools(AirlineTools):
+    """Flight search by a full scan of the flights, as before the route index."""
+
+    def _search_direct_flight(self, date, origin=None, destination=None, leave_after=None):
+        results = []
+        for flight in self.db.flights.values():
+            if (
+                (origin is None or flight.origin == origin)
+                and (destination is None or flight.destination == destination)
+                and date in flight.dates
+                and flight.dates[date].status == "available"
+                and (leave_after is None or flight.scheduled_departure_time_est >= leave_after)
+            ):
+                results.append(
+                    DirectFlight(
+                        flight_number=flight.flight_number,
+                        origin=flight.origin,
+                        destination=flight.destination,
+                        status="available",
+                        scheduled_departure_time_est=flight.scheduled_departure_time_est,
+                        scheduled_arrival_time_est=flight.scheduled_arrival_time_est,
+                        available_seats=flight.dates[date].available_seats,
+                        prices=flight.dates[date].prices,
+                    )
+                )
+        return results
+
+    def search_onestop_flight(self, origin, destination, date):
+        results = []
+        for result1 in self._search_direct_flight(date=date, origin=origin):
+            result1.date = date
+            date2 = (
+                f"2024-05-{int(date[-2:]) + 1}"
+                if "+1" in result1.scheduled_arrival_time_est
+                else date
+            )
+            for result2 in self._search_direct_flight(
+                date=date2,
+                origin=result1.destination,
+                destination=destination,
+                leave_after=result1.scheduled_arrival_time_est,
+            ):
+                result2.date = date2
+                results.append([result1, result2])
+        return results
+
+
+def time_first_searches(tools_class: type[AirlineTools], path: Path, repeat: int) -> float:
+    """Best time of one one-stop and one direct search, on a freshly loaded database."""
+    best = float("inf")
+    for _ in range(repeat):
+        tools = tools_class(FlightDB.load_snapshot(path))
+        start = time.perf_counter()
+        tools.search_onestop_flight("JFK", "LAX", "2024-05-15")
+        tools.search_direct_flight("JFK", "LAX", "2024-05-15")
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(num_flights: int, num_dates: int, repeat: int):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "db.json"
+        make_db(num_flights, num_dates).dump(str(path))
+        try:
+            indexed = time_first_searches(AirlineTools, path, repeat)
+            scanned = time_first_searches(ScanAirlineTools, path, repeat)
+        finally:
+            clear_db_snapshots()
+    ConsoleDisplay.console.print(
+        f"First searches on a fresh DB of {num_flights} flights x {num_dates} dates: "
+        f"indexed {indexed * 1e3:.2f} ms, full scan {scanned * 1e3:.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Time the first flight searches of a simulation, with the route index and with a full scan."
+    )
+    parser.add_argument("--num-flights", type=int, default=300, help="Number of flights. Default is 300.")
+    parser.add_argument("--num-dates", type=int, default=30, help="Number of dates per flight. Default is 30.")
+    parser.add_argument("--repeat", type=int, default=20, help="Number of fresh DBs to time. Default is 20.")
+    args = parser.parse_args()
+    main(args.num_flights, args.num_dates, args.repeat)
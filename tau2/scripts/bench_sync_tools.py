@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+import argparse
+import datetime
+import time
+
+from tau2.domains.telecom.data_model import (
+    Address,
+    Bill,
+    BillStatus,
+    Customer,
+    Device,
+    Line,
+    LineStatus,
+    Plan,
+    TelecomDB,
+)
+from tau2.domains.telecom.environment import TelecomEnvironment
+from tau2.domains.telecom.tools import TelecomTools
+from tau2.domains.telecom.user_data_model import TelecomUserDB, UserSurroundings
+from tau2.domains.telecom.user_tools import TelecomUserTools
+from tau2.utils.display import ConsoleDisplay
+
+DATE = datetime.date(2025, 1, 1)
+
+
+def make_db(num_customers: int) -> TelecomDB:
+    """A synthetic telecom database, each customer with one line, one device and two bills."""
+    plans = [
+        Plan(
+            plan_id=f"P{i}",
+            name=f"Plan {i}",
+            data_limit_gb=10.0,
+            price_per_month=30.0,
+            data_refueling_price_per_gb=2.0,
+        )
+        for i in range(3)
+    ]
+    customers, lines, bills, devices = [], [], [], []
+    for i in range(num_customers):
+        lines.append(
+            Line(
+                line_id=f"L{i}",
+                phone_number=f"555-200-{i:04d}",
+                status=LineStatus.ACTIVE,
+                plan_id=f"P{i % 3}",
+                device_id=f"D{i}",
+            )
+        )
+        devices.append(
+            Device(device_id=f"D{i}", device_type="phone", model="X", is_esim_capable=True)
+        )
+        bill_ids = [f"B{i}_{j}" for j in range(2)]
+        for bill_id in bill_ids:
+            bills.append(
+                Bill(
+                    bill_id=bill_id,
+                    customer_id=f"C{i}",
+                    period_start=DATE,
+                    period_end=DATE,
+                    issue_date=DATE,
+                    total_due=30.0,
+                    due_date=DATE,
+                    status=BillStatus.PAID,
+                )
+            )
+        customers.append(
+            Customer(
+                customer_id=f"C{i}",
+                full_name=f"Customer {i}",
+                date_of_birth="1990-01-01",
+                email=f"c{i}@example.com",
+                phone_number=f"555-100-{i:04d}",
+                address=Address(street="1 Main St", city="Springfield", state="IL", zip_code="62701"),
+                line_ids=[f"L{i}"],
+                bill_ids=bill_ids,
+                created_at=datetime.datetime(2025, 1, 1),
+            )
+        )
+    return TelecomDB(plans=plans, customers=customers, lines=lines, bills=bills, devices=devices)
+
+
+class ScanTelecomTools(TelecomTools):
+    """The lookups used by sync_tools, by a full scan of the collections, as before the indexes."""
+
+    def get_customer_by_phone(self, phone_number):
+        for customer in self.db.customers:
+            if customer.phone_number == phone_number:
+                return customer
+            for line_id in customer.line_ids:
+                line = self._get_line_by_id(line_id)
+                if line and line.phone_number == phone_number:
+                    return customer
+        raise ValueError(f"Customer with phone number {phone_number} not found")
+
+    def _get_line_by_phone(self, phone_number):
+        for line in self.db.lines:
+            if line.phone_number == phone_number:
+                return line
+        raise ValueError(f"Line with phone number {phone_number} not found")
+
+    def _get_line_by_id(self, line_id):
+        for line in self.db.lines:
+            if line.line_id == line_id:
+                return line
+        raise ValueError(f"Line with ID {line_id} not found")
+
+    def _get_plan_by_id(self, plan_id):
+        for plan in self.db.plans:
+            if plan.plan_id == plan_id:
+                return plan
+        raise ValueError(f"Plan with ID {plan_id} not found")
+
+    def _get_bill_by_id(self, bill_id):
+        for bill in self.db.bills:
+            if bill.bill_id == bill_id:
+                return bill
+        raise ValueError(f"Bill with ID {bill_id} not found")
+
+
+class ScanTelecomEnvironment(TelecomEnvironment):
+    """Syncs on every step, as before the sync was skipped when nothing changed."""
+
+    def tools_changed_since_sync(self) -> bool:
+        return True
+
+
+def make_env(env_class: type[TelecomEnvironment], tools_class: type[TelecomTools], num_customers: int):
+    # The user is the last customer, so that the scans go through the whole database.
+    phone_number = f"555-200-{num_customers - 1:04d}"
+    user_tools = TelecomUserTools(
+        TelecomUserDB(surroundings=UserSurroundings(phone_number=phone_number))
+    )
+    env = env_class("telecom", "", tools_class(make_db(num_customers)), user_tools)
+    env.sync_tools()
+    return env
+
+
+def time_steps(env: TelecomEnvironment, num_steps: int, write: bool) -> float:
+    """Mean time of sync_tools per step. If write, a WRITE tool runs before each step."""
+    total = 0.0
+    for _ in range(num_steps):
+        if write:
+            with env.tools.db_write_scope():
+                pass
+        start = time.perf_counter()
+        env.sync_tools()
+        total += time.perf_counter() - start
+    return total / num_steps
+
+
+def main(num_customers: list[int], num_steps: int):
+    for n in num_customers:
+        before = time_steps(make_env(ScanTelecomEnvironment, ScanTelecomTools, n), num_steps, write=False)
+        env = make_env(TelecomEnvironment, TelecomTools, n)
+        after_write = time_steps(env, num_steps, write=True)
+        after_unchanged = time_steps(env, num_steps, write=False)
+        ConsoleDisplay.console.print(
+            f"{n} customers, sync_tools per step: full scan {before * 1e6:.1f} us, "
+            f"indexed {after_write * 1e6:.1f} us, skipped when unchanged {after_unchanged * 1e6:.1f} us"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Time TelecomEnvironment.sync_tools per step, with full scans and with the indexes."
+    )
+    parser.add_argument(
+        "--num-customers",
+        type=int,
+        nargs="+",
+        default=[100, 2000],
+        help="Numbers of customers of the synthetic databases. Default is 100 2000.",
+    )
+    parser.add_argument("--num-steps", type=int, default=200, help="Number of steps to time. Default is 200.")
+    args = parser.parse_args()
+    main(args.num_customers, args.num_steps)
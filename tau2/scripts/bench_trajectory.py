@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+import argparse
+import time
+import tracemalloc
+from copy import deepcopy
+from typing import Callable
+
+from tau2.data_model.message import AssistantMessage, Message, ToolCall, ToolMessage, UserMessage
+from tau2.orchestrator.orchestrator import Orchestrator
+from tau2.utils.display import ConsoleDisplay
+
+
+def make_messages(num_messages: int, payload_size: int) -> list[Message]:
+    """A conversation of user turns and agent tool calls, with large raw_data and tool outputs."""
+    payload = "x" * payload_size
+    messages = []
+    while len(messages) < num_messages:
+        i = len(messages)
+        messages.append(UserMessage(role="user", content=f"Request {i}"))
+        messages.append(
+            AssistantMessage(
+                role="assistant",
+                tool_calls=[ToolCall(id=str(i), name="lookup", arguments={"key": str(i)})],
+                raw_data={"content": payload, "tool_calls": [{"name": "lookup"}]},
+            )
+        )
+        messages.append(ToolMessage(id=str(i), role="tool", content=payload, requestor="assistant"))
+    for turn_idx, message in enumerate(messages[:num_messages]):
+        message.turn_idx = turn_idx
+    return messages[:num_messages]
+
+
+def get_trajectory_with_deepcopies(trajectory: list[Message]) -> list[Message]:
+    """get_trajectory as before: deep copies of the messages, sorted by timestamp."""
+    messages = sorted(deepcopy(trajectory), key=lambda x: x.get_timestamp())
+    result = []
+    for i, msg in enumerate(messages):
+        msg = deepcopy(msg)
+        msg.turn_idx = i
+        result.append(msg)
+    return result
+
+
+def measure(fn: Callable[[], list[Message]], repeat: int) -> tuple[float, int]:
+    """Best time, and peak memory allocated, of fn."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main(num_messages: int, payload_size: int, repeat: int):
+    orchestrator = Orchestrator.__new__(Orchestrator)
+    orchestrator.trajectory = make_messages(num_messages, payload_size)
+    for name, fn in [
+        ("deep copies", lambda: get_trajectory_with_deepcopies(orchestrator.trajectory)),
+        ("get_trajectory", orchestrator.get_trajectory),
+    ]:
+        seconds, peak = measure(fn, repeat)
+        ConsoleDisplay.console.print(
+            f"{name}: {seconds * 1e3:.3f} ms, {peak / 1e6:.3f} MB peak allocated"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Time get_trajectory, and the deep copies it used to make, on a long simulation."
+    )
+    parser.add_argument("--num-messages", type=int, default=600, help="Number of messages. Default is 600.")
+    parser.add_argument("--payload-size", type=int, default=2000, help="Size of the raw_data and tool outputs. Default is 2000.")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of timed runs. Default is 5.")
+    args = parser.parse_args()
+    main(args.num_messages, args.payload_size, args.repeat)
@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+import argparse
+
+from tau2.run import consolidate_results
+from tau2.utils.display import ConsoleDisplay
+
+
+def main(save_to: str):
+    results = consolidate_results(save_to)
+    ConsoleDisplay.console.print(
+        f"[bold green]Wrote {len(results.simulations)} simulations to {save_to}[/bold green]"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Write the Results JSON of a run from its results log."
+    )
+    parser.add_argument("save_to", type=str, help="The output file of the run.")
+    args = parser.parse_args()
+    main(args.save_to)
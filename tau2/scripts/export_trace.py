@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+
+from tau2.data_model.simulation import Results
+from tau2.utils.display import ConsoleDisplay
+from tau2.utils.results_log import iter_logged_simulations
+from tau2.utils.tracing import to_chrome_trace, to_otel_json
+
+
+def main(path: str, output: str, trace_format: str):
+    if os.path.isdir(path):
+        simulations = list(iter_logged_simulations(path))
+    else:
+        simulations = Results.load(path).simulations
+    if trace_format == "chrome":
+        trace = to_chrome_trace(simulations)
+    else:
+        trace = to_otel_json(simulations)
+    with open(output, "w") as fp:
+        json.dump(trace, fp)
+    num_traced = sum(1 for simulation in simulations if simulation.spans)
+    ConsoleDisplay.console.print(
+        f"[bold green]Wrote the spans of {num_traced}/{len(simulations)} simulations to {output}[/bold green]"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Export the per-phase timing spans of a run as a Chrome trace or OpenTelemetry JSON."
+    )
+    parser.add_argument(
+        "path", type=str, help="The results log directory or the results file of the run."
+    )
+    parser.add_argument("output", type=str, help="The trace file to write.")
+    parser.add_argument(
+        "--format",
+        type=str,
+        choices=["chrome", "otel"],
+        default="chrome",
+        help="chrome for chrome://tracing or Perfetto, otel for OTLP JSON. Default is chrome.",
+    )
+    args = parser.parse_args()
+    main(args.path, args.output, args.format)
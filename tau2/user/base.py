@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC, abstractmethod
 from copy import deepcopy
 from typing import Optional
@@ -100,7 +101,7 @@ class BaseUser(ABC):
         self.instructions = instructions
 
     @abstractmethod
-    async def get_init_state(
+    def get_init_state(
         self, message_history: Optional[list[Message]] = None
     ) -> UserState:
         """Get the initial state of the user simulator.
@@ -114,7 +115,7 @@ class BaseUser(ABC):
         pass
 
     @abstractmethod
-    async def generate_next_message(
+    def generate_next_message(
         self, message: ValidUserInputMessage, state: UserState
     ) -> tuple[UserMessage, UserState]:
         """Generate the next message from an assistant message.
@@ -128,6 +129,22 @@ class BaseUser(ABC):
         """
         pass
 
+    async def agenerate_next_message(
+        self, message: ValidUserInputMessage, state: UserState
+    ) -> tuple[UserMessage, UserState]:
+        """Async version of generate_next_message.
+        By default, the sync implementation is run in a worker thread.
+        Subclasses calling an LLM should override this to await the LLM directly.
+
+        Args:
+            message: The agent message.
+            state: The state of the user simulator.
+
+        Returns:
+            A tuple containing the user message and the new state of the user simulator.
+        """
+        return await asyncio.to_thread(self.generate_next_message, message, state)
+
     @classmethod
     @abstractmethod
     def is_stop(cls, message: UserMessage) -> bool:
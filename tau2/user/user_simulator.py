@@ -3,6 +3,7 @@ from typing import Optional, Tuple
 from loguru import logger
 
 from tau2.data_model.message import (
+    AssistantMessage,
     Message,
     MultiToolMessage,
     SystemMessage,
@@ -21,7 +22,7 @@ from tau2.user.base import (
     is_valid_user_history_message,
 )
 from tau2.utils import DATA_DIR
-from tau2.utils.llm_utils import generate
+from tau2.utils.llm_utils import agenerate, generate
 
 GLOBAL_USER_SIM_GUIDELINES_DIR = DATA_DIR / "tau2" / "user_simulator"
 
@@ -130,6 +131,20 @@ class UserSimulator(BaseUser):
     ) -> Tuple[UserMessage, UserState]:
         return self._generate_next_message(message, state)
 
+    async def agenerate_next_message(
+        self, message: ValidUserInputMessage, state: UserState
+    ) -> Tuple[UserMessage, UserState]:
+        """Async version of generate_next_message, awaiting the LLM."""
+        messages = self._add_message_to_state(message, state)
+        assistant_message = await agenerate(
+            model=self.llm,
+            messages=messages,
+            tools=self.tools,
+            role='user',
+            **self.llm_args,
+        )
+        return self._make_user_message(assistant_message, state)
+
     def _generate_next_message(
         self, message: ValidUserInputMessage, state: UserState
     ) -> Tuple[UserMessage, UserState]:
@@ -142,13 +157,7 @@ class UserSimulator(BaseUser):
         Returns:
             A tuple containing the user message and the updated user state.
         """
-        # Updating state with new message
-        if isinstance(message, MultiToolMessage):
-            state.messages.extend(message.tool_messages)
-        else:
-            state.messages.append(message)
-        messages = state.system_messages + state.flip_roles()
-        # print(156,messages)
+        messages = self._add_message_to_state(message, state)
 
         # Generate response
         assistant_message = generate(
@@ -158,7 +167,22 @@ class UserSimulator(BaseUser):
             role='user',
             **self.llm_args,
         )
+        return self._make_user_message(assistant_message, state)
 
+    def _add_message_to_state(
+        self, message: ValidUserInputMessage, state: UserState
+    ) -> list[Message]:
+        """Update the state with the new message and return the messages to send to the LLM."""
+        if isinstance(message, MultiToolMessage):
+            state.messages.extend(message.tool_messages)
+        else:
+            state.messages.append(message)
+        return state.system_messages + state.flip_roles()
+
+    def _make_user_message(
+        self, assistant_message: AssistantMessage, state: UserState
+    ) -> Tuple[UserMessage, UserState]:
+        """Turn the LLM response into a user message and add it to the state."""
         user_response = assistant_message.content
         logger.debug(f"Response: {user_response}")
 
@@ -206,3 +230,8 @@ class DummyUser(UserSimulator):
         self, message: ValidUserInputMessage, state: UserState
     ) -> tuple[UserMessage, UserState]:
         raise NotImplementedError("DummyUser does not support generate_next_message")
+
+    async def agenerate_next_message(
+        self, message: ValidUserInputMessage, state: UserState
+    ) -> tuple[UserMessage, UserState]:
+        raise NotImplementedError("DummyUser does not support agenerate_next_message")
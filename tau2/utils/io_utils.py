@@ -1,5 +1,6 @@
 import json
 import os
+import threading
 from pathlib import Path
 from typing import Any
 
@@ -10,6 +11,10 @@ import yaml
 # where the value is None when loading from json or yaml, the key will be missing in
 # toml since there is no "null" in toml.
 
+# Maps resolved path -> (mtime, content) for load_text_snapshot().
+_TEXT_SNAPSHOTS: dict[str, tuple[float, str]] = {}
+_TEXT_SNAPSHOTS_LOCK = threading.Lock()
+
 
 def load_file(path: str | Path, **kwargs: Any) -> dict[str, Any]:
     """Load the content of a file from a path based on the file extension.
@@ -42,6 +47,28 @@ def load_file(path: str | Path, **kwargs: Any) -> dict[str, Any]:
     return data
 
 
+def load_text_snapshot(path: str | Path) -> str:
+    """Read a text file (e.g. a domain policy) once per process.
+
+    The content is cached by path and re-read only when the file mtime changes.
+
+    Args:
+        path: The path to the file to read.
+
+    Returns:
+        The content of the file.
+    """
+    path = str(Path(path).resolve())
+    mtime = os.path.getmtime(path)
+    with _TEXT_SNAPSHOTS_LOCK:
+        entry = _TEXT_SNAPSHOTS.get(path)
+        if entry is None or entry[0] != mtime:
+            with open(path, "r") as fp:
+                entry = (mtime, fp.read())
+            _TEXT_SNAPSHOTS[path] = entry
+    return entry[1]
+
+
 def dump_file(path: str | Path, data: dict[str, Any], **kwargs: Any) -> None:
     """Dump data content to a file based on the file extension.
 
@@ -1,9 +1,13 @@
+import asyncio
 import json
 import re
 import os
-import copy
+import bisect
+import hashlib
+import threading
 import time
-from typing import Any, Optional
+from collections import OrderedDict
+from typing import Any, Generator, Optional
 import pickle
 import litellm
 import uuid
@@ -11,7 +15,6 @@ from litellm import completion, completion_cost
 from litellm.caching.caching import Cache
 from litellm.main import ModelResponse, Usage
 from loguru import logger
-from transformers import AutoTokenizer
 from tau2.config import (
     DEFAULT_LLM_CACHE_TYPE,
     DEFAULT_MAX_RETRIES,
@@ -32,9 +35,8 @@ from tau2.data_model.message import (
     ToolMessage,
     UserMessage,
 )
-import random
 from tau2.environment.tool import Tool
-from LLM_CALL import get_llm_response
+from LLM_CALL import aget_llm_response, get_llm_response, load_model_configs
 
 TOOL_PRICING = {
     "gpt-5": {
@@ -205,14 +207,6 @@ else:
     # logger.info("LiteLLM: Cache is disabled")
     litellm.disable_cache()
 
-from datetime import datetime
-import string
-def generate_random_string(length):
-    """Generates a random string of specified length using alphanumeric characters."""
-    characters = string.ascii_letters + string.digits + '~!@#$%^&*()-=_+[]'
-    return ''.join(random.choice(characters) for _ in range(length))
-
-
 ALLOW_SONNET_THINKING = False
 
 # if not ALLOW_SONNET_THINKING:
@@ -239,39 +233,125 @@ extra_tool = {
       }
     }
   }
-tokenizer = AutoTokenizer.from_pretrained("Qwen/Qwen3-8B")
-def cut_middle_turns(tokenizer,messages,max_length):
-    exec_count = 0
-    while exec_count<10:
-        try:
-            exec_count += 1
-            messages_str = ''
-            start_identifier = generate_random_string(15)
-            end_identifier = generate_random_string(15)
-            assert not start_identifier in str(messages) and not end_identifier in str(messages) and start_identifier!=end_identifier
-            for mid,m in enumerate(messages):
-                messages_str += f"{m}{start_identifier}{mid}{end_identifier}"
-            token_ids = tokenizer(str(messages_str))['input_ids']
-            if len(token_ids)<=max_length:
-                return messages
-            p1_tokens = tokenizer.batch_decode(token_ids[:max_length//2])
-            p1 = ''.join(p1_tokens)
-            p1_idx = int(p1.split(start_identifier)[-1].split(end_identifier)[0])
-            p2_tokens = tokenizer.batch_decode(token_ids[-max_length//2:])
-            p2 = ''.join(p2_tokens)
-            p2_idx = int(p2.split(end_identifier)[0].split(start_identifier)[-1])
-            # print('cut messages, original:',len(messages),'firat part to',p1_idx+1,'second part start from',p2_idx)
-            return messages[:p1_idx+1]+messages[p2_idx:]
-        except Exception as cut_error:
-            # print(84,'cut error',cut_error)
-            formatted_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            with open('/lustre/fsw/portfolios/nvr/users/hongjins/verl_tau2/cut_error_message.json','w') as f:
-                json.dump({
-                    'messages': messages,
-                    'max_length': max_length,
-                    'current_time': str(formatted_time)
-                },f,indent=2)
-    raise ValueError(f'cut_middle_turns error')
+TOKENIZER_NAME = "Qwen/Qwen3-8B"
+TOKEN_COUNT_CACHE_SIZE = 4096
+_tokenizer = None
+_tokenizer_lock = threading.Lock()
+_token_counts: OrderedDict[bytes, int] = OrderedDict()
+_token_counts_lock = threading.Lock()
+# Maps the ids of a list of tool schemas -> (the schemas, their token count).
+# The schemas are kept so that their ids are not reused.
+TOOLS_TOKEN_COUNT_CACHE_SIZE = 256
+_tools_token_counts: OrderedDict[tuple[int, ...], tuple[list[dict], int]] = OrderedDict()
+
+
+def get_tokenizer():
+    """
+    Get the tokenizer used to measure the context of the vLLM models.
+    Loaded on first use, so that processes that never call these models do not import transformers.
+    """
+    global _tokenizer
+    if _tokenizer is None:
+        with _tokenizer_lock:
+            if _tokenizer is None:
+                from transformers import AutoTokenizer
+
+                _tokenizer = AutoTokenizer.from_pretrained(TOKENIZER_NAME)
+    return _tokenizer
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count the tokens of a string.
+    Counts are kept in an LRU cache keyed by the hash of the string, since the same
+    tool list and messages are measured again on every turn.
+    """
+    key = hashlib.blake2b(text.encode(), digest_size=16).digest()
+    with _token_counts_lock:
+        count = _token_counts.get(key)
+        if count is not None:
+            _token_counts.move_to_end(key)
+            return count
+    count = len(get_tokenizer()(text)['input_ids'])
+    with _token_counts_lock:
+        _token_counts[key] = count
+        if len(_token_counts) > TOKEN_COUNT_CACHE_SIZE:
+            _token_counts.popitem(last=False)
+    return count
+
+
+def count_tools_tokens(tools: Optional[list[dict]]) -> int:
+    """
+    Count the tokens of a list of tool schemas.
+    The schemas of a ToolKit are built once per class (see ToolKitBase.get_tools), so the count
+    is kept per list of schema objects, and the schemas are not turned into a string on every turn.
+    """
+    if not tools:
+        return count_tokens(str(tools))
+    key = tuple(map(id, tools))
+    with _token_counts_lock:
+        entry = _tools_token_counts.get(key)
+        if entry is not None:
+            _tools_token_counts.move_to_end(key)
+            return entry[1]
+    count = count_tokens(str(tools))
+    with _token_counts_lock:
+        _tools_token_counts[key] = (list(tools), count)
+        if len(_tools_token_counts) > TOOLS_TOKEN_COUNT_CACHE_SIZE:
+            _tools_token_counts.popitem(last=False)
+    return count
+
+
+class MessageTokenCounts:
+    """
+    Token counts of the messages of a conversation.
+    Kept on the agent state, so that each message is tokenized once, when it is added.
+    """
+
+    def __init__(self):
+        self._messages: list[Message] = []
+        self._counts: list[int] = []
+
+    def get_counts(self, messages: list[Message], litellm_messages: list[dict]) -> list[int]:
+        """
+        Get the token counts of litellm_messages, the conversion of messages.
+        Messages already counted in the previous call are not tokenized again.
+        """
+        if len(messages) != len(litellm_messages):
+            return [count_tokens(str(m)) for m in litellm_messages]
+        counts = []
+        for i, (message, litellm_message) in enumerate(zip(messages, litellm_messages)):
+            if i < len(self._messages) and self._messages[i] is message:
+                counts.append(self._counts[i])
+            else:
+                counts.append(count_tokens(str(litellm_message)))
+        self._messages = list(messages)
+        self._counts = counts
+        return counts
+
+
+def cut_middle_turns(messages: list[dict], max_length: int, token_counts: Optional[list[int]] = None) -> list[dict]:
+    """
+    Drop the middle of a conversation longer than max_length tokens.
+    Keeps the messages that end within the first max_length//2 tokens (at least the first one),
+    and the messages from the one overlapping the last max_length//2 tokens.
+    Args:
+        messages: The messages.
+        max_length: The maximum number of tokens.
+        token_counts: The token count of each message. Counted with count_tokens if None.
+    """
+    if token_counts is None:
+        token_counts = [count_tokens(str(m)) for m in messages]
+    prefix_sums = [0]
+    for count in token_counts:
+        prefix_sums.append(prefix_sums[-1] + count)
+    total = prefix_sums[-1]
+    if total <= max_length:
+        return messages
+    half = max_length // 2
+    head_end = max(1, bisect.bisect_right(prefix_sums, half) - 1)
+    tail_start = max(head_end, bisect.bisect_right(prefix_sums, total - half) - 1)
+    return messages[:head_end] + messages[tail_start:]
 
 def _parse_ft_model_name(model: str) -> str:
     """
@@ -385,7 +465,7 @@ def to_litellm_messages(messages: list[Message],model,use_model_tool,domain,role
     return litellm_messages
 
 
-def generate(
+def _generate_steps(
     model: str,
     messages: list[Message],
     tools: Optional[list[Tool]] = None,
@@ -396,19 +476,14 @@ def generate(
     use_model_tool=False,
     model_config_path=None,
     domain=None,
+    token_counts: Optional[MessageTokenCounts] = None,
     **kwargs: Any,
-) -> UserMessage | AssistantMessage:
+) -> Generator[dict, Any, AssistantMessage]:
     """
-    Generate a response from the model.
-
-    Args:
-        model: The model to use.
-        messages: The messages to send to the model.
-        tools: The tools to use.
-        tool_choice: The tool choice to use.
-        **kwargs: Additional arguments to pass to the model.
-
-    Returns: A tuple containing the message and the cost.
+    Shared body of `generate` and `agenerate`.
+    Every LLM request is yielded as the keyword arguments of `get_llm_response`,
+    and the caller sends the response back. The generator returns the message.
+    token_counts keeps the token counts of the messages between the turns of a conversation.
     """
     if role!='user' and role!='assistant' and role!='evaluator':
         raise ValueError(f'unknown role {role}')
@@ -420,17 +495,17 @@ def generate(
     if role=='assistant':
         assert domain
     litellm_messages = to_litellm_messages(messages,model=model,use_model_tool=use_model_tool,domain=domain,role=role)
+    tool_objects = tools
     tools = [tool.openai_schema for tool in tools] if tools else None
     if tools and tool_choice is None:
         tool_choice = "auto"
-    original_tools = copy.deepcopy(tools)
+    # NOTE: The schemas are shared by all the instances of a ToolKit and must not be modified.
+    original_tools = tools
     start_time = time.time()
     cost = 0
     if role=='assistant' and ('qwen' in model.lower() or 'huggingface' in model.lower() or 'llama' in model.lower() or 'nemotron' in model.lower()):
         if not 'nemotron' in model.lower():
-            with open(model_config_path) as f:
-                model_config = json.load(f)[model]
-            config_idx = random.randint(0, len(model_config)-1)
+            model_config = load_model_configs(model_config_path)[model]
         if use_model_tool:
             updated_tools = []
             for t in tools:
@@ -439,13 +514,16 @@ def generate(
             updated_tools += [extra_tool]
         else:
             updated_tools = tools
-        tools_length = len(tokenizer(str(updated_tools))['input_ids'])
-        updated_messages = cut_middle_turns(tokenizer=tokenizer,messages=litellm_messages,max_length=23000-tools_length)
+        if token_counts is None:
+            token_counts = MessageTokenCounts()
+        message_token_counts = token_counts.get_counts(messages, litellm_messages)
+        tools_length = count_tools_tokens(updated_tools)
+        updated_messages = cut_middle_turns(messages=litellm_messages,max_length=23000-tools_length,token_counts=message_token_counts)
         # print('291 get llm:',model)
         if 'nemotron' in model.lower():
-            response = get_llm_response(model=model,messages=updated_messages,tools=updated_tools,return_raw_response=True,temperature=1,model_type='nv/dev',max_length=8000,retry_count=10)
+            response = yield dict(model=model,messages=updated_messages,tools=updated_tools,return_raw_response=True,temperature=1,model_type='nv/dev',max_length=8000,retry_count=10)
         else:
-            response = get_llm_response(model=model,messages=updated_messages,tools=updated_tools,return_raw_response=True,temperature=1,model_config=model_config,model_config_path=model_config_path,model_config_idx=config_idx,model_type='vllm',max_length=8000,retry_count=10)
+            response = yield dict(model=model,messages=updated_messages,tools=updated_tools,return_raw_response=True,temperature=1,model_config=model_config,model_config_path=model_config_path,model_type='vllm',max_length=8000,retry_count=10)
         mode_to_call = None
         tool_calls = []
         input_tokens = 0
@@ -491,13 +569,12 @@ def generate(
         if mode_to_call:
             llm_messages = to_litellm_messages(messages,model=mode_to_call,use_model_tool=False,domain=domain,role=role)
             if 'gpt-5' in mode_to_call:
-                response = get_llm_response(model=mode_to_call,messages=llm_messages,tools=original_tools,return_raw_response=True,retry_count=10,max_length=40000)
+                response = yield dict(model=mode_to_call,messages=llm_messages,tools=original_tools,return_raw_response=True,retry_count=10,max_length=40000)
             elif 'qwen3' in mode_to_call.lower():
-                with open(model_config_path) as f:
-                    model_config = json.load(f)[mode_to_call]
-                tools_length = len(tokenizer(str(original_tools))['input_ids'])
-                cut_messages = cut_middle_turns(tokenizer=tokenizer,messages=litellm_messages,max_length=23000-tools_length)
-                response = get_llm_response(model=mode_to_call,messages=cut_messages,tools=original_tools,return_raw_response=True,model_config=model_config,model_config_path=model_config_path,model_config_idx=config_idx,model_type='vllm',max_length=8000,retry_count=10)
+                model_config = load_model_configs(model_config_path)[mode_to_call]
+                tools_length = count_tools_tokens(original_tools)
+                cut_messages = cut_middle_turns(messages=litellm_messages,max_length=23000-tools_length,token_counts=message_token_counts)
+                response = yield dict(model=mode_to_call,messages=cut_messages,tools=original_tools,return_raw_response=True,model_config=model_config,model_config_path=model_config_path,model_type='vllm',max_length=8000,retry_count=10)
             else:
                 raise ValueError(f'Model {mode_to_call} is not supported')
             if isinstance(response,str):
@@ -524,7 +601,8 @@ def generate(
             'role': role
         }
     elif 'claude' in model.lower():
-        response = get_llm_response(model=model,messages=litellm_messages,tools=tools,return_raw_response=True,retry_count=10,max_length=40000)
+        claude_tools = [tool.claude_schema for tool in tool_objects] if tool_objects else None
+        response = yield dict(model=model,messages=litellm_messages,tools=tools,claude_tools=claude_tools,return_raw_response=True,retry_count=10,max_length=40000)
         # print(json.dumps(response,indent=2))
         # exit(0)
         tool_calls = []
@@ -553,7 +631,7 @@ def generate(
             'role': role,
         }
     else:
-        response = get_llm_response(model=model,messages=litellm_messages,tools=tools,return_raw_response=True,retry_count=10,max_length=40000)
+        response = yield dict(model=model,messages=litellm_messages,tools=tools,return_raw_response=True,retry_count=10,max_length=40000)
         tool_calls = []
         if not isinstance(response,str) and response.choices[0].message.tool_calls:
             for one_tool_call in response.choices[0].message.tool_calls:
@@ -613,6 +691,66 @@ def generate(
     return message
 
 
+def generate(
+    model: str,
+    messages: list[Message],
+    tools: Optional[list[Tool]] = None,
+    tool_choice: Optional[str] = None,
+    **kwargs: Any,
+) -> UserMessage | AssistantMessage:
+    """
+    Generate a response from the model.
+
+    Args:
+        model: The model to use.
+        messages: The messages to send to the model.
+        tools: The tools to use.
+        tool_choice: The tool choice to use.
+        **kwargs: Additional arguments to pass to the model.
+
+    Returns: A tuple containing the message and the cost.
+    """
+    steps = _generate_steps(model, messages, tools=tools, tool_choice=tool_choice, **kwargs)
+    try:
+        request = next(steps)
+        while True:
+            request = steps.send(get_llm_response(**request))
+    except StopIteration as stop:
+        return stop.value
+
+
+async def agenerate(
+    model: str,
+    messages: list[Message],
+    tools: Optional[list[Tool]] = None,
+    tool_choice: Optional[str] = None,
+    **kwargs: Any,
+) -> UserMessage | AssistantMessage:
+    """
+    Async version of `generate`. LLM requests are awaited instead of blocking the thread.
+    The work between the requests (loading model configs and the tokenizer, counting tokens,
+    parsing the responses) is run in a worker thread, off the event loop.
+    """
+    steps = _generate_steps(model, messages, tools=tools, tool_choice=tool_choice, **kwargs)
+    done, value = await asyncio.to_thread(_send_step, steps, None)
+    while not done:
+        response = await aget_llm_response(**value)
+        done, value = await asyncio.to_thread(_send_step, steps, response)
+    return value
+
+
+def _send_step(steps: Generator[dict, Any, AssistantMessage], response: Any) -> tuple[bool, Any]:
+    """
+    Send a response to the steps of `_generate_steps`.
+    Returns (False, next request), or (True, message) once the steps are done:
+    StopIteration cannot be raised through asyncio.to_thread.
+    """
+    try:
+        return False, steps.send(response)
+    except StopIteration as stop:
+        return True, stop.value
+
+
 def get_cost(messages: list[Message]) -> tuple[float, float] | None:
     """
     Get the cost of the interaction between the agent and the user.
@@ -0,0 +1,301 @@
+"""
+Append-only log of the simulations of a run.
+
+Every finished simulation is appended as one JSON line to `<save_dir>/results.jsonl`, and its
+key (task_id, trial, seed), position and duration are appended to
+`<save_dir>/results.index.jsonl`. Resuming a run, and planning it from past durations, only
+reads the index; the legacy `Results` JSON is produced on demand by
+`ResultsLog.to_results` (see `tau2.run.consolidate_results`).
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Iterator, Optional
+
+from loguru import logger
+
+from tau2.config import RESULTS_FSYNC_EVERY, RESULTS_FSYNC_INTERVAL
+from tau2.data_model.simulation import Info, Results, SimulationRun
+from tau2.data_model.tasks import Task
+
+RESULTS_LOG_NAME = "results.jsonl"
+RESULTS_INDEX_NAME = "results.index.jsonl"
+
+# (task_id, trial, seed) of a simulation.
+ResultKey = tuple[str, Optional[int], Optional[int]]
+
+
+def get_result_key(simulation: SimulationRun) -> ResultKey:
+    return (simulation.task_id, simulation.trial, simulation.seed)
+
+
+def get_record_duration(record: dict) -> Optional[float]:
+    """Get the duration of a logged simulation: its latency, or its duration if unknown."""
+    return record.get("latency") or record.get("duration")
+
+
+def _parse_index_line(line: str) -> tuple[ResultKey, int, int, Optional[float]]:
+    """Parse an index line. Lines written before durations were indexed have no duration."""
+    task_id, trial, seed, offset, length, *duration = json.loads(line)
+    return (task_id, trial, seed), offset, length, duration[0] if duration else None
+
+
+def iter_logged_durations(log_dir: str) -> Iterator[tuple[str, Optional[float]]]:
+    """
+    Read the (task_id, duration) of the simulations indexed in log_dir, without opening a
+    ResultsLog, which could repair a log still being written. Only the records of index lines
+    written before durations were indexed are read from the log.
+    """
+    index_path = os.path.join(log_dir, RESULTS_INDEX_NAME)
+    if not os.path.exists(index_path):
+        return
+    entries: dict[ResultKey, tuple[int, int, Optional[float]]] = {}
+    with open(index_path, "r") as fp:
+        for line in fp:
+            try:
+                key, offset, length, duration = _parse_index_line(line)
+            except ValueError:
+                continue
+            entries[key] = (offset, length, duration)
+    with open(os.path.join(log_dir, RESULTS_LOG_NAME), "rb") as log_fp:
+        for key, (offset, length, duration) in entries.items():
+            if duration is None:
+                log_fp.seek(offset)
+                try:
+                    duration = get_record_duration(json.loads(log_fp.read(length)))
+                except ValueError:
+                    continue
+            yield key[0], duration
+
+
+def _read_entries(
+    path: str, index_path: str
+) -> tuple[dict[ResultKey, tuple[int, int, Optional[float]]], int, int, bool]:
+    """
+    Read the entries of a log from its index, then from the complete lines logged after the
+    last index line. Nothing is written.
+    Returns the entries, the end of the complete lines, the size of the log, and whether the
+    index is missing lines or has invalid ones.
+    """
+    entries: dict[ResultKey, tuple[int, int, Optional[float]]] = {}
+    size = os.path.getsize(path) if os.path.exists(path) else 0
+    incomplete = False
+    end = 0
+    if os.path.exists(index_path):
+        with open(index_path, "r") as fp:
+            for line in fp:
+                try:
+                    key, offset, length, duration = _parse_index_line(line)
+                except ValueError:
+                    incomplete = True
+                    continue
+                if offset + length > size:
+                    incomplete = True
+                    continue
+                entries[key] = (offset, length, duration)
+                end = max(end, offset + length)
+    if end < size:
+        # Lines logged after the last index line, or cut by a crash.
+        incomplete = True
+        with open(path, "rb") as fp:
+            fp.seek(end)
+            for line in fp:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                key = (record["task_id"], record.get("trial"), record.get("seed"))
+                entries[key] = (end, len(line), get_record_duration(record))
+                end += len(line)
+    return entries, end, size, incomplete
+
+
+def _iter_lines(path: str, offsets: set[int], end: int) -> Iterator[dict]:
+    """Read the lines of a log starting at offsets, up to end."""
+    if end == 0:
+        return
+    with open(path, "rb") as fp:
+        offset = 0
+        for line in fp:
+            if offset >= end:
+                break
+            if offset in offsets:
+                yield json.loads(line)
+            offset += len(line)
+
+
+def iter_logged_records(log_dir: str) -> Iterator[dict]:
+    """
+    Read the simulations logged in log_dir (with their latency), in the order they were
+    logged, without opening a ResultsLog: the log and its index are never truncated or
+    rewritten, so this is safe while a run is still writing them. A line still being written
+    is skipped.
+    """
+    path = os.path.join(log_dir, RESULTS_LOG_NAME)
+    entries, end, _, _ = _read_entries(path, os.path.join(log_dir, RESULTS_INDEX_NAME))
+    yield from _iter_lines(path, {offset for offset, _, _ in entries.values()}, end)
+
+
+def iter_logged_simulations(log_dir: str) -> Iterator[SimulationRun]:
+    """Read the simulations logged in log_dir, like iter_logged_records."""
+    for record in iter_logged_records(log_dir):
+        record.pop("latency", None)
+        yield SimulationRun.model_validate(record)
+
+
+class ResultsLog:
+    """
+    Append-only JSONL log of the simulations of a run, with an index of the logged keys.
+    Lines are flushed as they are written, and fsynced every fsync_every lines or
+    fsync_interval seconds. A line cut by a crash is dropped when the log is opened again.
+    Safe to share between the threads of a process, not between processes.
+    """
+
+    def __init__(
+        self,
+        log_dir: str,
+        fsync_every: int = RESULTS_FSYNC_EVERY,
+        fsync_interval: float = RESULTS_FSYNC_INTERVAL,
+    ):
+        self.log_dir = log_dir
+        self.path = os.path.join(log_dir, RESULTS_LOG_NAME)
+        self.index_path = os.path.join(log_dir, RESULTS_INDEX_NAME)
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        # Maps key -> (offset, length, duration) of the last line logged for the key.
+        self._entries: dict[ResultKey, tuple[int, int, Optional[float]]] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self._log_fp = None
+        self._index_fp = None
+        self._num_unsynced = 0
+        self._last_sync = time.monotonic()
+        os.makedirs(log_dir, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        """Read the index, and repair it from the log if the last run did not close it."""
+        self._entries, end, size, repaired = _read_entries(self.path, self.index_path)
+        if end < size:
+            logger.warning(f"Dropping {size - end} bytes at the end of {self.path}")
+            os.truncate(self.path, end)
+        self._size = end
+        if repaired:
+            self._write_index()
+
+    def _write_index(self):
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as fp:
+            for key, entry in sorted(self._entries.items(), key=lambda e: e[1][0]):
+                fp.write(json.dumps([*key, *entry]) + "\n")
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(tmp_path, self.index_path)
+
+    def append(self, simulation: SimulationRun, latency: Optional[float] = None):
+        """Log a simulation."""
+        record = simulation.model_dump(mode="json")
+        record["latency"] = latency
+        duration = get_record_duration(record)
+        line = (json.dumps(record) + "\n").encode()
+        key = get_result_key(simulation)
+        with self._lock:
+            if self._log_fp is None:
+                self._log_fp = open(self.path, "ab")
+                self._index_fp = open(self.index_path, "a")
+            offset = self._size
+            self._log_fp.write(line)
+            self._log_fp.flush()
+            self._index_fp.write(json.dumps([*key, offset, len(line), duration]) + "\n")
+            self._index_fp.flush()
+            self._size += len(line)
+            self._entries[key] = (offset, len(line), duration)
+            self._num_unsynced += 1
+            if (
+                self._num_unsynced >= self.fsync_every
+                or time.monotonic() - self._last_sync >= self.fsync_interval
+            ):
+                self._sync()
+
+    def _sync(self):
+        if self._log_fp is not None:
+            os.fsync(self._log_fp.fileno())
+            os.fsync(self._index_fp.fileno())
+        self._num_unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def flush(self):
+        """Fsync the lines logged so far."""
+        with self._lock:
+            self._sync()
+
+    def close(self):
+        with self._lock:
+            self._sync()
+            if self._log_fp is not None:
+                self._log_fp.close()
+                self._index_fp.close()
+                self._log_fp = None
+                self._index_fp = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, key: ResultKey) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def get_keys(self) -> set[ResultKey]:
+        """The keys of the logged simulations."""
+        with self._lock:
+            return set(self._entries)
+
+    def iter_records(self) -> Iterator[dict]:
+        """
+        Read the logged simulations (with their latency), in the order they were logged.
+        A simulation logged several times is only read in its last version.
+        """
+        with self._lock:
+            if self._log_fp is not None:
+                self._log_fp.flush()
+            offsets = {offset for offset, _, _ in self._entries.values()}
+            size = self._size
+        yield from _iter_lines(self.path, offsets, size)
+
+    def iter_simulations(self) -> Iterator[SimulationRun]:
+        """Read the logged simulations, in the order they were logged."""
+        for record in self.iter_records():
+            record.pop("latency", None)
+            yield SimulationRun.model_validate(record)
+
+    def to_results(self, info: Info, tasks: list[Task]) -> Results:
+        """Consolidate the log into a legacy Results object."""
+        return Results(info=info, tasks=tasks, simulations=list(self.iter_simulations()))
+
+
+_RESULTS_LOGS: dict[str, ResultsLog] = {}
+_RESULTS_LOGS_LOCK = threading.Lock()
+
+
+def get_results_log(log_dir: str) -> ResultsLog:
+    """Get the process-wide results log stored in log_dir."""
+    log_dir = os.path.abspath(log_dir)
+    with _RESULTS_LOGS_LOCK:
+        results_log = _RESULTS_LOGS.get(log_dir)
+        if results_log is None:
+            results_log = ResultsLog(log_dir)
+            _RESULTS_LOGS[log_dir] = results_log
+    return results_log
+
+
+def close_results_log(log_dir: str):
+    """Fsync and close the results log stored in log_dir, if open."""
+    with _RESULTS_LOGS_LOCK:
+        results_log = _RESULTS_LOGS.pop(os.path.abspath(log_dir), None)
+    if results_log is not None:
+        results_log.close()
@@ -0,0 +1,315 @@
+"""
+Live metrics of a run.
+
+`RUN_METRICS` is fed by run_tasks (simulations started and finished, evaluation latencies),
+the orchestrator (tool calls) and LLM_CALL (latency, errors and retries of every LLM call).
+It can be exposed while the run is going on, without any external service:
+- `MetricsServer`: a local HTTP server, `/metrics` in the Prometheus text format and
+  `/metrics.json` in JSON.
+- `MetricsFileWriter`: the JSON snapshot written to a file every few seconds.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+from loguru import logger
+
+from LLM_CALL import add_llm_call_listener
+from tau2.config import DEFAULT_METRICS_INTERVAL, METRICS_LATENCY_WINDOW
+from tau2.data_model.simulation import SimulationRun
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class LatencyStats:
+    """Count and sum of all the latencies, and percentiles over the most recent ones."""
+
+    def __init__(self, window: int = METRICS_LATENCY_WINDOW):
+        self.count = 0
+        self.sum = 0.0
+        self.recent: deque[float] = deque(maxlen=window)
+
+    def add(self, latency: float):
+        self.count += 1
+        self.sum += latency
+        self.recent.append(latency)
+
+    def get_quantiles(self) -> dict[float, float]:
+        if not self.recent:
+            return {}
+        values = sorted(self.recent)
+        return {q: values[min(len(values) - 1, int(q * len(values)))] for q in QUANTILES}
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            **{f"p{int(q * 100)}": v for q, v in self.get_quantiles().items()},
+        }
+
+
+class RunMetrics:
+    """Thread-safe metrics of the current run of the process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queue_depth_fn: Optional[Callable[[], int]] = None
+        self.reset()
+
+    def reset(self, num_planned: int = 0):
+        """Start a new run of num_planned simulations."""
+        with self._lock:
+            self.start_time = time.time()
+            self.num_planned = num_planned
+            self.num_started = 0
+            # termination_reason -> number of finished simulations.
+            self.num_finished: dict[str, int] = {}
+            self.num_failed = 0
+            # (model, endpoint) -> stats.
+            self.llm_latency: dict[tuple[str, str], LatencyStats] = {}
+            self.llm_errors: dict[tuple[str, str], int] = {}
+            self.llm_retries: dict[tuple[str, str], int] = {}
+            # domain -> number of tool calls.
+            self.tool_calls: dict[str, int] = {}
+            self.evaluation_latency = LatencyStats()
+
+    def set_queue_depth_fn(self, queue_depth_fn: Optional[Callable[[], int]]):
+        """Set the function giving the number of finished conversations waiting for evaluation."""
+        self._queue_depth_fn = queue_depth_fn
+
+    def simulation_started(self):
+        with self._lock:
+            self.num_started += 1
+
+    def simulation_finished(self, simulation: SimulationRun):
+        reason = simulation.termination_reason
+        reason = getattr(reason, "value", reason)
+        with self._lock:
+            self.num_finished[reason] = self.num_finished.get(reason, 0) + 1
+
+    def simulation_failed(self):
+        """A simulation raised instead of finishing."""
+        with self._lock:
+            self.num_failed += 1
+
+    def record_tool_calls(self, domain: str, num_tool_calls: int):
+        with self._lock:
+            self.tool_calls[domain] = self.tool_calls.get(domain, 0) + num_tool_calls
+
+    def record_evaluation(self, latency: float):
+        with self._lock:
+            self.evaluation_latency.add(latency)
+
+    def record_llm_call(self, model, endpoint, start_time, latency, attempts, error):
+        key = (str(model), str(endpoint or ""))
+        with self._lock:
+            stats = self.llm_latency.get(key)
+            if stats is None:
+                stats = self.llm_latency[key] = LatencyStats()
+            stats.add(latency)
+            if attempts > 1:
+                self.llm_retries[key] = self.llm_retries.get(key, 0) + attempts - 1
+            if error is not None:
+                self.llm_errors[key] = self.llm_errors.get(key, 0) + 1
+
+    def to_dict(self) -> dict:
+        """Snapshot of the metrics."""
+        queue_depth_fn = self._queue_depth_fn
+        queue_depth = queue_depth_fn() if queue_depth_fn is not None else 0
+        with self._lock:
+            elapsed = max(time.time() - self.start_time, 1e-9)
+            num_finished = sum(self.num_finished.values())
+            num_done = num_finished + self.num_failed
+            return {
+                "timestamp": time.time(),
+                "elapsed_seconds": elapsed,
+                "simulations": {
+                    "planned": self.num_planned,
+                    "started": self.num_started,
+                    "finished": num_finished,
+                    "failed": self.num_failed,
+                    "in_flight": self.num_started - num_done,
+                    "waiting": max(0, self.num_planned - self.num_started),
+                    "eval_queue_depth": queue_depth,
+                    "per_second": num_finished / elapsed,
+                    "termination_reasons": dict(self.num_finished),
+                },
+                "llm_calls": [
+                    {
+                        "model": model,
+                        "endpoint": endpoint,
+                        "errors": self.llm_errors.get((model, endpoint), 0),
+                        "retries": self.llm_retries.get((model, endpoint), 0),
+                        "latency_seconds": stats.to_dict(),
+                    }
+                    for (model, endpoint), stats in sorted(self.llm_latency.items())
+                ],
+                "tool_calls": {
+                    domain: {"count": count, "per_second": count / elapsed}
+                    for domain, count in sorted(self.tool_calls.items())
+                },
+                "evaluation_latency_seconds": self.evaluation_latency.to_dict(),
+            }
+
+    def to_prometheus(self) -> str:
+        """The metrics in the Prometheus text exposition format."""
+        metrics = self.to_dict()
+        simulations = metrics["simulations"]
+        lines = []
+
+        def _add(name: str, metric_type: str, help_text: str, samples: list[tuple[dict, float]]):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        _add("tau2_simulations_planned", "gauge", "Simulations to run in this run.", [({}, simulations["planned"])])
+        _add("tau2_simulations_started_total", "counter", "Simulations started.", [({}, simulations["started"])])
+        _add(
+            "tau2_simulations_finished_total",
+            "counter",
+            "Simulations finished, by termination reason.",
+            [({"termination_reason": r}, n) for r, n in sorted(simulations["termination_reasons"].items())],
+        )
+        _add("tau2_simulations_failed_total", "counter", "Simulations that raised an error.", [({}, simulations["failed"])])
+        _add("tau2_simulations_in_flight", "gauge", "Simulations running or waiting for evaluation.", [({}, simulations["in_flight"])])
+        _add("tau2_simulations_waiting", "gauge", "Simulations not started yet.", [({}, simulations["waiting"])])
+        _add("tau2_eval_queue_depth", "gauge", "Finished conversations waiting for evaluation.", [({}, simulations["eval_queue_depth"])])
+        _add("tau2_simulations_per_second", "gauge", "Simulations finished per second since the start of the run.", [({}, simulations["per_second"])])
+
+        latency_samples = []
+        for call in metrics["llm_calls"]:
+            labels = {"model": call["model"], "endpoint": call["endpoint"]}
+            stats = call["latency_seconds"]
+            for q in QUANTILES:
+                key = f"p{int(q * 100)}"
+                if key in stats:
+                    latency_samples.append(({**labels, "quantile": str(q)}, stats[key]))
+        lines.append("# HELP tau2_llm_latency_seconds Latency of the LLM calls, retries included.")
+        lines.append("# TYPE tau2_llm_latency_seconds summary")
+        for labels, value in latency_samples:
+            lines.append(f"tau2_llm_latency_seconds{_format_labels(labels)} {value}")
+        for call in metrics["llm_calls"]:
+            labels = _format_labels({"model": call["model"], "endpoint": call["endpoint"]})
+            lines.append(f"tau2_llm_latency_seconds_count{labels} {call['latency_seconds']['count']}")
+            lines.append(f"tau2_llm_latency_seconds_sum{labels} {call['latency_seconds']['sum']}")
+        _add(
+            "tau2_llm_errors_total",
+            "counter",
+            "LLM calls that gave up.",
+            [({"model": c["model"], "endpoint": c["endpoint"]}, c["errors"]) for c in metrics["llm_calls"]],
+        )
+        _add(
+            "tau2_llm_retries_total",
+            "counter",
+            "Retried LLM call attempts.",
+            [({"model": c["model"], "endpoint": c["endpoint"]}, c["retries"]) for c in metrics["llm_calls"]],
+        )
+        _add(
+            "tau2_tool_calls_total",
+            "counter",
+            "Tool calls executed, by domain.",
+            [({"domain": d}, v["count"]) for d, v in metrics["tool_calls"].items()],
+        )
+        evaluation = metrics["evaluation_latency_seconds"]
+        lines.append("# HELP tau2_evaluation_latency_seconds Latency of the evaluation of the simulations.")
+        lines.append("# TYPE tau2_evaluation_latency_seconds summary")
+        for q in QUANTILES:
+            key = f"p{int(q * 100)}"
+            if key in evaluation:
+                lines.append(f'tau2_evaluation_latency_seconds{{quantile="{q}"}} {evaluation[key]}')
+        lines.append(f"tau2_evaluation_latency_seconds_count {evaluation['count']}")
+        lines.append(f"tau2_evaluation_latency_seconds_sum {evaluation['sum']}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape_label_value(v)}"' for k, v in labels.items()) + "}"
+
+
+RUN_METRICS = RunMetrics()
+add_llm_call_listener(RUN_METRICS.record_llm_call)
+
+
+class MetricsServer:
+    """Serves RUN_METRICS on http://host:port/metrics (Prometheus) and /metrics.json, from a daemon thread."""
+
+    def __init__(self, port: int, host: str = "127.0.0.1", metrics: RunMetrics = RUN_METRICS):
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body = metrics.to_prometheus().encode()
+                    content_type = "text/plain; version=0.0.4; charset=utf-8"
+                elif self.path == "/metrics.json":
+                    body = json.dumps(metrics.to_dict()).encode()
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self) -> "MetricsServer":
+        self._thread.start()
+        logger.info(f"Serving the run metrics on http://{self.server.server_address[0]}:{self.port}/metrics")
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class MetricsFileWriter:
+    """Writes the JSON snapshot of RUN_METRICS to a file every interval seconds, from a daemon thread."""
+
+    def __init__(self, path: str, interval: float = DEFAULT_METRICS_INTERVAL, metrics: RunMetrics = RUN_METRICS):
+        self.path = path
+        self.interval = interval
+        self.metrics = metrics
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> "MetricsFileWriter":
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def write(self):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w") as fp:
+                json.dump(self.metrics.to_dict(), fp, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not write the run metrics to {self.path}: {e}")
+
+    def stop(self):
+        """Stop writing, after a last write."""
+        self._stop.set()
+        self._thread.join()
+        self.write()
@@ -0,0 +1,104 @@
+"""
+Longest-expected-first scheduling of the simulations of a run.
+
+Simulations are dispatched in decreasing order of expected duration, so that the long ones do
+not end up at the tail of a run while most workers are idle. Expected durations come from
+the durations of the same tasks in past runs (results logs or legacy results files). Tasks
+without history are estimated from their size: the number of expected actions and, for
+composed tasks (telecom `[intent]issue_a|issue_b[PERSONA:persona]` tasks), the number of
+subtasks.
+"""
+
+import heapq
+import os
+import re
+import statistics
+from typing import Iterable, Optional
+
+from loguru import logger
+
+from tau2.data_model.simulation import Results
+from tau2.data_model.tasks import Task
+from tau2.utils.results_log import RESULTS_LOG_NAME, iter_logged_durations
+
+
+def load_task_durations(paths: Iterable[str]) -> dict[str, float]:
+    """
+    Get the mean duration of every task over past runs.
+    Args:
+        paths: Directories of results logs, or legacy results JSON files.
+    """
+    durations: dict[str, list[float]] = {}
+
+    def _add(task_id: str, duration: Optional[float]):
+        if duration is not None and duration > 0:
+            durations.setdefault(task_id, []).append(duration)
+
+    for path in paths:
+        path = str(path)
+        if os.path.isfile(os.path.join(path, RESULTS_LOG_NAME)):
+            for task_id, duration in iter_logged_durations(path):
+                _add(task_id, duration)
+        elif os.path.isfile(path) and path.endswith(".json"):
+            for simulation in Results.load(path).simulations:
+                _add(simulation.task_id, simulation.duration)
+        else:
+            logger.warning(f"No past durations found in {path}")
+    return {task_id: statistics.mean(values) for task_id, values in durations.items()}
+
+
+# The id of a composed task: [intent]issue_1|issue_2|...|issue_k[PERSONA:persona]
+COMPOSED_TASK_ID_PATTERN = re.compile(r"^\[[a-zA-Z_]+\](.*)\[PERSONA:")
+
+
+def get_num_subtasks(task: Task) -> int:
+    """Get the number of subtasks of a composed task, 1 for other tasks."""
+    match = COMPOSED_TASK_ID_PATTERN.match(task.id)
+    if match is None:
+        return 1
+    return match.group(1).count("|") + 1
+
+
+def get_task_size(task: Task) -> int:
+    """Get a rough measure of the work of a task: its expected actions and subtasks."""
+    num_actions = 0
+    if task.evaluation_criteria is not None and task.evaluation_criteria.actions:
+        num_actions = len(task.evaluation_criteria.actions)
+    return 1 + num_actions + get_num_subtasks(task)
+
+
+def predict_durations(
+    tasks: list[Task], durations: dict[str, float]
+) -> dict[str, float]:
+    """
+    Get the expected duration of every task, in seconds if durations is not empty.
+    Tasks without a past duration are estimated from their size, at the median number of
+    seconds per unit of size of the tasks that have one.
+    """
+    sizes = {task.id: get_task_size(task) for task in tasks}
+    rates = [durations[task_id] / size for task_id, size in sizes.items() if task_id in durations]
+    if rates:
+        seconds_per_size = statistics.median(rates)
+    elif durations:
+        seconds_per_size = statistics.median(durations.values()) / statistics.median(sizes.values())
+    else:
+        seconds_per_size = 1.0
+    return {
+        task_id: durations.get(task_id, size * seconds_per_size)
+        for task_id, size in sizes.items()
+    }
+
+
+def predict_makespan(durations: list[float], num_workers: int) -> float:
+    """Get the makespan of running jobs of the given durations, in order, on num_workers workers."""
+    workers = [0.0] * max(1, min(num_workers, len(durations)))
+    for duration in durations:
+        heapq.heappush(workers, heapq.heappop(workers) + duration)
+    return max(workers) if durations else 0.0
+
+
+def schedule_longest_first(
+    args: list[tuple[Task, int, int, str]], expected_durations: dict[str, float]
+) -> list[tuple[Task, int, int, str]]:
+    """Sort the (task, trial, seed, progress_str) of a run by decreasing expected duration."""
+    return sorted(args, key=lambda arg: -expected_durations[arg[0].id])
@@ -0,0 +1,222 @@
+"""
+Lazy access to the tasks of a task file.
+
+A task file is a JSON list of tasks. The first time a file is opened, `TaskStore` parses it
+once to find the byte range of every task, and caches this index next to the file
+(`<task file>.index.json`, keyed by the size and mtime of the file). Afterwards, the file is
+memory-mapped and a `Task` is only parsed and validated when it is accessed, so selecting a
+few tasks out of a large file does not read the rest of it.
+"""
+
+import json
+import mmap
+import os
+import re
+import threading
+from typing import Iterable, Iterator, Optional
+
+from loguru import logger
+
+from tau2.data_model.tasks import Task
+
+TASK_INDEX_SUFFIX = ".index.json"
+TASK_INDEX_VERSION = 1
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def _build_index(data: bytes) -> dict[str, tuple[int, int]]:
+    """
+    Get the (offset, length) in bytes of every task of a JSON list of tasks.
+    Tasks with the same id are only indexed once, at the position of the first one and with
+    the content of the last one.
+    """
+    text = data.decode("utf-8")
+    # Converts positions in text to positions in data.
+    is_ascii = len(text) == len(data)
+    last_char, last_byte = 0, 0
+
+    def to_byte(char: int) -> int:
+        nonlocal last_char, last_byte
+        if is_ascii:
+            return char
+        last_byte += len(text[last_char:char].encode("utf-8"))
+        last_char = char
+        return last_byte
+
+    decoder = json.JSONDecoder()
+    entries: dict[str, tuple[int, int]] = {}
+    pos = _WHITESPACE.match(text, 0).end()
+    if text[pos : pos + 1] != "[":
+        raise ValueError("A task file must contain a JSON list of tasks")
+    pos = _WHITESPACE.match(text, pos + 1).end()
+    if text[pos : pos + 1] == "]":
+        return entries
+    while True:
+        task, end = decoder.raw_decode(text, pos)
+        start_byte = to_byte(pos)
+        entries[task["id"]] = (start_byte, to_byte(end) - start_byte)
+        pos = _WHITESPACE.match(text, end).end()
+        if text[pos : pos + 1] == ",":
+            pos = _WHITESPACE.match(text, pos + 1).end()
+        elif text[pos : pos + 1] == "]":
+            return entries
+        else:
+            raise ValueError(f"Expected ',' or ']' at character {pos} of the task file")
+
+
+class TaskStore:
+    """
+    The tasks of a task file, parsed and validated on access.
+    Validated tasks are cached. Safe to share between the threads of a process.
+    """
+
+    def __init__(self, task_path: str):
+        self.path = str(task_path)
+        self.index_path = self.path + TASK_INDEX_SUFFIX
+        stat = os.stat(self.path)
+        self.size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+        self._lock = threading.Lock()
+        self._tasks: dict[str, Task] = {}
+        with open(self.path, "rb") as fp:
+            self._data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        self._entries = self._load_index()
+
+    def _load_index(self) -> dict[str, tuple[int, int]]:
+        """Read the cached index of the file, or build it if it is missing or stale."""
+        try:
+            with open(self.index_path, "r") as fp:
+                index = json.load(fp)
+            if (
+                index["version"] == TASK_INDEX_VERSION
+                and index["size"] == self.size
+                and index["mtime_ns"] == self.mtime_ns
+            ):
+                return {task_id: (offset, length) for task_id, offset, length in index["entries"]}
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        entries = _build_index(bytes(self._data))
+        index = {
+            "version": TASK_INDEX_VERSION,
+            "size": self.size,
+            "mtime_ns": self.mtime_ns,
+            "entries": [[task_id, offset, length] for task_id, (offset, length) in entries.items()],
+        }
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w") as fp:
+                json.dump(index, fp)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            logger.warning(f"Could not cache the index of {self.path}: {e}")
+        return entries
+
+    def is_stale(self) -> bool:
+        """Whether the task file changed since the store was opened."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return True
+        return stat.st_size != self.size or stat.st_mtime_ns != self.mtime_ns
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, task_id: str) -> bool:
+        return task_id in self._entries
+
+    def get_task_ids(self) -> list[str]:
+        """The ids of the tasks, in the order of the file."""
+        return list(self._entries)
+
+    def get_raw_task(self, task_id: str) -> dict:
+        """Parse a task without validating it."""
+        offset, length = self._entries[task_id]
+        return json.loads(self._data[offset : offset + length])
+
+    def get_task(self, task_id: str) -> Task:
+        """Parse and validate a task."""
+        with self._lock:
+            task = self._tasks.get(task_id)
+        if task is None:
+            task = Task.model_validate(self.get_raw_task(task_id))
+            with self._lock:
+                task = self._tasks.setdefault(task_id, task)
+        return task
+
+    def iter_tasks(
+        self, task_ids: Optional[Iterable[str]] = None, skip_invalid: bool = False
+    ) -> Iterator[Task]:
+        """
+        Validate the tasks as they are iterated over, in the order of the file.
+        Args:
+            task_ids: Only iterate over these tasks. Raises a ValueError if some are missing.
+            skip_invalid: Skip the tasks that fail validation, instead of raising.
+        """
+        selected = self._entries.keys()
+        if task_ids is not None:
+            task_ids = set(task_ids)
+            missing = task_ids - self._entries.keys()
+            if missing:
+                raise ValueError(f"Tasks not found in {self.path}: {missing}")
+            selected = [task_id for task_id in self._entries if task_id in task_ids]
+        for task_id in selected:
+            try:
+                task = self.get_task(task_id)
+            except Exception as e:
+                if not skip_invalid:
+                    raise
+                logger.warning(f"Skipping invalid task {task_id}: {e}")
+                continue
+            yield task
+
+    def get_tasks(
+        self,
+        task_ids: Optional[Iterable[str]] = None,
+        num_tasks: Optional[int] = None,
+        skip_invalid: bool = False,
+    ) -> list[Task]:
+        """
+        Get the tasks, in the order of the file. Only the returned tasks are validated.
+        Args:
+            task_ids: Only get these tasks. Raises a ValueError if some are missing.
+            num_tasks: Only get the first num_tasks (selected) tasks.
+            skip_invalid: Skip the tasks that fail validation, instead of raising.
+        """
+        tasks = []
+        if num_tasks is not None and num_tasks <= 0:
+            return tasks
+        for task in self.iter_tasks(task_ids=task_ids, skip_invalid=skip_invalid):
+            tasks.append(task)
+            if num_tasks is not None and len(tasks) >= num_tasks:
+                break
+        return tasks
+
+
+_TASK_STORES: dict[str, TaskStore] = {}
+_TASK_STORES_LOCK = threading.Lock()
+
+
+def get_task_store(task_path: str) -> TaskStore:
+    """Get the process-wide store of a task file, reopened if the file changed."""
+    task_path = os.path.abspath(task_path)
+    with _TASK_STORES_LOCK:
+        task_store = _TASK_STORES.get(task_path)
+        if task_store is None or task_store.is_stale():
+            task_store = TaskStore(task_path)
+            _TASK_STORES[task_path] = task_store
+    return task_store
+
+
+def load_tasks_from_file(
+    task_path: str,
+    task_ids: Optional[list[str]] = None,
+    num_tasks: Optional[int] = None,
+    skip_invalid: bool = False,
+) -> list[Task]:
+    """Load (some of) the tasks of a task file. See `TaskStore.get_tasks`."""
+    print(f"Load tasks from {task_path}")
+    task_store = get_task_store(task_path)
+    print("Total tasks:",len(task_store))
+    return task_store.get_tasks(task_ids=task_ids, num_tasks=num_tasks, skip_invalid=skip_invalid)
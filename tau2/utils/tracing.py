@@ -0,0 +1,215 @@
+"""
+Per-phase timing of simulations.
+
+The orchestrator records a `TimingSpan` for every phase of a simulation (initialization, agent
+and user generation, tool calls, `sync_tools`, `get_trajectory`) and run_task one for the
+evaluation. The LLM calls made during a simulation (retries included) are recorded as
+`llm_call` spans, with their model, endpoint and attempts. The spans are stored in
+`SimulationRun.spans` and can be exported as a Chrome trace (chrome://tracing, Perfetto) or as
+OpenTelemetry JSON (OTLP) with `to_chrome_trace` and `to_otel_json`.
+"""
+
+import contextvars
+import hashlib
+import time
+from contextlib import contextmanager
+from typing import Any, Iterable, Iterator, Optional
+
+from LLM_CALL import add_llm_call_listener
+from tau2.data_model.simulation import SimulationRun, TimingSpan
+
+_CURRENT_RECORDER: contextvars.ContextVar[Optional["SpanRecorder"]] = contextvars.ContextVar(
+    "tau2_span_recorder", default=None
+)
+
+
+class SpanRecorder:
+    """
+    Records the spans of one simulation.
+    A simulation runs on a single thread or asyncio task, so the recorder is not locked.
+    """
+
+    def __init__(self):
+        self.spans: list[TimingSpan] = []
+        self.step: Optional[int] = None
+
+    @contextmanager
+    def span(self, phase: str, role: Optional[str] = None, **attributes) -> Iterator[dict[str, Any]]:
+        """
+        Record the time spent in the block. Yields the attributes of the span, which the block
+        may complete (e.g. with token counts).
+        """
+        start = time.time()
+        try:
+            yield attributes
+        finally:
+            self.add(phase, start, time.time(), role=role, **attributes)
+
+    def add(self, phase: str, start: float, end: float, role: Optional[str] = None, **attributes):
+        """Record a span. Attributes that are None are dropped."""
+        self.spans.append(
+            TimingSpan(
+                phase=phase,
+                role=role,
+                step=self.step,
+                start=start,
+                end=end,
+                attributes={k: v for k, v in attributes.items() if v is not None},
+            )
+        )
+
+    @contextmanager
+    def activate(self):
+        """Record the LLM calls made by the current thread or asyncio task in the block."""
+        token = _CURRENT_RECORDER.set(self)
+        try:
+            yield self
+        finally:
+            _CURRENT_RECORDER.reset(token)
+
+
+def _record_llm_call(model, endpoint, start_time, latency, attempts, error):
+    recorder = _CURRENT_RECORDER.get()
+    if recorder is None:
+        return
+    recorder.add(
+        "llm_call",
+        start_time,
+        start_time + latency,
+        model=model,
+        endpoint=endpoint,
+        attempts=attempts,
+        error=type(error).__name__ if error is not None else None,
+    )
+
+
+add_llm_call_listener(_record_llm_call)
+
+
+def get_usage_attributes(usage: Optional[dict]) -> dict[str, Any]:
+    """Get the token counts of a message usage, as span attributes."""
+    if not usage:
+        return {}
+    return {
+        "prompt_tokens": usage.get("prompt_tokens"),
+        "completion_tokens": usage.get("completion_tokens"),
+    }
+
+
+def add_evaluation_span(simulation: SimulationRun, start: float, end: float):
+    """Record the evaluation of a simulation, if the simulation has spans."""
+    if simulation.spans is not None:
+        simulation.spans.append(TimingSpan(phase="evaluate", start=start, end=end))
+
+
+def to_chrome_trace(simulations: Iterable[SimulationRun]) -> dict:
+    """
+    Get the spans of the simulations in the Chrome trace event format.
+    Each simulation is a thread of the trace, named after its task and trial.
+    """
+    events = []
+    for tid, simulation in enumerate(simulations):
+        events.append(
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": 0,
+                "tid": tid,
+                "args": {"name": f"{simulation.task_id} (trial {simulation.trial})"},
+            }
+        )
+        for span in simulation.spans or []:
+            args = dict(span.attributes)
+            if span.step is not None:
+                args["step"] = span.step
+            events.append(
+                {
+                    "name": span.phase if span.role is None else f"{span.role}.{span.phase}",
+                    "cat": span.role or "simulation",
+                    "ph": "X",
+                    "ts": span.start * 1e6,
+                    "dur": (span.end - span.start) * 1e6,
+                    "pid": 0,
+                    "tid": tid,
+                    "args": args,
+                }
+            )
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def _otel_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otel_attributes(attributes: dict[str, Any]) -> list[dict]:
+    return [{"key": key, "value": _otel_value(value)} for key, value in attributes.items()]
+
+
+def _otel_id(*parts: Any, length: int) -> str:
+    return hashlib.blake2b("/".join(map(str, parts)).encode(), digest_size=length // 2).hexdigest()
+
+
+def to_otel_json(simulations: Iterable[SimulationRun], service_name: str = "tau2") -> dict:
+    """
+    Get the spans of the simulations as OpenTelemetry JSON (an OTLP ExportTraceServiceRequest).
+    Each simulation is a trace, with a root span covering the whole simulation.
+    """
+    otel_spans = []
+    for simulation in simulations:
+        if not simulation.spans:
+            continue
+        trace_id = _otel_id(simulation.id, length=32)
+        root_id = _otel_id(simulation.id, "root", length=16)
+        start = min(span.start for span in simulation.spans)
+        end = max(span.end for span in simulation.spans)
+        otel_spans.append(
+            {
+                "traceId": trace_id,
+                "spanId": root_id,
+                "name": "simulation",
+                "kind": 1,
+                "startTimeUnixNano": str(int(start * 1e9)),
+                "endTimeUnixNano": str(int(end * 1e9)),
+                "attributes": _otel_attributes(
+                    {
+                        k: v
+                        for k, v in [
+                            ("task_id", simulation.task_id),
+                            ("trial", simulation.trial),
+                            ("termination_reason", simulation.termination_reason.value),
+                        ]
+                        if v is not None
+                    }
+                ),
+            }
+        )
+        for i, span in enumerate(simulation.spans):
+            attributes = {"role": span.role, "step": span.step, **span.attributes}
+            otel_spans.append(
+                {
+                    "traceId": trace_id,
+                    "spanId": _otel_id(simulation.id, i, length=16),
+                    "parentSpanId": root_id,
+                    "name": span.phase,
+                    "kind": 3 if span.phase == "llm_call" else 1,
+                    "startTimeUnixNano": str(int(span.start * 1e9)),
+                    "endTimeUnixNano": str(int(span.end * 1e9)),
+                    "attributes": _otel_attributes(
+                        {k: v for k, v in attributes.items() if v is not None}
+                    ),
+                }
+            )
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": _otel_attributes({"service.name": service_name})},
+                "scopeSpans": [{"scope": {"name": "tau2"}, "spans": otel_spans}],
+            }
+        ]
+    }
@@ -49,6 +49,14 @@ def format_time(time: datetime) -> str:
     return time.isoformat()
 
 
+def format_time_ns(time_ns: int) -> str:
+    """
+    Format a time.time_ns() time like format_time.
+    """
+    seconds, ns = divmod(time_ns, 1_000_000_000)
+    return format_time(datetime.fromtimestamp(seconds).replace(microsecond=ns // 1000))
+
+
 def get_commit_hash() -> str:
     """
     Get the commit hash of the current directory.
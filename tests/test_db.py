@@ -0,0 +1,49 @@
+import json
+import os
+
+import pytest
+
+from tau2.environment.db import DB, clear_db_snapshots
+from tau2.utils import load_text_snapshot
+
+
+class CounterDB(DB):
+    counters: dict[str, int]
+
+
+@pytest.fixture
+def db_path(tmp_path) -> str:
+    path = tmp_path / "db.json"
+    with open(path, "w") as fp:
+        json.dump({"counters": {"a": 1, "b": 2}}, fp)
+    clear_db_snapshots()
+    return str(path)
+
+
+def test_load_snapshot_returns_isolated_copies(db_path: str):
+    db_1 = CounterDB.load_snapshot(db_path, domain="counter")
+    db_2 = CounterDB.load_snapshot(db_path, domain="counter")
+    assert db_1 == db_2
+    assert db_1 is not db_2
+    db_1.counters["a"] = 100
+    assert db_2.counters["a"] == 1
+    assert CounterDB.load_snapshot(db_path, domain="counter").counters["a"] == 1
+
+
+def test_load_snapshot_reloads_on_mtime_change(db_path: str):
+    assert CounterDB.load_snapshot(db_path).counters == {"a": 1, "b": 2}
+    with open(db_path, "w") as fp:
+        json.dump({"counters": {"c": 3}}, fp)
+    stat = os.stat(db_path)
+    os.utime(db_path, (stat.st_atime, stat.st_mtime + 10))
+    assert CounterDB.load_snapshot(db_path).counters == {"c": 3}
+
+
+def test_load_text_snapshot(tmp_path):
+    path = tmp_path / "policy.md"
+    path.write_text("policy v1")
+    assert load_text_snapshot(path) == "policy v1"
+    path.write_text("policy v2")
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    assert load_text_snapshot(path) == "policy v2"
@@ -0,0 +1,175 @@
+import json
+from datetime import date
+from typing import Optional
+
+import pytest
+from pydantic import BaseModel
+
+from tau2.environment.db import DB, clear_db_snapshots
+from tau2.environment.toolkit import ToolKitBase, ToolType, is_tool
+from tau2.utils import get_dict_hash
+
+
+class Account(BaseModel):
+    account_id: str
+    balance: float
+    opened: date
+    tags: list[str] = []
+
+
+class Line(BaseModel):
+    number: str
+    active: bool
+
+
+class BankDB(DB):
+    accounts: dict[str, Account]
+    lines: list[Line]
+    bank_name: str
+    settings: Optional[dict] = None
+
+
+class BankTools(ToolKitBase):
+    db: BankDB
+
+    def __init__(self, db: BankDB) -> None:
+        super().__init__(db)
+
+    @is_tool(ToolType.READ)
+    def get_balance(self, account_id: str) -> float:
+        return self.db.accounts[account_id].balance
+
+    @is_tool(ToolType.READ)
+    def find_line(self, number: str) -> Optional[Line]:
+        for line in self.db.lines:
+            if line.number == number:
+                return line
+        return None
+
+    @is_tool(ToolType.WRITE)
+    def deposit(self, account_id: str, amount: float) -> float:
+        account = self.db.accounts[account_id]
+        account.balance += amount
+        return account.balance
+
+    @is_tool(ToolType.WRITE)
+    def tag_all(self, tag: str) -> None:
+        for account in self.db.accounts.values():
+            account.tags.append(tag)
+
+    @is_tool(ToolType.WRITE)
+    def open_account(self, account_id: str) -> None:
+        self.db.accounts[account_id] = Account(
+            account_id=account_id, balance=0, opened=date(2025, 1, 1)
+        )
+
+    @is_tool(ToolType.WRITE)
+    def close_account(self, account_id: str) -> None:
+        del self.db.accounts[account_id]
+
+    @is_tool(ToolType.WRITE)
+    def deactivate_line(self, number: str) -> None:
+        line = next(line for line in self.db.lines if line.number == number)
+        line.active = False
+
+    @is_tool(ToolType.WRITE)
+    def add_line(self, number: str) -> None:
+        self.db.lines.append(Line(number=number, active=True))
+
+    @is_tool(ToolType.WRITE)
+    def drop_first_line(self) -> None:
+        self.db.lines.pop(0)
+
+    @is_tool(ToolType.WRITE)
+    def rename_bank(self, name: str) -> None:
+        self.db.bank_name = name
+
+
+@pytest.fixture
+def db_path(tmp_path) -> str:
+    path = tmp_path / "bank.json"
+    data = {
+        "accounts": {
+            f"acc_{i}": {
+                "account_id": f"acc_{i}",
+                "balance": i * 10.5,
+                "opened": "2024-01-0{}".format(i % 9 + 1),
+                "tags": ["é"] if i % 2 else [],
+            }
+            for i in range(20)
+        },
+        "lines": [{"number": f"555-{i:04d}", "active": True} for i in range(10)],
+        "bank_name": "Bank",
+        "settings": {"b": 1, "a": [1, 2]},
+    }
+    with open(path, "w") as fp:
+        json.dump(data, fp)
+    clear_db_snapshots()
+    return str(path)
+
+
+def full_hash(tools: ToolKitBase) -> str:
+    return get_dict_hash(tools.db.model_dump())
+
+
+@pytest.mark.parametrize(
+    "calls",
+    [
+        [],
+        [("get_balance", {"account_id": "acc_1"})],
+        [("deposit", {"account_id": "acc_3", "amount": 5})],
+        [("tag_all", {"tag": "vip"})],
+        [("open_account", {"account_id": "acc_new"})],
+        [("close_account", {"account_id": "acc_4"})],
+        [("deactivate_line", {"number": "555-0003"})],
+        [("add_line", {"number": "555-9999"})],
+        [("drop_first_line", {}), ("deactivate_line", {"number": "555-0005"})],
+        [("rename_bank", {"name": "Other Bank"})],
+    ],
+)
+def test_incremental_hash_matches_full_hash(db_path: str, calls: list):
+    tools = BankTools(BankDB.load_snapshot(db_path))
+    assert tools.get_db_hash() == full_hash(tools)
+    for name, kwargs in calls:
+        tools.use_tool(name, **kwargs)
+        assert tools.get_db_hash(verify=True) == full_hash(tools)
+
+
+def test_incremental_hash_shared_snapshot(db_path: str):
+    gold = BankTools(BankDB.load_snapshot(db_path))
+    predicted = BankTools(BankDB.load_snapshot(db_path))
+    gold.use_tool("deposit", account_id="acc_2", amount=1)
+    assert gold.get_db_hash() != predicted.get_db_hash()
+    predicted.use_tool("deposit", account_id="acc_2", amount=1)
+    assert gold.get_db_hash() == predicted.get_db_hash() == full_hash(predicted)
+    # Writes made to one database do not leak into the hashes of the others.
+    fresh = BankTools(BankDB.load_snapshot(db_path))
+    assert fresh.get_db_hash(verify=True) != gold.get_db_hash()
+
+
+def test_incremental_hash_update_db(db_path: str):
+    tools = BankTools(BankDB.load_snapshot(db_path))
+    tools.get_db_hash()
+    tools.update_db({"accounts": {"acc_5": {"balance": 1000.0}}, "bank_name": "New"})
+    assert tools.db.accounts["acc_5"].balance == 1000.0
+    assert tools.get_db_hash(verify=True) == full_hash(tools)
+    tools.update_db({"lines": [{"number": "1", "active": False}]})
+    assert tools.get_db_hash(verify=True) == full_hash(tools)
+    tools.use_tool("deposit", account_id="acc_5", amount=1)
+    assert tools.get_db_hash(verify=True) == full_hash(tools)
+
+
+def test_incremental_hash_write_scope(db_path: str):
+    tools = BankTools(BankDB.load_snapshot(db_path))
+    tools.get_db_hash()
+    # Writes outside of a write scope are not seen...
+    tools.db.accounts["acc_1"].balance = -1
+    with pytest.raises(ValueError):
+        tools.get_db_hash(verify=True)
+    # ...unless they are made inside one.
+    with tools.db_write_scope():
+        tools.db.accounts["acc_1"].balance = -2
+    assert tools.get_db_hash(verify=True) == full_hash(tools)
+    # Replacing a collection is always seen.
+    tools.db.accounts = {}
+    assert tools.get_db_hash(verify=True) == full_hash(tools)
@@ -0,0 +1,25 @@
+from contextlib import contextmanager
+from typing import Callable
+
+import pytest
+
+from tau2.environment.toolkit import ToolKitBase
+
+
+@contextmanager
+def _checked_writes(tools: ToolKitBase, check: Callable[[ToolKitBase], None]):
+    """
+    Check the indexes of the database of tools against a full scan (check) before and after
+    the writes made in the block, then check the incremental hash of the database against the
+    full one. The hasher is primed first, so the hash follows the writes incrementally.
+    """
+    tools.get_db_hash()
+    check(tools)
+    yield
+    check(tools)
+    tools.get_db_hash(verify=True)
+
+
+@pytest.fixture
+def checked_writes():
+    return _checked_writes
@@ -0,0 +1,132 @@
+"""Tests for the route index of the airline database."""
+
+import random
+
+import pytest
+
+from tau2.domains.airline.data_model import FlightDateStatusCancelled, FlightDB
+from tau2.environment.db import clear_db_snapshots
+from tau2.domains.airline.tools import AirlineTools
+
+AIRPORTS = ["JFK", "LAX", "ORD", "SFO", "SEA"]
+DATES = [f"2024-05-{day}" for day in range(15, 19)]
+
+
+def make_db(num_flights: int = 200, seed: int = 0) -> FlightDB:
+    rng = random.Random(seed)
+    flights = {}
+    for i in range(num_flights):
+        origin, destination = rng.sample(AIRPORTS, 2)
+        departure = rng.randrange(0, 24)
+        arrival = departure + rng.randrange(1, 6)
+        dates = {}
+        for date in DATES:
+            if rng.random() < 0.2:
+                dates[date] = {"status": "cancelled"}
+            else:
+                dates[date] = {
+                    "status": "available",
+                    "available_seats": {"basic_economy": 9, "economy": 9, "business": 9},
+                    "prices": {"basic_economy": 50, "economy": 100, "business": 400},
+                }
+        flights[f"HAT{i:03d}"] = {
+            "flight_number": f"HAT{i:03d}",
+            "origin": origin,
+            "destination": destination,
+            "scheduled_departure_time_est": f"{departure:02d}:00:00",
+            "scheduled_arrival_time_est": f"{arrival % 24:02d}:00:00"
+            + ("+1" if arrival >= 24 else ""),
+            "dates": dates,
+        }
+    return FlightDB(flights=flights, users={}, reservations={})
+
+
+def scan_direct(db: FlightDB, origin, destination, date, leave_after=None) -> list:
+    """The flights found by a full scan of the database, in database order."""
+    return [
+        (flight.flight_number, flight.dates[date].available_seats)
+        for flight in db.flights.values()
+        if flight.origin == origin
+        and (destination is None or flight.destination == destination)
+        and date in flight.dates
+        and flight.dates[date].status == "available"
+        and (leave_after is None or flight.scheduled_departure_time_est >= leave_after)
+    ]
+
+
+def scan_onestop(db: FlightDB, origin, destination, date) -> list:
+    results = []
+    for first, _ in scan_direct(db, origin, None, date):
+        first = db.flights[first]
+        arrival = first.scheduled_arrival_time_est
+        date2 = f"2024-05-{int(date[-2:]) + 1}" if "+1" in arrival else date
+        for second, _ in scan_direct(db, first.destination, destination, date2, arrival):
+            results.append((first.flight_number, date, second, date2))
+    return results
+
+
+def check_searches(tools: AirlineTools):
+    for origin in AIRPORTS:
+        for destination in AIRPORTS:
+            if origin == destination:
+                continue
+            for date in DATES[:2]:
+                direct = tools.search_direct_flight(origin, destination, date)
+                assert [
+                    (f.flight_number, f.available_seats) for f in direct
+                ] == scan_direct(tools.db, origin, destination, date)
+                onestop = tools.search_onestop_flight(origin, destination, date)
+                assert [
+                    (f1.flight_number, f1.date, f2.flight_number, f2.date)
+                    for f1, f2 in onestop
+                ] == scan_onestop(tools.db, origin, destination, date)
+
+
+@pytest.fixture
+def tools() -> AirlineTools:
+    return AirlineTools(make_db())
+
+
+def test_search_matches_scan(tools: AirlineTools):
+    check_searches(tools)
+
+
+def test_search_follows_writes(tools: AirlineTools, checked_writes):
+    with checked_writes(tools, check_searches):
+        flights = tools.db.flights
+        with tools.db_write_scope():
+            # Seats and status change in place.
+            flights["HAT001"].dates[DATES[0]].available_seats["economy"] -= 1
+            flights["HAT002"].dates[DATES[0]] = FlightDateStatusCancelled(status="cancelled")
+            # Flights added and removed.
+            flights["HAT999"] = flights["HAT007"].model_copy(update={"flight_number": "HAT999"})
+        check_searches(tools)
+        with tools.db_write_scope():
+            flights.pop("HAT008")
+
+
+def test_search_follows_update_db(tools: AirlineTools, checked_writes):
+    with checked_writes(tools, check_searches):
+        tools.update_db(make_db(seed=1).model_dump())
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "db.json"
+    make_db().dump(str(path))
+    yield path
+    clear_db_snapshots()
+
+
+def test_index_shared_by_snapshot(db_path):
+    tools1 = AirlineTools(FlightDB.load_snapshot(db_path))
+    tools2 = AirlineTools(FlightDB.load_snapshot(db_path))
+    check_searches(tools1)
+    check_searches(tools2)
+    assert tools1.db._routes is tools2.db._routes
+    # A database that diverges from the schedule gets its own index.
+    with tools2.db_write_scope():
+        tools2.db.flights.pop("HAT008")
+    check_searches(tools2)
+    assert tools1.db._routes is not tools2.db._routes
+    check_searches(AirlineTools(FlightDB.load_snapshot(db_path)))
@@ -0,0 +1,206 @@
+"""Tests for the account, card and transaction indexes of the bank database."""
+
+import random
+
+import pytest
+
+from tau2.domains.bank.data_model import BankDB
+from tau2.domains.bank.tools import BankTools
+
+STATUSES = ["posted", "pending", "reversed"]
+
+
+def make_db(num_clients: int = 20, num_transactions: int = 500, seed: int = 0) -> BankDB:
+    rng = random.Random(seed)
+    clients = {}
+    for i in range(num_clients):
+        clients[f"client_{i}"] = {
+            "client_id": f"client_{i}",
+            "name": {"first_name": "Client", "last_name": str(i)},
+            "contact": {"email": f"c{i}@example.com", "phone": "555-0100"},
+            "address": {
+                "address1": "1 Main St",
+                "address2": "",
+                "city": "Springfield",
+                "state": "IL",
+                "zip": "62701",
+                "country": "US",
+            },
+            "accounts": {
+                f"acc_{i}_{j}": {
+                    "account_id": f"acc_{i}_{j}",
+                    "type": "checking",
+                    "currency": "USD",
+                    "status": "active",
+                    "account_number_masked": "****0000",
+                    "routing_number": "000000000",
+                    "balance": {"current": 1000.0, "available": 1000.0, "on_hold": 0.0},
+                    "opened_at": "2020-01-01T00:00:00Z",
+                    "features": {
+                        "checks_enabled": True,
+                        "atm_access": True,
+                        "online_banking": True,
+                    },
+                }
+                for j in range(2)
+            },
+            "cards": {
+                f"card_{i}": {
+                    "card_id": f"card_{i}",
+                    "type": "debit",
+                    "linked_account_id": f"acc_{i}_0",
+                    "status": "active",
+                    "issuer": "Bank",
+                    "extra_info": {
+                        "brand": "Visa",
+                        "last_four": "0000",
+                        "exp_month": "01",
+                        "exp_year": "2030",
+                    },
+                    "limits": {"daily_atm_limit": 500.0, "daily_pos_limit": 2000.0},
+                    "pin_set": True,
+                }
+            },
+            "loan_ids": [],
+            "beneficiary_ids": [],
+            "created_at": "2020-01-01T00:00:00Z",
+            "kyc": {
+                "status": "verified",
+                "last_reviewed_at": "2020-01-01T00:00:00Z",
+                "tax_id_masked": "****0000",
+            },
+        }
+    transactions = {}
+    for k in range(num_transactions):
+        i = rng.randrange(num_clients)
+        transactions[f"tx_{k + 1:07d}"] = {
+            "transaction_id": f"tx_{k + 1:07d}",
+            "client_id": f"client_{i}",
+            "account_id": f"acc_{i}_{rng.randrange(2)}",
+            # Few distinct timestamps, so that many are equal.
+            "timestamp": f"2024-01-{rng.randrange(1, 11):02d}T12:00:00Z",
+            "type": "payment",
+            "direction": "debit",
+            "amount": float(rng.randrange(1, 100)),
+            "currency": "USD",
+            "method": "Card",
+            "status": rng.choice(STATUSES),
+            "merchant": {"name": rng.choice(["Shop", "Cafe"]), "mcc": "0", "city": "X", "country": "US"},
+        }
+    return BankDB(clients=clients, transactions=transactions, loans={}, beneficiaries={})
+
+
+def scan(db: BankDB, account_id: str, start_date=None, end_date=None) -> list[str]:
+    """The transactions of an account found by a full scan, newest first."""
+    txs = [
+        tx
+        for tx in db.transactions.values()
+        if tx.account_id == account_id
+        and not (start_date and tx.timestamp < start_date)
+        and not (end_date and tx.timestamp > end_date)
+    ]
+    txs.sort(key=lambda t: t.timestamp, reverse=True)
+    return [tx.transaction_id for tx in txs]
+
+
+def check_transactions(tools: BankTools):
+    db = tools.db
+    for client_id, client in db.clients.items():
+        for account_id in client.accounts:
+            recent = tools.get_recent_transactions(account_id, limit=5)
+            assert [tx.transaction_id for tx in recent] == [
+                tx_id
+                for tx_id in scan(db, account_id)
+                if db.transactions[tx_id].status in ("posted", "pending")
+            ][:5]
+            for start_date, end_date in [
+                (None, None),
+                ("2024-01-03", "2024-01-06T12:00:00Z"),
+                ("2024-01-05T12:00:00Z", None),
+                ("", "2024-01-02"),
+            ]:
+                found = tools.search_transactions(
+                    client_id, account_id, start_date=start_date, end_date=end_date
+                )
+                assert [tx.transaction_id for tx in found] == scan(
+                    db, account_id, start_date, end_date
+                )
+            found = tools.search_transactions(
+                client_id, account_id, status="posted", merchant_name_contains="caf"
+            )
+            assert [tx.transaction_id for tx in found] == [
+                tx_id
+                for tx_id in scan(db, account_id)
+                if db.transactions[tx_id].status == "posted"
+                and db.transactions[tx_id].merchant is not None
+                and db.transactions[tx_id].merchant.name == "Cafe"
+            ]
+
+
+@pytest.fixture
+def tools() -> BankTools:
+    return BankTools(make_db())
+
+
+def check_lookups(tools: BankTools):
+    for client_id, client in tools.db.clients.items():
+        for account_id, account in client.accounts.items():
+            assert tools._get_account_by_id(account_id) == (client_id, account)
+        for card_id, card in client.cards.items():
+            assert tools._get_card_by_id(card_id) == (client_id, card)
+
+
+def check_indexes(tools: BankTools):
+    check_lookups(tools)
+    check_transactions(tools)
+
+
+def test_lookups(tools: BankTools, checked_writes):
+    with pytest.raises(ValueError):
+        tools.get_account_details("acc_999_0")
+    with pytest.raises(ValueError):
+        tools.get_card_details("card_999")
+    with checked_writes(tools, check_lookups):
+        # Moved between clients.
+        with tools.db_write_scope():
+            clients = tools.db.clients
+            clients["client_1"].cards["card_0"] = clients["client_0"].cards.pop("card_0")
+        assert tools._get_card_by_id("card_0")[0] == "client_1"
+
+
+def test_transactions_match_scan(tools: BankTools):
+    check_transactions(tools)
+
+
+def test_transactions_follow_writes(tools: BankTools, checked_writes):
+    with checked_writes(tools, check_transactions):
+        for _ in range(3):
+            # The two transactions of an internal transfer get the same ID, the second
+            # replaces the first.
+            tools.use_tool(
+                "initiate_internal_transfer",
+                client_id="client_0",
+                from_account_id="acc_0_0",
+                to_account_id="acc_0_1",
+                amount=10.0,
+            )
+        assert len(tools.db.transactions) == 503
+        check_transactions(tools)
+        with tools.db_write_scope():
+            transactions = tools.db.transactions
+            transactions["tx_0000001"].status = "reversed"
+            transactions["tx_0000002"].timestamp = "2024-01-20T00:00:00Z"
+            transactions["tx_0000003"].account_id = "acc_19_1"
+        check_transactions(tools)
+        with tools.db_write_scope():
+            del transactions["tx_0000004"]
+
+
+def test_indexes_follow_update_db(tools: BankTools, checked_writes):
+    with checked_writes(tools, check_indexes):
+        account = tools.db.clients["client_1"].accounts["acc_1_0"].model_dump()
+        account["account_id"] = "acc_new"
+        tools.update_db({"clients": {"client_2": {"accounts": {"acc_new": account}}}})
+        assert tools._get_account_by_id("acc_new")[0] == "client_2"
+        check_indexes(tools)
+        tools.update_db(make_db(seed=1).model_dump())
@@ -0,0 +1,195 @@
+"""Tests for the booked-seat index and the seat cache of the movie theater database."""
+
+import random
+
+import pytest
+
+from tau2.domains.movie.data_model import MovieTheaterDB
+from tau2.domains.movie.tools import MovieTheaterTools
+
+SHOWS = [f"SHOW{i}" for i in range(6)]
+SEATS = [f"{row}{number}" for row in "ABCDE" for number in range(1, 11)]
+
+
+def make_auditorium(auditorium_id: str) -> dict:
+    return {
+        "auditorium_id": auditorium_id,
+        "name": auditorium_id,
+        "capacity": len(SEATS),
+        "features": [],
+        "seat_map": {
+            "rows": {
+                row: [
+                    {"seat_id": seat_id, "type": "standard", "wheelchair_accessible": False}
+                    for seat_id in SEATS
+                    if seat_id[0] == row
+                ]
+                for row in "ABCDE"
+            }
+        },
+    }
+
+
+def make_booking(booking_id: str, show_id: str, seat_ids: list[str], status: str) -> dict:
+    return {
+        "booking_id": booking_id,
+        "theater_id": "TH1",
+        "movie_id": "MOV1",
+        "show_id": show_id,
+        "date": "24-05-20",
+        "start_time_local": "24-05-20-19-00",
+        "status": status,
+        "created_at": "24-05-01-10-00",
+        "customer": {
+            "name": {"first_name": "Ann", "last_name": "Lee"},
+            "email": "ann@example.com",
+            "phone": "555-0100",
+        },
+        "seats": [
+            {"seat_id": seat_id, "ticket_type": "adult", "price": 10.0, "convenience_fee": 1.0, "tax": 1.1}
+            for seat_id in seat_ids
+        ],
+        "concessions": [],
+        "promotions_applied": [],
+        "payment_history": [],
+        "totals": {
+            "tickets_subtotal": 10.0 * len(seat_ids),
+            "concessions_subtotal": 0.0,
+            "fees_total": 1.0 * len(seat_ids),
+            "tax_total": 1.1 * len(seat_ids),
+            "grand_total": 12.1 * len(seat_ids),
+            "amount_paid": 12.1 * len(seat_ids),
+            "amount_due": 0.0,
+        },
+        "delivery": {"method": "e-ticket", "tickets": []},
+    }
+
+
+def make_db(num_bookings: int = 200, seed: int = 0) -> MovieTheaterDB:
+    rng = random.Random(seed)
+    shows = [
+        {
+            "show_id": show_id,
+            "movie_id": "MOV1",
+            "auditorium_id": f"AUD{i % 2}",
+            "start_time_local": "24-05-20-19-00",
+            "end_time_local": "24-05-20-21-00",
+            "format": "2D",
+            "language": "English",
+            "subtitles": "None",
+            "status": "scheduled",
+            "price_schema": {"adult": 10.0, "child": 8.0, "senior": 9.0, "fees": {"convenience_fee": 1.0}},
+        }
+        for i, show_id in enumerate(SHOWS)
+    ]
+    theater = {
+        "theater_id": "TH1",
+        "name": "Theater",
+        "address": {"street": "1 Main St", "city": "X", "state": "Y", "country": "US", "zip": "00000"},
+        "contact": {"phone": "555-0100", "email": "th@example.com", "website": "example.com"},
+        "amenities": [],
+        "auditoriums": {f"AUD{i}": make_auditorium(f"AUD{i}") for i in range(2)},
+        "pricing_rules": {
+            "base": {"adult": 10.0, "child": 8.0, "senior": 9.0},
+            "format_surcharges": {},
+            "time_based": {"matinee_discount": 0.0, "peak_surcharge": 0.0},
+            "fees": {"convenience_fee": 1.0, "booking_fee": 2.0},
+            "tax_rate_percent": 10.0,
+        },
+        "dates": {"24-05-20": {"shows": shows}},
+    }
+    free = {show_id: list(SEATS) for show_id in SHOWS}
+    bookings = {}
+    for k in range(num_bookings):
+        show_id = rng.choice(SHOWS)
+        status = rng.choice(["confirmed", "canceled"])
+        if status == "confirmed":
+            seat_ids = [free[show_id].pop(rng.randrange(len(free[show_id]))) for _ in range(2)]
+        else:
+            seat_ids = rng.sample(SEATS, 2)
+        bookings[f"B{k:04d}"] = make_booking(f"B{k:04d}", show_id, seat_ids, status)
+    return MovieTheaterDB(movies={}, theaters={"TH1": theater}, bookings=bookings)
+
+
+def scan(db: MovieTheaterDB, show_id: str) -> list[str]:
+    """The booked seats of a show found by a full scan of the bookings."""
+    return sorted(
+        seat.seat_id
+        for booking in db.bookings.values()
+        if booking.show_id == show_id and booking.status == "confirmed"
+        for seat in booking.seats
+    )
+
+
+def check_availability(tools: MovieTheaterTools):
+    for show_id in SHOWS:
+        availability = tools.get_seat_availability("TH1", show_id)
+        assert availability["booked"] == scan(tools.db, show_id)
+        assert availability["available"] == sorted(set(SEATS) - set(availability["booked"]))
+
+
+def seat_specs(seat_ids: list[str]) -> list[dict]:
+    return [{"seat_id": seat_id, "ticket_type": "adult"} for seat_id in seat_ids]
+
+
+def book(tools: MovieTheaterTools, show_id: str, seat_ids: list[str]) -> str:
+    preview = tools.price_preview("TH1", show_id, seat_specs(seat_ids))
+    booking = tools.use_tool(
+        "create_booking",
+        theater_id="TH1",
+        show_id=show_id,
+        customer={"name": {"first_name": "Bo", "last_name": "Li"}, "email": "bo@example.com", "phone": "555-0101"},
+        seats=seat_specs(seat_ids),
+        delivery_method="e-ticket",
+        payments=[
+            {
+                "payment_id": "P1",
+                "amount": preview["grand_total"],
+                "method": {"source": "card", "payment_method_id": "card_1"},
+                "created_at": "24-05-15-15-00",
+            }
+        ],
+    )
+    return booking.booking_id
+
+
+@pytest.fixture
+def tools() -> MovieTheaterTools:
+    return MovieTheaterTools(make_db())
+
+
+def test_seat_availability_matches_scan(tools: MovieTheaterTools):
+    check_availability(tools)
+    auditorium = tools.db.theaters["TH1"].auditoriums["AUD0"]
+    assert tools._list_all_seat_ids(auditorium) == set(SEATS)
+    with pytest.raises(ValueError):
+        tools.price_preview("TH1", "SHOW0", seat_specs(["Z1"]))
+
+
+def test_booked_seats_follow_writes(tools: MovieTheaterTools, checked_writes):
+    with checked_writes(tools, check_availability):
+        free = tools.get_seat_availability("TH1", "SHOW0")["available"]
+        booking_id = book(tools, "SHOW0", free[:2])
+        check_availability(tools)
+        with pytest.raises(ValueError):
+            book(tools, "SHOW0", free[1:3])
+        # Swapping a seat keeps the price, no payment is needed.
+        tools.use_tool("update_booking_seats", booking_id=booking_id, seats=seat_specs([free[0], free[2]]))
+        check_availability(tools)
+        book(tools, "SHOW0", free[1:2])
+        tools.use_tool("cancel_booking", booking_id=booking_id)
+        check_availability(tools)
+        book(tools, "SHOW0", free[2:3])
+        check_availability(tools)
+        # Changes made without the tools.
+        with tools.db_write_scope():
+            bookings = tools.db.bookings
+            confirmed = [b for b in bookings.values() if b.status == "confirmed"]
+            confirmed[0].status = "refunded"
+            confirmed[1].seats = confirmed[1].seats[:1]
+            del bookings[confirmed[2].booking_id]
+
+
+def test_booked_seats_follow_update_db(tools: MovieTheaterTools, checked_writes):
+    with checked_writes(tools, check_availability):
+        tools.update_db(make_db(seed=1).model_dump())
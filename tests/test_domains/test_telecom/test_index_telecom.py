@@ -0,0 +1,202 @@
+"""Tests for the secondary indexes of the telecom database and for sync_tools."""
+
+import datetime
+
+import pytest
+
+from tau2.data_model.message import ToolCall
+from tau2.data_model.tasks import EnvFunctionCall
+from tau2.domains.telecom.data_model import (
+    Address,
+    Bill,
+    BillStatus,
+    Customer,
+    Device,
+    Line,
+    LineStatus,
+    Plan,
+    TelecomDB,
+)
+from tau2.domains.telecom.environment import TelecomEnvironment
+from tau2.domains.telecom.tools import TelecomTools
+from tau2.domains.telecom.user_data_model import TelecomUserDB, UserSurroundings
+from tau2.domains.telecom.user_tools import TelecomUserTools
+
+DATE = datetime.date(2025, 1, 1)
+
+
+def make_db(num_customers: int = 20) -> TelecomDB:
+    plans = [
+        Plan(
+            plan_id=f"P{i}",
+            name=f"Plan {i}",
+            data_limit_gb=10.0,
+            price_per_month=30.0,
+            data_refueling_price_per_gb=2.0,
+        )
+        for i in range(3)
+    ]
+    customers, lines, bills, devices = [], [], [], []
+    for i in range(num_customers):
+        lines.append(
+            Line(
+                line_id=f"L{i}",
+                phone_number=f"555-200-{i:04d}",
+                status=LineStatus.ACTIVE,
+                plan_id=f"P{i % 3}",
+                device_id=f"D{i}",
+            )
+        )
+        devices.append(
+            Device(device_id=f"D{i}", device_type="phone", model="X", is_esim_capable=True)
+        )
+        bill_ids = [f"B{i}_{j}" for j in range(2)]
+        for bill_id in bill_ids:
+            bills.append(
+                Bill(
+                    bill_id=bill_id,
+                    customer_id=f"C{i}",
+                    period_start=DATE,
+                    period_end=DATE,
+                    issue_date=DATE,
+                    total_due=30.0,
+                    due_date=DATE,
+                    status=BillStatus.PAID,
+                )
+            )
+        customers.append(
+            Customer(
+                customer_id=f"C{i}",
+                full_name=f"Customer {i}",
+                date_of_birth="1990-01-01",
+                email=f"c{i}@example.com",
+                phone_number=f"555-100-{i:04d}",
+                address=Address(street="1 Main St", city="Springfield", state="IL", zip_code="62701"),
+                line_ids=[f"L{i}"],
+                bill_ids=bill_ids,
+                created_at=datetime.datetime(2025, 1, 1),
+            )
+        )
+    return TelecomDB(plans=plans, customers=customers, lines=lines, bills=bills, devices=devices)
+
+
+@pytest.fixture
+def tools() -> TelecomTools:
+    return TelecomTools(make_db())
+
+
+def check_lookups(tools: TelecomTools):
+    db = tools.db
+    for customer in db.customers:
+        assert tools.get_customer_by_id(customer.customer_id) is customer
+        assert tools.get_customer_by_phone(customer.phone_number) is customer
+    for line in db.lines:
+        assert tools._get_line_by_id(line.line_id) is line
+        assert tools._get_line_by_phone(line.phone_number) is line
+        assert tools.get_customer_by_phone(line.phone_number).customer_id == f"C{line.line_id[1:]}"
+    for bill in db.bills:
+        assert tools._get_bill_by_id(bill.bill_id) is bill
+    assert tools.get_details_by_id("P1") is db.plans[1]
+    assert tools.get_details_by_id("D3") is db.devices[3]
+
+
+def test_lookups(tools: TelecomTools):
+    check_lookups(tools)
+    for lookup, key in [
+        (tools.get_customer_by_id, "C999"),
+        (tools.get_customer_by_phone, "555-999-9999"),
+        (tools._get_line_by_id, "L999"),
+        (tools._get_bill_by_id, "B999"),
+    ]:
+        with pytest.raises(ValueError):
+            lookup(key)
+
+
+def test_indexes_follow_writes(tools: TelecomTools, checked_writes):
+    db = tools.db
+    with checked_writes(tools, check_lookups):
+        # Appended records.
+        with tools.db_write_scope():
+            tools.suspend_line_for_overdue_bill("C1", "L1", "B_overdue", contract_ended=False)
+        assert tools._get_bill_by_id("B_overdue").status == BillStatus.OVERDUE
+        tools.use_tool("refuel_data", customer_id="C2", line_id="L2", gb_amount=1.0)
+        assert tools._get_bill_by_id(db.customers[2].bill_ids[-1]).status == BillStatus.DRAFT
+        # Reordered and modified records.
+        with tools.db_write_scope():
+            db.bills.reverse()
+            db.lines[3].phone_number = "555-300-0003"
+        assert tools.get_customer_by_phone("555-300-0003").customer_id == "C3"
+        with pytest.raises(ValueError):
+            tools.get_customer_by_phone("555-200-0003")
+
+
+def test_indexes_follow_update_db(tools: TelecomTools, checked_writes):
+    with checked_writes(tools, check_lookups):
+        lines = [line.model_dump() for line in tools.db.lines]
+        lines[4]["phone_number"] = "555-400-0004"
+        tools.update_db({"lines": lines})
+        assert tools.get_customer_by_phone("555-400-0004").customer_id == "C4"
+        with pytest.raises(ValueError):
+            tools._get_line_by_phone("555-200-0004")
+
+
+def test_sync_tools(tools: TelecomTools):
+    user_tools = TelecomUserTools(
+        TelecomUserDB(surroundings=UserSurroundings(phone_number="555-200-0005"))
+    )
+    env = TelecomEnvironment("telecom", "", tools, user_tools)
+    env.sync_tools()
+    surroundings = user_tools.db.surroundings
+    assert surroundings.line_active and surroundings.payment_request is None
+    tools.use_tool("suspend_line", customer_id="C5", line_id="L5", reason="test")
+    tools.use_tool("send_payment_request", customer_id="C5", bill_id="B5_1")
+    env.sync_tools()
+    assert not surroundings.line_active
+    assert surroundings.payment_request.bill_id == "B5_1"
+
+
+class AlwaysSyncTelecomEnvironment(TelecomEnvironment):
+    def tools_changed_since_sync(self) -> bool:
+        return True
+
+
+def test_sync_tools_skipped_when_unchanged():
+    def make_env(env_class):
+        user_tools = TelecomUserTools(TelecomUserDB())
+        env = env_class("telecom", "", TelecomTools(make_db()), user_tools)
+        env.run_env_function_call(
+            EnvFunctionCall(
+                env_type="user",
+                func_name="set_user_info",
+                arguments={"name": "Customer 6", "phone_number": "555-200-0006"},
+            )
+        )
+        return env
+
+    env = make_env(TelecomEnvironment)
+    reference = make_env(AlwaysSyncTelecomEnvironment)
+    calls = [
+        ("assistant", "get_customer_by_phone", {"phone_number": "555-200-0006"}),
+        ("assistant", "suspend_line", {"customer_id": "C6", "line_id": "L6", "reason": "test"}),
+        ("user", "check_status_bar", {}),
+        ("assistant", "resume_line", {"customer_id": "C6", "line_id": "L6"}),
+        ("assistant", "send_payment_request", {"customer_id": "C6", "bill_id": "B6_0"}),
+        ("user", "check_payment_request", {}),
+        ("user", "make_payment", {}),
+        ("assistant", "enable_roaming", {"customer_id": "C6", "line_id": "L6"}),
+        ("user", "toggle_roaming", {}),
+        ("assistant", "send_payment_request", {"customer_id": "C6", "bill_id": "B6_1"}),
+        ("assistant", "disable_roaming", {"customer_id": "C6", "line_id": "L6"}),
+    ]
+    for i, (requestor, name, arguments) in enumerate(calls):
+        for e in (env, reference):
+            e.get_response(ToolCall(id=str(i), name=name, arguments=arguments, requestor=requestor))
+            # Text turns.
+            e.sync_tools()
+        assert env.user_tools.db.model_dump() == reference.user_tools.db.model_dump()
+        assert env.tools.db.model_dump() == reference.tools.db.model_dump()
+    assert env.tools._get_bill_by_id("B6_0").status == BillStatus.PAID
+    assert env.user_tools.db.surroundings.payment_request.bill_id == "B6_1"
+    assert not env.tools_changed_since_sync()
+    env.user_tools.use_tool("toggle_airplane_mode")
+    assert env.tools_changed_since_sync()
@@ -15,8 +15,13 @@ from tau2.data_model.tasks import (
     InitializationData,
 )
 from tau2.environment.environment import Environment
-from tau2.environment.tool import Tool
-from tau2.environment.toolkit import ToolKitBase, ToolType, is_tool
+from tau2.environment.tool import Tool, as_tool
+from tau2.environment.toolkit import (
+    ToolKitBase,
+    ToolType,
+    get_tool_signatures,
+    is_tool,
+)
 
 
 @pytest.fixture
@@ -254,6 +259,38 @@ def test_toolkit(
     assert mock_user_toolkit.use_tool("tool4", param4=4) == "5"
 
 
+def test_toolkit_tool_cache(
+    mock_toolkit_class: Callable[[], ToolKitBase],
+    super_mock_toolkit_class: Callable[[], ToolKitBase],
+):
+    toolkit_1 = mock_toolkit_class()
+    toolkit_2 = mock_toolkit_class()
+    tools_1 = toolkit_1.get_tools()
+    tools_2 = toolkit_2.get_tools()
+    assert toolkit_1.get_tools() is tools_1
+
+    # Schemas are shared by the class, calls go to the instance
+    assert tools_1["tool1"].openai_schema is tools_2["tool1"].openai_schema
+    assert tools_1["tool1"].openai_schema == as_tool(toolkit_1.tool1).openai_schema
+    assert tools_1["tool1"](param1=1) == "1"
+    assert tools_2["tool1"](param1=5) == "5"
+    assert toolkit_1.val == 1
+    assert tools_1["tool1"].claude_schema["input_schema"] == (
+        tools_1["tool1"].openai_schema["function"]["parameters"]
+    )
+    assert tools_1["tool1"].claude_schema is tools_2["tool1"].claude_schema
+    assert get_tool_signatures(toolkit_1) is get_tool_signatures(toolkit_2)
+
+    # Subclasses have their own cache
+    super_tools = super_mock_toolkit_class().get_tools()
+    assert super_tools.keys() == {"tool1", "tool2", "tool3"}
+    assert get_tool_signatures(super_mock_toolkit_class()).keys() == {
+        "tool1",
+        "tool2",
+        "tool3",
+    }
+
+
 def test_environment(
     mock_toolkit_class: Callable[[], ToolKitBase],
     domain_name: str,
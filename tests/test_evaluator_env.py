@@ -0,0 +1,171 @@
+import json
+import os
+import time
+
+from tau2.data_model.message import AssistantMessage, ToolCall, ToolMessage, UserMessage
+from tau2.data_model.tasks import Action, EvaluationCriteria, RewardType, Task, make_task
+from tau2.environment.db import DB
+from tau2.environment.environment import Environment
+from tau2.environment.toolkit import ToolKitBase, ToolType, is_tool
+from tau2.evaluator import evaluator_env
+from tau2.evaluator.evaluator_env import EnvironmentEvaluator, get_gold_environment_key
+
+
+class CounterDB(DB):
+    counters: dict[str, int]
+
+
+class CounterTools(ToolKitBase):
+    db: CounterDB
+
+    def __init__(self, db: CounterDB) -> None:
+        super().__init__(db)
+
+    @is_tool(ToolType.WRITE)
+    def increment(self, name: str) -> str:
+        self.db.counters[name] += 1
+        return str(self.db.counters[name])
+
+
+def get_environment(solo_mode: bool = False) -> Environment:
+    return Environment(
+        domain_name="counter",
+        policy="",
+        tools=CounterTools(CounterDB(counters={"a": 0, "b": 0})),
+        solo_mode=solo_mode,
+    )
+
+
+def make_counter_task(name: str):
+    return make_task(
+        user_instructions="Increment the counter.",
+        eval_criteria=EvaluationCriteria(
+            actions=[
+                Action(action_id="0", name="increment", arguments={"name": name})
+            ],
+            reward_basis=[RewardType.DB],
+        ),
+    )
+
+
+def make_trajectory(name: str):
+    return [
+        AssistantMessage(
+            role="assistant",
+            tool_calls=[ToolCall(id="0", name="increment", arguments={"name": name})],
+        ),
+        ToolMessage(id="0", role="tool", content="1"),
+    ]
+
+
+def test_gold_environment_cache(tmp_path, monkeypatch):
+    gold_runs = []
+    run_gold_environment = EnvironmentEvaluator.run_gold_environment.__func__
+
+    def counting_run_gold_environment(cls, environment_constructor, task):
+        gold_runs.append(task.id)
+        return run_gold_environment(cls, environment_constructor, task)
+
+    monkeypatch.setattr(
+        EnvironmentEvaluator,
+        "run_gold_environment",
+        classmethod(counting_run_gold_environment),
+    )
+    cache_dir = str(tmp_path / "gold")
+    task = make_counter_task("a")
+    for name, reward in [("a", 1.0), ("b", 0.0), ("a", 1.0)]:
+        reward_info = EnvironmentEvaluator.calculate_reward(
+            environment_constructor=get_environment,
+            task=task,
+            full_trajectory=make_trajectory(name),
+            gold_cache_dir=cache_dir,
+        )
+        assert reward_info.reward == reward
+    assert len(gold_runs) == 1
+
+    # Another task with the same content hits the cache, a different one does not.
+    EnvironmentEvaluator.calculate_reward(
+        environment_constructor=get_environment,
+        task=make_counter_task("a"),
+        full_trajectory=make_trajectory("a"),
+        gold_cache_dir=cache_dir,
+    )
+    assert len(gold_runs) == 1
+    EnvironmentEvaluator.calculate_reward(
+        environment_constructor=get_environment,
+        task=make_counter_task("b"),
+        full_trajectory=make_trajectory("b"),
+        gold_cache_dir=cache_dir,
+    )
+    assert len(gold_runs) == 2
+
+    # Results are read back from disk by a new process.
+    monkeypatch.setattr(evaluator_env, "_GOLD_ENVIRONMENT_CACHES", {})
+    reward_info = EnvironmentEvaluator.calculate_reward(
+        environment_constructor=get_environment,
+        task=task,
+        full_trajectory=make_trajectory("a"),
+        gold_cache_dir=cache_dir,
+    )
+    assert reward_info.reward == 1.0
+    assert len(gold_runs) == 2
+
+
+def test_gold_environment_key_ignores_message_times():
+    task = make_task(
+        user_instructions="Increment the counter.",
+        eval_criteria=make_counter_task("a").evaluation_criteria,
+        message_history=[UserMessage(role="user", content="Increment a.")],
+    )
+    data = task.model_dump(exclude={"initial_state": {"message_history": {"__all__": {"timestamp"}}}})
+    task_1 = Task.model_validate(data)
+    time.sleep(0.01)
+    task_2 = Task.model_validate(data)
+    assert (
+        task_1.initial_state.message_history[0].get_timestamp()
+        != task_2.initial_state.message_history[0].get_timestamp()
+    )
+    key = get_gold_environment_key(get_environment, task_1)
+    assert key is not None
+    assert get_gold_environment_key(get_environment, task_2) == key
+
+
+COUNTER_DB_PATH = None
+
+
+def get_file_environment() -> Environment:
+    return Environment(
+        domain_name="counter",
+        policy="",
+        tools=CounterTools(CounterDB.load_snapshot(COUNTER_DB_PATH, domain="counter")),
+    )
+
+
+class ClockCounterTools(CounterTools):
+    deterministic = False
+
+
+def get_clock_environment() -> Environment:
+    return Environment(
+        domain_name="counter",
+        policy="",
+        tools=ClockCounterTools(CounterDB(counters={"a": 0, "b": 0})),
+    )
+
+
+def test_gold_environment_key_follows_db_file(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "db.json")
+    with open(db_path, "w") as fp:
+        json.dump({"counters": {"a": 0, "b": 0}}, fp)
+    monkeypatch.setattr(evaluator_env, "_ENVIRONMENT_FINGERPRINTS", {})
+    monkeypatch.setitem(globals(), "COUNTER_DB_PATH", db_path)
+    task = make_counter_task("a")
+    key = get_gold_environment_key(get_file_environment, task)
+    assert get_gold_environment_key(get_file_environment, task) == key
+    with open(db_path, "w") as fp:
+        json.dump({"counters": {"a": 5, "b": 0}}, fp)
+    os.utime(db_path, (0, 0))
+    assert get_gold_environment_key(get_file_environment, task) != key
+
+    # Tools that read the wall clock are not cached.
+    assert get_gold_environment_key(get_clock_environment, task) is None
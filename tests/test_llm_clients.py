@@ -0,0 +1,27 @@
+import asyncio
+
+from openai import AsyncOpenAI, OpenAI
+
+from LLM_CALL import get_async_http_client, get_http_client, get_llm_client
+
+
+def test_llm_client_reuse():
+    endpoint = "http://localhost:8000/v1"
+    client = get_llm_client(OpenAI, endpoint, "EMPTY")
+    assert get_llm_client(OpenAI, endpoint, "EMPTY") is client
+    # A new credential gets a new client on top of the same connection pool.
+    other = get_llm_client(OpenAI, endpoint, "token")
+    assert other is not client
+    assert other._client is client._client is get_http_client(endpoint)
+
+
+def test_async_llm_client_per_event_loop():
+    endpoint = "http://localhost:8000/v1"
+
+    async def get_clients():
+        client = get_llm_client(AsyncOpenAI, endpoint, "EMPTY")
+        assert get_llm_client(AsyncOpenAI, endpoint, "EMPTY") is client
+        assert client._client is get_async_http_client(endpoint)
+        return client
+
+    assert asyncio.run(get_clients()) is not asyncio.run(get_clients())
@@ -0,0 +1,81 @@
+import json
+
+import httpx
+import openai
+import pytest
+
+import LLM_CALL
+from LLM_CALL import LLMCallError, RetryPolicy, get_llm_response, simulation_deadline
+
+
+def make_status_error(status_code: int, headers: dict = None) -> openai.APIStatusError:
+    request = httpx.Request("POST", "http://localhost:8000/v1/chat/completions")
+    response = httpx.Response(status_code, request=request, headers=headers)
+    return openai.APIStatusError("error", response=response, body=None)
+
+
+def test_retry_policy_classification():
+    policy = RetryPolicy("model")
+    assert 0 <= policy.get_delay(make_status_error(500)) <= LLM_CALL.RETRY_BASE_DELAY
+    assert policy.get_delay(make_status_error(429, {"retry-after": "3"})) == 3
+    with pytest.raises(LLMCallError) as error:
+        policy.get_delay(make_status_error(400))
+    assert error.value.reason == "fatal"
+    assert error.value.attempts == 3
+
+
+def test_retry_policy_transient_errors():
+    request = httpx.Request("POST", "http://localhost:8000/v1/chat/completions")
+    policy = RetryPolicy("model")
+    policy.get_delay()
+    policy.get_delay(openai.APITimeoutError(request=request))
+    policy.get_delay(httpx.ReadError("reset", request=request))
+    policy.get_delay(json.JSONDecodeError("Unterminated string", '{"content": "', 12))
+    # Unknown errors, e.g. an answer of an unexpected format, are not retried.
+    with pytest.raises(LLMCallError) as error:
+        policy.get_delay(KeyError("content"))
+    assert error.value.reason == "fatal"
+
+
+def test_retry_policy_limits():
+    policy = RetryPolicy("model", max_attempts=2)
+    policy.get_delay(make_status_error(503))
+    with pytest.raises(LLMCallError) as error:
+        policy.get_delay(make_status_error(503))
+    assert error.value.reason == "max_attempts"
+
+    with simulation_deadline(5):
+        policy = RetryPolicy("model", timeout=100)
+        assert policy.remaining() <= 5
+        with pytest.raises(LLMCallError) as error:
+            policy.get_delay(make_status_error(429, {"retry-after": "10"}))
+        assert error.value.reason == "deadline"
+    assert RetryPolicy("model", timeout=100).remaining() > 5
+
+
+class FakeCompletions:
+    def __init__(self, errors: list[Exception]):
+        self.errors = errors
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        message = type("Message", (), {"content": "hello"})
+        return type("Completion", (), {"choices": [type("Choice", (), {"message": message})]})
+
+
+def test_get_llm_response_retries(monkeypatch):
+    completions = FakeCompletions([make_status_error(502), make_status_error(429)])
+    client = type("Client", (), {"chat": type("Chat", (), {"completions": completions})})
+    monkeypatch.setattr(LLM_CALL, "get_llm_client", lambda *args, **kwargs: client)
+    monkeypatch.setattr(LLM_CALL.time, "sleep", lambda seconds: None)
+    model_config = [{"ip_addr": "127.0.0.1", "port": 8000}]
+    answer = get_llm_response("qwen-test", "hi", model_config=model_config)
+    assert answer == "hello"
+    assert completions.calls == 3
+
+    completions.errors = [make_status_error(400)]
+    with pytest.raises(LLMCallError):
+        get_llm_response("qwen-test", "hi", model_config=model_config)
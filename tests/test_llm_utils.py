@@ -1,3 +1,8 @@
+import asyncio
+import random
+import threading
+from types import SimpleNamespace
+
 import pytest
 
 from tau2.data_model.message import (
@@ -8,7 +13,8 @@ from tau2.data_model.message import (
     UserMessage,
 )
 from tau2.environment.tool import Tool, as_tool
-from tau2.utils.llm_utils import generate
+from tau2.utils import llm_utils
+from tau2.utils.llm_utils import agenerate, count_tokens, cut_middle_turns, generate
 
 
 @pytest.fixture
@@ -75,3 +81,133 @@ def test_generate_tool_call(model: str, tool_call_messages: list[Message], tool:
     assert isinstance(response, AssistantMessage)
     assert response.tool_calls is None
     assert response.content == "25"
+
+
+class CountingTokenizer:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, text: str) -> dict:
+        self.calls += 1
+        return {"input_ids": text.split()}
+
+
+def test_count_tokens_cache(monkeypatch):
+    tokenizer = CountingTokenizer()
+    monkeypatch.setattr(llm_utils, "_tokenizer", tokenizer)
+    monkeypatch.setattr(llm_utils, "_token_counts", type(llm_utils._token_counts)())
+    monkeypatch.setattr(llm_utils, "TOKEN_COUNT_CACHE_SIZE", 2)
+    assert count_tokens("a b c") == 3
+    assert count_tokens("a b c") == 3
+    assert tokenizer.calls == 1
+    count_tokens("d")
+    count_tokens("e f")
+    # The least recently used count was evicted.
+    assert count_tokens("a b c") == 3
+    assert tokenizer.calls == 4
+
+
+def test_count_tools_tokens_cache(monkeypatch, tool: Tool):
+    tokenizer = CountingTokenizer()
+    monkeypatch.setattr(llm_utils, "_tokenizer", tokenizer)
+    monkeypatch.setattr(llm_utils, "_token_counts", type(llm_utils._token_counts)())
+    monkeypatch.setattr(llm_utils, "_tools_token_counts", type(llm_utils._tools_token_counts)())
+    count = llm_utils.count_tools_tokens([tool.openai_schema])
+    assert count == count_tokens(str([tool.openai_schema]))
+    # A new list of the same schemas, as built on every turn, is not turned into a string again.
+    monkeypatch.setattr(llm_utils, "count_tokens", None)
+    assert llm_utils.count_tools_tokens([tool.openai_schema]) == count
+    assert tokenizer.calls == 1
+
+
+def test_agenerate_steps_off_event_loop(monkeypatch, messages: list[Message]):
+    step_threads = []
+    to_litellm_messages = llm_utils.to_litellm_messages
+
+    def recording_to_litellm_messages(*args, **kwargs):
+        step_threads.append(threading.get_ident())
+        return to_litellm_messages(*args, **kwargs)
+
+    async def fake_aget_llm_response(**kwargs):
+        message = SimpleNamespace(content="The moon has no capital.", tool_calls=None)
+        usage = SimpleNamespace(prompt_tokens=10, completion_tokens=5)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+    monkeypatch.setattr(llm_utils, "to_litellm_messages", recording_to_litellm_messages)
+    monkeypatch.setattr(llm_utils, "aget_llm_response", fake_aget_llm_response)
+
+    async def run():
+        message = await agenerate("gpt-4o-mini", messages, role="user")
+        return message, threading.get_ident()
+
+    message, loop_thread = asyncio.run(run())
+    assert message.content == "The moon has no capital."
+    assert step_threads and loop_thread not in step_threads
+
+
+class CharTokenizer:
+    def __call__(self, text: str) -> dict:
+        return {"input_ids": [ord(c) for c in text]}
+
+    def batch_decode(self, token_ids: list[int]) -> list[str]:
+        return [chr(i) for i in token_ids]
+
+
+SENTINEL_LENGTH = 15
+
+
+def reference_cut_middle_turns(tokenizer, messages: list[dict], max_length: int) -> list[dict]:
+    """The previous implementation, which tokenized the conversation with sentinels between the messages."""
+    start_identifier, end_identifier = "<" * SENTINEL_LENGTH, ">" * SENTINEL_LENGTH
+    messages_str = "".join(
+        f"{m}{start_identifier}{mid}{end_identifier}" for mid, m in enumerate(messages)
+    )
+    token_ids = tokenizer(messages_str)["input_ids"]
+    if len(token_ids) <= max_length:
+        return messages
+    p1 = "".join(tokenizer.batch_decode(token_ids[: max_length // 2]))
+    p1_idx = int(p1.split(start_identifier)[-1].split(end_identifier)[0])
+    p2 = "".join(tokenizer.batch_decode(token_ids[-max_length // 2 :]))
+    p2_idx = int(p2.split(end_identifier)[0].split(start_identifier)[-1])
+    return messages[: p1_idx + 1] + messages[p2_idx:]
+
+
+def test_cut_middle_turns_matches_reference():
+    rng = random.Random(0)
+    num_checked = 0
+    while num_checked < 200:
+        messages = [
+            {"role": "user", "content": "x" * rng.randint(0, 400)}
+            for _ in range(rng.randint(2, 30))
+        ]
+        max_length = rng.randint(100, 8000)
+        # The tokens of a message, and of the sentinel the reference adds after it.
+        token_counts = [
+            len(str(m)) + 2 * SENTINEL_LENGTH + len(str(i)) for i, m in enumerate(messages)
+        ]
+        # Only compare when the cut points fall inside messages, not inside sentinels.
+        ends = [sum(token_counts[: i + 1]) for i in range(len(messages))]
+        total = ends[-1]
+        if any(
+            end - count + len(str(m)) - 1 <= point <= end + 1
+            for end, count, m in zip(ends, token_counts, messages)
+            for point in (max_length // 2, total - max_length // 2)
+        ):
+            continue
+        if total > max_length and token_counts[0] >= max_length // 2:
+            # The reference fails when the first message does not fit.
+            continue
+        expected = reference_cut_middle_turns(CharTokenizer(), messages, max_length)
+        result = cut_middle_turns(messages, max_length, token_counts=token_counts)
+        assert [id(m) for m in result] == [id(m) for m in expected]
+        num_checked += 1
+
+
+def test_cut_middle_turns():
+    messages = [{"content": str(i)} for i in range(10)]
+    counts = [100] * 10
+    assert cut_middle_turns(messages, 1000, token_counts=counts) == messages
+    # 250 tokens per side: 2 messages at the head, the tail starts in message 7.
+    assert cut_middle_turns(messages, 500, token_counts=counts) == messages[:2] + messages[7:]
+    # The first message is always kept.
+    assert cut_middle_turns(messages, 100, token_counts=counts) == messages[:1] + messages[9:]
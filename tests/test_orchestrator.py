@@ -1,14 +1,18 @@
+import asyncio
 from copy import deepcopy
 from typing import Callable
 
 import pytest
 
+from LLM_CALL import LLMCallError
 from tau2.agent.llm_agent import LLMAgent, LLMSoloAgent
 from tau2.data_model.message import AssistantMessage, UserMessage
+from tau2.data_model.simulation import TerminationReason
 from tau2.data_model.tasks import EnvAssertion, InitialState, Task
 from tau2.environment.environment import Environment
 from tau2.orchestrator.orchestrator import (
     DEFAULT_FIRST_AGENT_MESSAGE,
+    AsyncOrchestrator,
     Orchestrator,
     Role,
 )
@@ -351,6 +355,52 @@ def test_orchestrator_run(
     assert simulation_run is not None
 
 
+def test_async_orchestrator_run(
+    domain_name: str,
+    user_simulator: UserSimulator,
+    agent: LLMAgent,
+    base_task: Task,
+    get_environment: Callable[[], Environment],
+):
+    orchestrator = AsyncOrchestrator(
+        domain=domain_name,
+        environment=get_environment(),
+        user=user_simulator,
+        agent=agent,
+        task=base_task,
+        max_steps=10,
+    )
+    simulation_run = asyncio.run(orchestrator.arun())
+    assert simulation_run is not None
+    assert len(simulation_run.messages) > 0
+
+
+def test_orchestrator_run_llm_error(
+    domain_name: str,
+    user_simulator: UserSimulator,
+    agent: LLMAgent,
+    base_task: Task,
+    get_environment: Callable[[], Environment],
+    monkeypatch,
+):
+    def generate_next_message(message, state):
+        raise LLMCallError("gpt-4.1", "fatal", attempts=1, elapsed=0.1)
+
+    monkeypatch.setattr(user_simulator, "generate_next_message", generate_next_message)
+    orchestrator = Orchestrator(
+        domain=domain_name,
+        environment=get_environment(),
+        user=user_simulator,
+        agent=agent,
+        task=base_task,
+        max_steps=10,
+    )
+    simulation_run = orchestrator.run()
+    assert simulation_run.termination_reason == TerminationReason.LLM_ERROR
+    assert simulation_run.failure.model == "gpt-4.1"
+    assert simulation_run.failure.reason == "fatal"
+
+
 def test_orchestrator_run_with_solo_agent(
     domain_name: str,
     dummy_user: DummyUser,
@@ -377,3 +427,31 @@ def test_orchestrator_run_with_solo_agent(
             arguments={"task_id": "task_2", "expected_status": "pending"},
         )
     )
+
+
+def test_trajectory_turn_idx():
+    orchestrator = Orchestrator(
+        domain="mock", agent=None, user=None, environment=None, task=None
+    )
+    first_message = DEFAULT_FIRST_AGENT_MESSAGE.model_copy()
+    orchestrator._reset_trajectory([first_message])
+    user_msg = UserMessage(role="user", content="Hi")
+    agent_msg = AssistantMessage(role="assistant", content="Hello")
+    orchestrator._extend_trajectory([user_msg, agent_msg])
+    trajectory = orchestrator.get_trajectory()
+    assert trajectory == [first_message, user_msg, agent_msg]
+    assert [msg.turn_idx for msg in trajectory] == [0, 1, 2]
+    assert DEFAULT_FIRST_AGENT_MESSAGE.turn_idx is None
+    # Later messages are not added to a trajectory already returned.
+    orchestrator._extend_trajectory([UserMessage(role="user", content="Bye")])
+    assert len(trajectory) == 3
+
+
+def test_message_timestamp_formatted_at_serialization():
+    msg = UserMessage(role="user", content="Hi")
+    assert msg.timestamp is None
+    timestamp = msg.model_dump()["timestamp"]
+    assert timestamp == msg.get_timestamp()
+    assert UserMessage.model_validate_json(msg.model_dump_json()).timestamp == timestamp
+    given = UserMessage(role="user", content="Hi", timestamp="2025-01-01T00:00:00")
+    assert given.model_dump()["timestamp"] == "2025-01-01T00:00:00"
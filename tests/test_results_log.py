@@ -0,0 +1,158 @@
+import json
+import os
+
+from tau2.data_model.message import AssistantMessage
+from tau2.data_model.simulation import SimulationRun
+from tau2.utils.results_log import (
+    RESULTS_INDEX_NAME,
+    RESULTS_LOG_NAME,
+    ResultsLog,
+    close_results_log,
+    iter_logged_durations,
+    iter_logged_simulations,
+)
+
+
+def make_simulation(task_id: str, trial: int, content: str = "Hi") -> SimulationRun:
+    return SimulationRun(
+        id=f"{task_id}_{trial}_{content}",
+        task_id=task_id,
+        start_time="2025-01-01T00:00:00",
+        end_time="2025-01-01T00:01:00",
+        duration=60.0,
+        termination_reason="agent_stop",
+        messages=[AssistantMessage(role="assistant", content=content)],
+        trial=trial,
+        seed=7,
+    )
+
+
+def test_results_log(tmp_path):
+    results_log = ResultsLog(str(tmp_path), fsync_every=2)
+    for task_id in ["a", "b"]:
+        for trial in range(2):
+            results_log.append(make_simulation(task_id, trial), latency=1.0)
+    # Logging a simulation again replaces it.
+    results_log.append(make_simulation("a", 0, content="Again"))
+    results_log.close()
+
+    results_log = ResultsLog(str(tmp_path))
+    assert results_log.get_keys() == {
+        ("a", 0, 7),
+        ("a", 1, 7),
+        ("b", 0, 7),
+        ("b", 1, 7),
+    }
+    assert ("a", 2, 7) not in results_log
+    simulations = list(results_log.iter_simulations())
+    assert [(s.task_id, s.trial) for s in simulations] == [
+        ("a", 1),
+        ("b", 0),
+        ("b", 1),
+        ("a", 0),
+    ]
+    assert simulations[-1].messages[0].content == "Again"
+    assert next(results_log.iter_records())["latency"] == 1.0
+
+
+def test_results_log_recovery(tmp_path):
+    results_log = ResultsLog(str(tmp_path))
+    for trial in range(3):
+        results_log.append(make_simulation("a", trial))
+    results_log.close()
+    # Crash after logging a simulation but before indexing it, and in the middle of the next line.
+    index_path = os.path.join(tmp_path, RESULTS_INDEX_NAME)
+    with open(index_path) as fp:
+        index_lines = fp.readlines()
+    with open(index_path, "w") as fp:
+        fp.writelines(index_lines[:2])
+    log_path = os.path.join(tmp_path, RESULTS_LOG_NAME)
+    size = os.path.getsize(log_path)
+    with open(log_path, "ab") as fp:
+        fp.write(b'{"task_id": "b", "tr')
+
+    results_log = ResultsLog(str(tmp_path))
+    assert results_log.get_keys() == {("a", 0, 7), ("a", 1, 7), ("a", 2, 7)}
+    assert os.path.getsize(log_path) == size
+    results_log.append(make_simulation("b", 0))
+    results_log.close()
+    results_log = ResultsLog(str(tmp_path))
+    assert len(results_log) == 4
+    assert len(list(results_log.iter_simulations())) == 4
+
+
+def test_read_live_log(tmp_path):
+    results_log = ResultsLog(str(tmp_path))
+    for trial in range(3):
+        results_log.append(make_simulation("a", trial))
+    # A line not indexed yet, and a line still being written.
+    index_path = os.path.join(tmp_path, RESULTS_INDEX_NAME)
+    with open(index_path) as fp:
+        index_lines = fp.readlines()
+    with open(index_path, "w") as fp:
+        fp.writelines(index_lines[:2])
+    log_path = os.path.join(tmp_path, RESULTS_LOG_NAME)
+    with open(log_path, "ab") as fp:
+        fp.write(b'{"task_id": "b", "tr')
+    size = os.path.getsize(log_path)
+    index_stat = os.stat(index_path)
+
+    simulations = list(iter_logged_simulations(str(tmp_path)))
+    assert [(s.task_id, s.trial) for s in simulations] == [("a", 0), ("a", 1), ("a", 2)]
+    # Nothing was truncated or rewritten.
+    assert os.path.getsize(log_path) == size
+    assert os.stat(index_path).st_ino == index_stat.st_ino
+    assert os.path.getsize(index_path) == index_stat.st_size
+    results_log.close()
+
+
+def test_logged_durations(tmp_path):
+    results_log = ResultsLog(str(tmp_path))
+    results_log.append(make_simulation("a", 0), latency=12.5)
+    results_log.append(make_simulation("a", 1))
+    results_log.close()
+    assert sorted(iter_logged_durations(str(tmp_path))) == [("a", 12.5), ("a", 60.0)]
+    # Index lines written before durations were indexed.
+    index_path = os.path.join(tmp_path, RESULTS_INDEX_NAME)
+    with open(index_path) as fp:
+        index_lines = [json.loads(line)[:5] for line in fp]
+    with open(index_path, "w") as fp:
+        fp.writelines(json.dumps(line) + "\n" for line in index_lines)
+    assert sorted(iter_logged_durations(str(tmp_path))) == [("a", 12.5), ("a", 60.0)]
+    results_log = ResultsLog(str(tmp_path))
+    assert results_log.get_keys() == {("a", 0, 7), ("a", 1, 7)}
+    results_log.close()
+
+
+def test_done_runs(tmp_path):
+    from tau2.data_model.tasks import EvaluationCriteria, make_task
+    from tau2.run import _make_run_args, get_done_runs
+
+    save_dir = str(tmp_path / "run")
+    os.makedirs(save_dir)
+    # A simulation saved by a run that predates the results log.
+    legacy = make_simulation("a", 0).model_dump()
+    legacy["latency"] = 2.0
+    with open(os.path.join(save_dir, "legacy.json"), "w") as fp:
+        json.dump(legacy, fp)
+    results_log = ResultsLog(save_dir)
+    assert len(results_log) == 0
+    results_log.close()
+
+    assert get_done_runs(save_dir) == {("a", 0, 7)}
+    close_results_log(save_dir)
+    results_log = ResultsLog(save_dir)
+    assert results_log.get_keys() == {("a", 0, 7)}
+    assert next(results_log.iter_records())["latency"] == 2.0
+
+    # Only the (task, trial, seed) that were run are skipped.
+    task = make_task(user_instructions="Hi", eval_criteria=EvaluationCriteria())
+    tasks = [task.model_copy(update={"id": task_id}) for task_id in ["a", "b"]]
+    args = _make_run_args(tasks, num_trials=2, seeds=[7, 7], done_runs={("a", 0, 7)})
+    assert [(task.id, trial) for task, trial, _, _ in args] == [
+        ("b", 0),
+        ("a", 1),
+        ("b", 1),
+    ]
+    args = _make_run_args(tasks, num_trials=1, seeds=[8], done_runs={("a", 0, 7)})
+    assert len(args) == 2
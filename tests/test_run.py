@@ -1,3 +1,4 @@
+import asyncio
 import json
 from copy import deepcopy
 
@@ -19,6 +20,7 @@ from tau2.run import (
     run_domain,
     run_task,
     run_tasks,
+    run_tasks_async,
 )
 
 
@@ -139,6 +141,49 @@ def test_run_tasks_base(domain_name: str, base_task: Task):
     assert simulation.reward_info.reward is not None
 
 
+def test_run_tasks_eval_processes(domain_name: str, base_task: Task, tmp_path):
+    """Test running tasks with the evaluation in a process pool"""
+    results = run_tasks(
+        domain=domain_name,
+        tasks=[base_task, base_task],
+        agent="llm_agent",
+        user="user_simulator",
+        llm_agent="gpt-3.5-turbo",
+        llm_args_agent={},
+        llm_user="gpt-3.5-turbo",
+        llm_args_user={},
+        save_to=str(tmp_path / "results.json"),
+        max_concurrency=2,
+        eval_concurrency=1,
+        eval_queue_size=1,
+    )
+    assert len(results.simulations) == 2
+    for simulation in results.simulations:
+        assert simulation.reward_info.reward is not None
+
+
+def test_run_tasks_async_base(domain_name: str, base_task: Task, tmp_path):
+    """Test running tasks with the asyncio engine"""
+    results = asyncio.run(
+        run_tasks_async(
+            domain=domain_name,
+            tasks=[base_task, base_task],
+            agent="llm_agent",
+            user="user_simulator",
+            llm_agent="gpt-3.5-turbo",
+            llm_args_agent={},
+            llm_user="gpt-3.5-turbo",
+            llm_args_user={},
+            save_to=str(tmp_path / "results.json"),
+            max_concurrency=2,
+        )
+    )
+    assert len(results.simulations) == 2
+    for simulation in results.simulations:
+        assert len(simulation.messages) > 0
+        assert simulation.reward_info.reward is not None
+
+
 def test_run_task_base(domain_name: str, base_task: Task):
     """Test running a task with the mock domain"""
     simulation = run_task(
@@ -0,0 +1,102 @@
+import json
+import urllib.request
+
+from LLM_CALL import LLMCallError, RetryPolicy, notify_llm_call
+from tau2.data_model.message import AssistantMessage
+from tau2.data_model.simulation import SimulationRun
+from tau2.utils.run_metrics import LatencyStats, MetricsFileWriter, MetricsServer, RunMetrics
+
+
+def make_simulation() -> SimulationRun:
+    return SimulationRun(
+        id="sim",
+        task_id="task",
+        start_time="2025-01-01T00:00:00",
+        end_time="2025-01-01T00:01:00",
+        duration=60.0,
+        termination_reason="agent_stop",
+        messages=[AssistantMessage(role="assistant", content="Hi")],
+    )
+
+
+def make_metrics() -> RunMetrics:
+    metrics = RunMetrics()
+    metrics.reset(num_planned=4)
+    for _ in range(3):
+        metrics.simulation_started()
+    metrics.simulation_finished(make_simulation())
+    metrics.simulation_failed()
+    metrics.set_queue_depth_fn(lambda: 1)
+    metrics.record_tool_calls("airline", 3)
+    metrics.record_evaluation(0.5)
+    for latency in range(1, 101):
+        metrics.record_llm_call("qwen", "localhost:8000", 0.0, latency / 100, 1, None)
+    metrics.record_llm_call("gpt-5", None, 0.0, 2.0, 3, LLMCallError("gpt-5", "max_attempts", 3, 2.0))
+    return metrics
+
+
+def test_latency_stats():
+    stats = LatencyStats(window=10)
+    for latency in range(100):
+        stats.add(float(latency))
+    assert stats.count == 100
+    # Percentiles are over the last 10 latencies.
+    assert stats.get_quantiles() == {0.5: 95.0, 0.95: 99.0, 0.99: 99.0}
+    assert LatencyStats().to_dict() == {"count": 0, "sum": 0.0}
+
+
+def test_run_metrics_to_dict():
+    metrics = make_metrics().to_dict()
+    simulations = metrics["simulations"]
+    assert simulations["planned"] == 4
+    assert (simulations["finished"], simulations["failed"]) == (1, 1)
+    assert (simulations["in_flight"], simulations["waiting"]) == (1, 1)
+    assert simulations["eval_queue_depth"] == 1
+    assert simulations["termination_reasons"] == {"agent_stop": 1}
+    gpt, qwen = metrics["llm_calls"]
+    assert (gpt["model"], gpt["endpoint"], gpt["errors"], gpt["retries"]) == ("gpt-5", "", 1, 2)
+    assert qwen["latency_seconds"]["count"] == 100
+    assert (qwen["latency_seconds"]["p50"], qwen["latency_seconds"]["p99"]) == (0.51, 1.0)
+    assert metrics["tool_calls"]["airline"]["count"] == 3
+    assert metrics["evaluation_latency_seconds"]["count"] == 1
+    json.dumps(metrics)
+
+
+def test_run_metrics_to_prometheus():
+    text = make_metrics().to_prometheus()
+    lines = text.splitlines()
+    assert "# TYPE tau2_llm_latency_seconds summary" in lines
+    assert 'tau2_llm_latency_seconds{model="qwen",endpoint="localhost:8000",quantile="0.95"} 0.96' in lines
+    assert 'tau2_llm_latency_seconds_count{model="qwen",endpoint="localhost:8000"} 100' in lines
+    assert 'tau2_llm_retries_total{model="gpt-5",endpoint=""} 2' in lines
+    assert 'tau2_simulations_finished_total{termination_reason="agent_stop"} 1' in lines
+    assert 'tau2_tool_calls_total{domain="airline"} 3' in lines
+    assert "tau2_simulations_in_flight 1" in lines
+
+
+def test_llm_call_listener():
+    from tau2.utils.run_metrics import RUN_METRICS
+
+    RUN_METRICS.reset()
+    policy = RetryPolicy("qwen")
+    policy.endpoint = "localhost:8000"
+    notify_llm_call(policy)
+    assert RUN_METRICS.to_dict()["llm_calls"][0]["latency_seconds"]["count"] == 1
+
+
+def test_metrics_exporters(tmp_path):
+    metrics = make_metrics()
+    server = MetricsServer(0, metrics=metrics).start()
+    try:
+        base_url = f"http://127.0.0.1:{server.port}"
+        with urllib.request.urlopen(f"{base_url}/metrics") as response:
+            assert "tau2_simulations_planned 4" in response.read().decode()
+        with urllib.request.urlopen(f"{base_url}/metrics.json") as response:
+            assert json.load(response)["simulations"]["planned"] == 4
+    finally:
+        server.stop()
+
+    path = tmp_path / "metrics.json"
+    writer = MetricsFileWriter(str(path), interval=60, metrics=metrics).start()
+    writer.stop()
+    assert json.loads(path.read_text())["simulations"]["planned"] == 4
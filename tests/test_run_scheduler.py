@@ -0,0 +1,158 @@
+import asyncio
+import threading
+
+import pytest
+
+from tau2.data_model.message import AssistantMessage
+from tau2.data_model.simulation import SimulationRun
+from tau2.data_model.tasks import Action, EvaluationCriteria, Task, make_task
+from tau2.run import _aiter_completed, _iter_completed
+from tau2.utils.results_log import ResultsLog
+from tau2.utils.scheduling import (
+    get_task_size,
+    load_task_durations,
+    predict_durations,
+    predict_makespan,
+    schedule_longest_first,
+)
+
+
+def make_simulation(task_id: str, trial: int) -> SimulationRun:
+    return SimulationRun(
+        id=f"{task_id}_{trial}",
+        task_id=task_id,
+        start_time="2025-01-01T00:00:00",
+        end_time="2025-01-01T00:01:00",
+        duration=60.0,
+        termination_reason="agent_stop",
+        messages=[AssistantMessage(role="assistant", content="Hi")],
+        trial=trial,
+        seed=7,
+    )
+
+
+def test_iter_completed_bounded():
+    lock = threading.Lock()
+    in_flight = []
+    max_in_flight = []
+    completed = []
+    others_done = threading.Event()
+
+    def work(i: int) -> int:
+        with lock:
+            in_flight.append(i)
+            max_in_flight.append(len(in_flight))
+        if i == 0:
+            # The slow call only finishes once the others were yielded.
+            assert others_done.wait(timeout=10)
+        with lock:
+            in_flight.remove(i)
+            completed.append(i)
+        return i
+
+    started = []
+    drawn_ahead = []
+
+    def args():
+        for i in range(20):
+            started.append(i)
+            # Args are only drawn as the calls finish.
+            with lock:
+                drawn_ahead.append(len(started) - len(completed))
+            yield (i,)
+
+    results = []
+    for result in _iter_completed(work, args(), max_concurrency=3):
+        results.append(result)
+        if len(results) == 19:
+            others_done.set()
+    # The slow call does not hold back the others.
+    assert sorted(results[:19]) == list(range(1, 20))
+    assert results[-1] == 0
+    assert max(drawn_ahead) <= 3
+    assert max(max_in_flight) <= 3
+
+
+def test_iter_completed_error():
+    def work(i: int) -> int:
+        if i == 2:
+            raise ValueError("boom")
+        return i
+
+    with pytest.raises(ValueError):
+        list(_iter_completed(work, [(i,) for i in range(5)], max_concurrency=2))
+
+
+def test_aiter_completed_bounded():
+    in_flight = 0
+    max_in_flight = 0
+
+    async def work(i: int) -> int:
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.05 if i == 0 else 0.001)
+        in_flight -= 1
+        return i
+
+    async def collect():
+        return [r async for r in _aiter_completed(work, [(i,) for i in range(10)], max_concurrency=4)]
+
+    results = asyncio.run(collect())
+    assert sorted(results) == list(range(10))
+    assert results[-1] == 0
+    assert max_in_flight == 4
+
+
+def make_sized_task(task_id: str, num_actions: int) -> Task:
+    task = make_task(
+        user_instructions="Hi",
+        eval_criteria=EvaluationCriteria(
+            actions=[Action(action_id=str(i), name="act", arguments={}) for i in range(num_actions)]
+        ),
+    )
+    return task.model_copy(update={"id": task_id})
+
+
+def test_predict_durations(tmp_path):
+    results_log = ResultsLog(str(tmp_path))
+    for task_id, trial, duration in [("a", 0, 10.0), ("a", 1, 20.0), ("b", 0, 30.0)]:
+        simulation = make_simulation(task_id, trial).model_copy(update={"duration": duration})
+        results_log.append(simulation)
+    # A rerun replaces the duration of the earlier simulation.
+    results_log.append(make_simulation("b", 0).model_copy(update={"duration": 40.0}), latency=30.0)
+    results_log.close()
+    durations = load_task_durations([str(tmp_path)])
+    assert durations == {"a": 15.0, "b": 30.0}
+
+    tasks = [
+        make_sized_task("a", 1),
+        make_sized_task("b", 1),
+        make_sized_task("c", 7),
+        make_sized_task("[mobile_data_issue]a|b|c[PERSONA:None]", 0),
+        make_sized_task("[mobile_data_issue]a[PERSONA:Easy]", 0),
+    ]
+    assert [get_task_size(task) for task in tasks] == [3, 3, 9, 4, 2]
+    expected = predict_durations(tasks, durations)
+    # Tasks without history are estimated at the median seconds per unit of size (7.5s).
+    assert expected == {
+        "a": 15.0,
+        "b": 30.0,
+        "c": 67.5,
+        "[mobile_data_issue]a|b|c[PERSONA:None]": 30.0,
+        "[mobile_data_issue]a[PERSONA:Easy]": 15.0,
+    }
+    # Without any history, the sizes alone order the tasks.
+    assert predict_durations(tasks, {})["c"] == 9
+
+
+def test_schedule_longest_first():
+    tasks = [make_sized_task(task_id, 0) for task_id in "abcd"]
+    expected = {"a": 1.0, "b": 1.0, "c": 1.0, "d": 3.0}
+    args = [(task, 0, 7, "") for task in tasks]
+    scheduled = schedule_longest_first(args, expected)
+    assert [arg[0].id for arg in scheduled] == ["d", "a", "b", "c"]
+    # The long task at the tail delays the run in file order.
+    assert predict_makespan([expected[arg[0].id] for arg in args], 2) == 4.0
+    assert predict_makespan([expected[arg[0].id] for arg in scheduled], 2) == 3.0
+    assert predict_makespan([], 2) == 0.0
@@ -0,0 +1,80 @@
+import json
+import os
+
+import pytest
+
+from tau2.utils import task_store as task_store_module
+from tau2.utils.task_store import TASK_INDEX_SUFFIX, TaskStore, get_task_store
+
+
+def make_raw_task(task_id: str, instructions: str = "Do it.") -> dict:
+    return {
+        "id": task_id,
+        "user_scenario": {"instructions": instructions},
+        "evaluation_criteria": {"actions": []},
+    }
+
+
+@pytest.fixture
+def task_path(tmp_path) -> str:
+    path = tmp_path / "tasks.json"
+    tasks = [make_raw_task(f"task_{i}", f"Tâche {i} ✓") for i in range(50)]
+    tasks.append(make_raw_task("task_3", "Duplicate"))
+    with open(path, "w") as fp:
+        json.dump(tasks, fp, indent=2, ensure_ascii=False)
+    return str(path)
+
+
+def test_task_store(task_path: str, monkeypatch):
+    task_store = TaskStore(task_path)
+    assert len(task_store) == 50
+    assert os.path.exists(task_path + TASK_INDEX_SUFFIX)
+    assert task_store.get_task("task_7").user_scenario.instructions == "Tâche 7 ✓"
+    # Duplicated ids keep the position of the first task and the content of the last one.
+    assert task_store.get_task_ids()[3] == "task_3"
+    assert task_store.get_task("task_3").user_scenario.instructions == "Duplicate"
+
+    # Only the selected tasks are validated.
+    validated = []
+    get_raw_task = TaskStore.get_raw_task
+
+    def counting_get_raw_task(self, task_id):
+        validated.append(task_id)
+        return get_raw_task(self, task_id)
+
+    monkeypatch.setattr(TaskStore, "get_raw_task", counting_get_raw_task)
+    task_store = TaskStore(task_path)
+    tasks = task_store.get_tasks(task_ids=["task_9", "task_2"])
+    assert [task.id for task in tasks] == ["task_2", "task_9"]
+    assert task_store.get_tasks(num_tasks=3)[-1].id == "task_2"
+    assert validated == ["task_2", "task_9", "task_0", "task_1"]
+    with pytest.raises(ValueError):
+        task_store.get_tasks(task_ids=["task_1", "missing"])
+
+
+def test_task_store_index_cache(task_path: str, monkeypatch):
+    TaskStore(task_path)
+
+    def fail(data):
+        raise AssertionError("The index should be read from the cache")
+
+    monkeypatch.setattr(task_store_module, "_build_index", fail)
+    assert len(get_task_store(task_path)) == 50
+    monkeypatch.undo()
+
+    # The index is rebuilt when the file changes.
+    with open(task_path, "w") as fp:
+        json.dump([make_raw_task("new")], fp)
+    os.utime(task_path, ns=(0, 0))
+    task_store = get_task_store(task_path)
+    assert task_store.get_task_ids() == ["new"]
+
+
+def test_task_store_skip_invalid(tmp_path):
+    path = tmp_path / "tasks.json"
+    with open(path, "w") as fp:
+        json.dump([make_raw_task("a"), {"id": "b"}, make_raw_task("c")], fp)
+    task_store = TaskStore(str(path))
+    with pytest.raises(ValueError):
+        task_store.get_tasks()
+    assert [task.id for task in task_store.get_tasks(skip_invalid=True)] == ["a", "c"]
@@ -0,0 +1,60 @@
+import json
+
+from LLM_CALL import LLMCallError, RetryPolicy, notify_llm_call
+from tau2.data_model.message import AssistantMessage
+from tau2.data_model.simulation import SimulationRun
+from tau2.utils.tracing import SpanRecorder, to_chrome_trace, to_otel_json
+
+
+def make_simulation(recorder: SpanRecorder) -> SimulationRun:
+    return SimulationRun(
+        id="sim",
+        task_id="task",
+        start_time="2025-01-01T00:00:00",
+        end_time="2025-01-01T00:01:00",
+        duration=60.0,
+        termination_reason="agent_stop",
+        messages=[AssistantMessage(role="assistant", content="Hi")],
+        trial=0,
+        spans=recorder.spans,
+    )
+
+
+def test_span_recorder():
+    recorder = SpanRecorder()
+    with recorder.activate():
+        recorder.step = 3
+        with recorder.span("generate", role="agent") as attributes:
+            policy = RetryPolicy("qwen")
+            policy.endpoint = "localhost:8000"
+            notify_llm_call(policy)
+            attributes.update(prompt_tokens=10, completion_tokens=None)
+        policy = RetryPolicy("gpt-5")
+        policy.attempts = 2
+        notify_llm_call(policy, error=LLMCallError("gpt-5", "max_attempts", 2, 1.0))
+    # LLM calls outside of an active recorder are not recorded.
+    notify_llm_call(RetryPolicy("qwen"))
+
+    llm_call, generate, failed_call = recorder.spans
+    assert (generate.phase, generate.role, generate.step) == ("generate", "agent", 3)
+    assert generate.attributes == {"prompt_tokens": 10}
+    assert llm_call.attributes == {"model": "qwen", "endpoint": "localhost:8000", "attempts": 1}
+    assert generate.start <= llm_call.start <= llm_call.end <= generate.end
+    assert failed_call.attributes["error"] == "LLMCallError"
+    assert failed_call.attributes["attempts"] == 2
+
+    simulation = SimulationRun.model_validate_json(make_simulation(recorder).model_dump_json())
+    assert simulation.spans == recorder.spans
+
+    trace = json.loads(json.dumps(to_chrome_trace([simulation])))
+    events = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+    assert [event["name"] for event in events] == ["llm_call", "agent.generate", "llm_call"]
+    assert events[1]["args"] == {"prompt_tokens": 10, "step": 3}
+
+    otel = to_otel_json([simulation])
+    spans = otel["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert len(spans) == 4
+    root = spans[0]
+    assert all(span["parentSpanId"] == root["spanId"] for span in spans[1:])
+    assert len(root["traceId"]) == 32 and len(root["spanId"]) == 16
+    assert {"key": "endpoint", "value": {"stringValue": "localhost:8000"}} in spans[1]["attributes"]
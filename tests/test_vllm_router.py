@@ -0,0 +1,61 @@
+import json
+import os
+
+import LLM_CALL
+from LLM_CALL import ROUTER_FAILURE_THRESHOLD, VLLMRouter
+
+
+def make_config(*ports):
+    return [{"ip_addr": "127.0.0.1", "port": port} for port in ports]
+
+
+def test_router_prefers_idle_endpoints():
+    router = VLLMRouter("model", model_config=make_config(1, 2))
+    busy = router.acquire()
+    assert router.acquire() != busy
+    # Endpoints with a lower latency get more requests.
+    router = VLLMRouter("model", model_config=make_config(1, 2))
+    router.stats["127.0.0.1:1"].latency = 10.0
+    router.stats["127.0.0.1:2"].latency = 0.1
+    assert router.acquire() == "127.0.0.1:2"
+
+
+def test_router_circuit_breaker(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(LLM_CALL.time, "monotonic", lambda: now[0])
+    router = VLLMRouter("model", model_config=make_config(1, 2))
+    for _ in range(ROUTER_FAILURE_THRESHOLD):
+        router.stats["127.0.0.1:1"].in_flight += 1
+        router.release("127.0.0.1:1", error=True)
+    for _ in range(10):
+        endpoint = router.acquire()
+        assert endpoint == "127.0.0.1:2"
+        router.release(endpoint, latency=1.0)
+    # After the cool-down a single request probes the endpoint.
+    now[0] += router.get_wait_time() + LLM_CALL.ROUTER_OPEN_SECONDS
+    router.stats["127.0.0.1:2"].in_flight = 100
+    probe = router.acquire()
+    assert probe == "127.0.0.1:1"
+    assert router.acquire() == "127.0.0.1:2"
+    router.release(probe, latency=1.0)
+    assert router.stats[probe].failures == 0
+
+
+def test_router_all_endpoints_down():
+    router = VLLMRouter("model", model_config=make_config(1))
+    for _ in range(ROUTER_FAILURE_THRESHOLD):
+        router.release(router.acquire(), error=True)
+    assert router.acquire() is None
+    assert router.get_wait_time() > 0
+
+
+def test_router_reloads_changed_config(tmp_path, monkeypatch):
+    monkeypatch.setattr(LLM_CALL, "ROUTER_RELOAD_INTERVAL", 0)
+    path = tmp_path / "model_config.json"
+    path.write_text(json.dumps({"model": make_config(1)}))
+    router = VLLMRouter("model", model_config_path=str(path))
+    assert router.endpoints == ["127.0.0.1:1"]
+    path.write_text(json.dumps({"model": make_config(2, 3)}))
+    os.utime(path, (1, 1))
+    assert router.acquire() in ("127.0.0.1:2", "127.0.0.1:3")
+    assert router.endpoints == ["127.0.0.1:2", "127.0.0.1:3"]